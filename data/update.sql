@@ -44,4 +44,34 @@ CREATE INDEX IF NOT EXISTS idx_download_history_video_id ON download_history(vid
 CREATE INDEX IF NOT EXISTS idx_credits_user_uuid ON credits(user_uuid);
 CREATE INDEX IF NOT EXISTS idx_credits_created_at ON credits(created_at);
 CREATE INDEX IF NOT EXISTS idx_orders_user_uuid ON orders(user_uuid);
-CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status); 
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status); 
+-- 创建文章题目工作队列表（TOPIC_QUEUE_BACKEND=supabase 时使用，多个runner共享）
+CREATE TABLE IF NOT EXISTS topic_queue (
+    id SERIAL PRIMARY KEY,
+    topic_key VARCHAR(64) UNIQUE NOT NULL, -- locale+题目的哈希，保证幂等入队
+    locale VARCHAR(50) NOT NULL,
+    language VARCHAR(100) NOT NULL,
+    category VARCHAR(100),
+    topic TEXT NOT NULL,
+    payload JSONB DEFAULT '{}'::jsonb,
+    status VARCHAR(50) NOT NULL DEFAULT 'queued', -- queued, leased, done, failed
+    lease_owner VARCHAR(255),
+    lease_expires timestamptz,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result JSONB,
+    created_at timestamptz DEFAULT now(),
+    updated_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_topic_queue_claim ON topic_queue(status, locale, id);
+
+-- 翻译扩散：译文关联其英文原文（TRANSLATION_FANOUT_LOCALES / translate 命令）
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS source_uuid VARCHAR(255);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_posts_source_uuid_locale ON posts(source_uuid, locale) WHERE source_uuid IS NOT NULL;
+
+-- Token 用量：每次运行的输入/输出 token 合计，token_usage 为按 "阶段@语言" 的明细
+ALTER TABLE auto_generation_logs ADD COLUMN IF NOT EXISTS prompt_tokens BIGINT DEFAULT 0;
+ALTER TABLE auto_generation_logs ADD COLUMN IF NOT EXISTS output_tokens BIGINT DEFAULT 0;
+ALTER TABLE auto_generation_logs ADD COLUMN IF NOT EXISTS total_tokens BIGINT DEFAULT 0;
+ALTER TABLE auto_generation_logs ADD COLUMN IF NOT EXISTS token_usage JSONB;
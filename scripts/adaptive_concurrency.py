@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+自适应并发控制 - AIMD（加性增、乘性减）限流器，根据 429/5xx 和延迟反馈调整在途请求数
+"""
+import re
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional, Tuple
+
+# 视为服务端过载的HTTP状态码
+OVERLOAD_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或HTTP日期）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_overload(outcome: Any) -> Tuple[bool, Optional[float]]:
+    """判断调用结果（响应对象或异常）是否为过载，返回 (是否过载, 建议等待秒数)"""
+    response = getattr(outcome, 'response', None) if isinstance(outcome, Exception) else outcome
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        if status in OVERLOAD_STATUS_CODES:
+            return True, parse_retry_after(response.headers.get('Retry-After'))
+        return False, None
+
+    # google.api_core 异常：code 为HTTP状态码，重试间隔位于错误详情的 retry_delay 中
+    code = getattr(outcome, 'code', None)
+    if isinstance(code, int) and code in OVERLOAD_STATUS_CODES:
+        match = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(outcome))
+        return True, float(match.group(1)) if match else None
+    return False, None
+
+class AIMDLimiter:
+    """AIMD并发限流器
+
+    每次健康的调用（无过载且延迟不超过基线的 latency_tolerance 倍）使上限增加 increase/limit，
+    即每轮满并发约 +increase；遇到 429/5xx 时上限乘以 decrease，并在 Retry-After 期间暂停发放新的并发槽。
+    """
+
+    def __init__(self, name: str, initial: float = 2, min_limit: float = 1, max_limit: float = 8,
+                 increase: float = 1.0, decrease: float = 0.5, latency_tolerance: float = 2.0,
+                 default_backoff: float = 5.0):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.default_backoff = default_backoff
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.last_decrease = 0.0
+        self.calls = 0
+        self.overloads = 0
+        self.errors = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """等待直到有空闲并发槽且不在退避期"""
+        with self.condition:
+            while True:
+                wait = self.blocked_until - time.time()
+                if wait <= 0 and self.in_flight < max(1, int(self.limit)):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, latency: float, overloaded: bool = False, retry_after: Optional[float] = None,
+                error: bool = False):
+        """归还并发槽并根据本次调用的反馈调整上限"""
+        with self.condition:
+            self.in_flight -= 1
+            self.calls += 1
+            old_limit = self.limit
+            now = time.time()
+
+            if overloaded:
+                self.overloads += 1
+                backoff = retry_after if retry_after is not None else self.default_backoff
+                self.blocked_until = max(self.blocked_until, now + backoff)
+                # 同一批在途请求同时返回429时只减一次
+                if now - self.last_decrease > (self.latency_ewma or 0):
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self.last_decrease = now
+                    self._log(old_limit, f"过载，退避 {backoff:.0f}s")
+            elif error:
+                self.errors += 1
+            else:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+                # 基线取观测到的最低平滑延迟，缓慢上浮以适应服务端变化
+                self.baseline = self.latency_ewma if self.baseline is None else min(self.baseline * 1.01, self.latency_ewma)
+                if latency <= self.baseline * self.latency_tolerance:
+                    self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+                    if int(self.limit) != int(old_limit):
+                        self._log(old_limit, f"延迟 {self.latency_ewma:.1f}s")
+
+            self.condition.notify_all()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """在并发槽内执行调用；异常或返回的HTTP响应都会作为反馈"""
+        self.acquire()
+        started = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            overloaded, retry_after = classify_overload(e)
+            self.release(time.time() - started, overloaded, retry_after, error=not overloaded)
+            raise
+        overloaded, retry_after = classify_overload(result)
+        self.release(time.time() - started, overloaded, retry_after)
+        return result
+
+    def _log(self, old_limit: float, reason: str):
+        print(f"⚙️ [{self.name}] 并发上限 {old_limit:.1f} → {self.limit:.1f}（{reason}，在途 {self.in_flight}，"
+              f"调用 {self.calls}，过载 {self.overloads}，错误 {self.errors}）")
+
+    def snapshot(self) -> dict:
+        """当前状态，用于日志和状态端点"""
+        with self.condition:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "latency_ewma": round(self.latency_ewma, 2) if self.latency_ewma is not None else None,
+                "blocked_for": max(0.0, round(self.blocked_until - time.time(), 1)),
+                "calls": self.calls,
+                "overloads": self.overloads,
+                "errors": self.errors,
+            }
@@ -7,11 +7,35 @@ import requests
 import time
 import random
 import re
-from datetime import datetime
-from google.generativeai import configure, GenerativeModel
+from datetime import datetime, timedelta
+from google.generativeai import configure
+from google.generativeai.types import GenerateContentResponse
+from google.ai import generativelanguage as glm
 from supabase import create_client, Client
 import uuid
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Any
+from topic_dedup import TopicIndex, screen_topics
+from content_dedup import SimHashIndex
+from keyword_scoring import select_keywords
+from keyword_bank import KeywordBank
+from topic_queue import SQLiteTopicQueue, SupabaseTopicQueue, DEFAULT_LEASE_SECONDS, topic_key
+from adaptive_concurrency import AIMDLimiter
+from resilience import resilient_call
+from hedging import Hedger
+from model_routing import DEFAULT_MODEL, ModelRouter, ModelProfiler, usage_counts
+from token_budget import TokenBudget
+from key_pool import KeyPool, parse_keys
+from batch_jobs import BATCH_DIR, BatchJob, LocalBatchProcessor, wait_for_job
+from llm_cache import LLMCache
+from http_cassette import cassette_from_env, install_cassette
+from pipeline import Pipeline, Stage, Finished, Retry
+from post_store import DATA_DIR, SupabasePostStore, SQLitePostStore
+from translation import split_sections, batch_parts, build_translation_prompt, parse_translation, rewrite_internal_links
+from generator_daemon import DaemonState, JitteredScheduler, parse_schedule, start_status_server
 
 # 环境变量配置
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
@@ -20,9 +44,232 @@ SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 UNSPLASH_ACCESS_KEY = os.getenv('UNSPLASH_ACCESS_KEY')
 SITE_URL = os.getenv('NEXT_PUBLIC_WEB_URL', 'https://kuaishou-video-download.com')
 
+# Gemini 密钥池（可选）："key1:2,key2,key3" 形式，冒号后为权重（相对配额）；未设置时只使用 GEMINI_API_KEY
+GEMINI_API_KEYS = parse_keys(os.getenv('GEMINI_API_KEYS', '')) or [(GEMINI_API_KEY, 1.0)]
+# 权重为 1 的密钥每分钟的请求数 / token 数上限（0 为不限制），按权重等比放大
+GEMINI_KEY_RPM = int(os.getenv('GEMINI_KEY_RPM', '0'))
+GEMINI_KEY_TPM = int(os.getenv('GEMINI_KEY_TPM', '0'))
+
 # 初始化服务
-configure(api_key=GEMINI_API_KEY)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+configure(api_key=GEMINI_API_KEYS[0][0])
+
+# 共享HTTP会话，复用到Google建议和Unsplash的连接（守护进程模式下长期保持）
+http_session = requests.Session()
+
+# HTTP录制/回放（可选）：HTTP_CASSETTE 为 cassette 文件路径，HTTP_CASSETTE_MODE=record|replay，
+# 拦截共享会话和 Supabase REST 请求；HTTP_CASSETTE_LATENCY=recorded 或秒数时回放注入延迟
+http_cassette = cassette_from_env()
+if http_cassette:
+    install_cassette(http_cassette, http_session)
+    print(f"📼 HTTP cassette: {http_cassette.mode} {http_cassette.path}")
+
+# Supabase 客户端在第一次使用时才创建，dry-run 模式下不会连接生产库
+_supabase: Client = None
+_supabase_lock = threading.Lock()
+
+def get_supabase() -> Client:
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            _supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+            if http_cassette:
+                install_cassette(http_cassette, supabase_client=_supabase)
+        return _supabase
+
+# Dry-run（DRY_RUN=1 或命令行 --dry-run）：posts 和执行日志读写本地SQLite（DRY_RUN_DB），题目队列使用本地SQLite
+DRY_RUN = os.getenv('DRY_RUN', '').lower() in ('1', 'true', 'yes')
+_post_store = None
+
+def enable_dry_run():
+    global DRY_RUN, _post_store, _token_budget, _batch_processor, llm_cache
+    DRY_RUN = True
+    _post_store = None
+    _token_budget = None
+    _batch_processor = None
+    llm_cache = create_llm_cache()
+
+def get_post_store():
+    """文章存储：默认 Supabase，dry-run 时为本地SQLite"""
+    global _post_store
+    if _post_store is None:
+        if DRY_RUN:
+            _post_store = SQLitePostStore()
+            print(f"🧪 Dry-run: 文章读写本地数据库 {_post_store.path}")
+        else:
+            _post_store = SupabasePostStore(get_supabase, deadline=SUPABASE_CALL_DEADLINE)
+    return _post_store
+
+def sandbox_path(*parts: str):
+    """dry-run 时本地状态（题目/正文索引、关键词库、题目队列、token账本、LLM缓存、模型报告、批处理任务）
+    使用 DATA_DIR/dry_run 下的独立文件，不影响正式运行；正式运行返回 None（使用各模块的默认路径）"""
+    return os.path.join(DATA_DIR, 'dry_run', *parts) if DRY_RUN else None
+
+# 未在路由表中指定模型的阶段使用的默认模型；各阶段的模型和输出上限见 model_routing / MODEL_ROUTES
+LLM_MODEL = os.getenv('LLM_MODEL', DEFAULT_MODEL)
+model_router = ModelRouter(default_model=LLM_MODEL)
+model_profiler = ModelProfiler()
+
+# LLM响应缓存：passthrough 不使用；record 命中复用、未命中调用并写入；replay 只读缓存（离线回放，用于调试解析/校验和回归测试）
+LLM_CACHE_MODE = os.getenv('LLM_CACHE_MODE', 'passthrough').lower()
+
+def create_llm_cache() -> LLMCache:
+    """dry-run 时默认写入沙盒目录；显式设置 LLM_CACHE_DIR 时使用该目录（如用已录制的缓存离线回放 dry-run）"""
+    return LLMCache(LLM_CACHE_MODE, os.getenv('LLM_CACHE_DIR') or sandbox_path('llm_cache'))
+
+llm_cache = create_llm_cache()
+
+# Token 预算（0 为不限制）：按每次调用的 usage_metadata 累计，预计超出单次运行或每日预算时不再启动新文章
+TOKEN_RUN_BUDGET = int(os.getenv('TOKEN_RUN_BUDGET', '0'))
+TOKEN_DAILY_BUDGET = int(os.getenv('TOKEN_DAILY_BUDGET', '0'))
+TOKEN_ARTICLE_ESTIMATE = int(os.getenv('TOKEN_ARTICLE_ESTIMATE', '20000'))
+_token_budget: TokenBudget = None
+_token_budget_lock = threading.Lock()
+
+def get_token_budget() -> TokenBudget:
+    """获取 token 预算（进程内单例，第一次使用时才创建每日账本；dry-run 时使用独立账本）"""
+    global _token_budget
+    with _token_budget_lock:
+        if _token_budget is None:
+            _token_budget = TokenBudget(run_limit=TOKEN_RUN_BUDGET, daily_limit=TOKEN_DAILY_BUDGET,
+                                        article_estimate=TOKEN_ARTICLE_ESTIMATE,
+                                        path=sandbox_path('token_usage.sqlite'))
+    return _token_budget
+
+# 自适应并发：在途LLM/HTTP调用数在上下限之间按 429/5xx 和延迟反馈自动调整
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+HTTP_MAX_CONCURRENCY = int(os.getenv('HTTP_MAX_CONCURRENCY', '8'))
+
+# 单次调用（含重试）的截止时间，秒
+LLM_CALL_DEADLINE = float(os.getenv('LLM_CALL_DEADLINE', '300'))
+HTTP_CALL_DEADLINE = float(os.getenv('HTTP_CALL_DEADLINE', '30'))
+SUPABASE_CALL_DEADLINE = float(os.getenv('SUPABASE_CALL_DEADLINE', '60'))
+
+# 超额生成：额外准备 k 个题目并发生成，插入达到目标篇数后停止启动新文章
+ARTICLE_OVERPROVISION = int(os.getenv('ARTICLE_OVERPROVISION', '0'))
+
+# 文章生成模式：single 一次生成全文；sections 先生成大纲，再并发生成各章节
+ARTICLE_GENERATION_MODE = os.getenv('ARTICLE_GENERATION_MODE', 'single').lower()
+
+# 翻译扩散：英文文章入库后翻译到这些语言（逗号分隔，如 "hi,bn,id"；为空则关闭），每次翻译请求的最大字符数
+TRANSLATION_FANOUT_LOCALES = [l.strip() for l in os.getenv('TRANSLATION_FANOUT_LOCALES', '').split(',') if l.strip()]
+TRANSLATION_BATCH_CHARS = int(os.getenv('TRANSLATION_BATCH_CHARS', '6000'))
+
+# 流水线模式（默认开启）：生成 → 校验 → 补全（slug、封面）→ 入库 各阶段独立并发、有界队列衔接，封面在LLM调用期间预取
+ARTICLE_PIPELINE = os.getenv('ARTICLE_PIPELINE', '1').lower() in ('1', 'true', 'yes')
+PIPELINE_VALIDATE_WORKERS = int(os.getenv('PIPELINE_VALIDATE_WORKERS', '2'))
+PIPELINE_ENRICH_WORKERS = int(os.getenv('PIPELINE_ENRICH_WORKERS', '4'))
+PIPELINE_PERSIST_WORKERS = int(os.getenv('PIPELINE_PERSIST_WORKERS', '2'))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+
+# 批量模式：关键词驱动生成把文章提示词写成批处理任务文件，完成后统一解析入库（适合大批量回填），结果轮询间隔秒数
+ARTICLE_BATCH_MODE = os.getenv('ARTICLE_BATCH_MODE', '').lower() in ('1', 'true', 'yes')
+BATCH_POLL_SECONDS = float(os.getenv('BATCH_POLL_SECONDS', '30'))
+
+# 对冲请求（可选）：文章生成调用超过该语言 p90 延迟时发出重复请求，对冲次数不超过主请求的 LLM_HEDGE_MAX_RATIO
+# 默认只对冲整篇文章生成（article）；大纲、章节、翻译（outline,section,translate）需在 LLM_HEDGING_STAGES 中显式开启，
+# 每个阶段单独占用一份额外成本额度
+LLM_HEDGING = os.getenv('LLM_HEDGING', '').lower() in ('1', 'true', 'yes')
+LLM_HEDGING_STAGES = {s.strip() for s in os.getenv('LLM_HEDGING_STAGES', 'article').split(',') if s.strip()}
+hedger = Hedger(quantile=float(os.getenv('LLM_HEDGE_QUANTILE', '0.9')),
+                max_extra_ratio=float(os.getenv('LLM_HEDGE_MAX_RATIO', '0.1')))
+
+# 每个密钥单独创建客户端，请求按密钥负载分摊；并发上限随密钥数扩展
+key_pool = KeyPool(GEMINI_API_KEYS, rpm_limit=GEMINI_KEY_RPM, tpm_limit=GEMINI_KEY_TPM,
+                   client_factory=lambda key: glm.GenerativeServiceClient(client_options={"api_key": key}))
+
+llm_limiter = AIMDLimiter("gemini", initial=2, max_limit=LLM_MAX_CONCURRENCY * key_pool.size)
+http_limiters = {
+    "google_suggest": AIMDLimiter("google_suggest", initial=2, max_limit=HTTP_MAX_CONCURRENCY),
+    "unsplash": AIMDLimiter("unsplash", initial=1, max_limit=HTTP_MAX_CONCURRENCY),
+}
+
+def generate_content(prompt: str, stage: str = "article", locale: str = None, hedge_key: str = None,
+                     validate=None):
+    """调用Gemini生成内容：按 (阶段, locale) 路由模型和生成参数，使用密钥池中负载最低的密钥，受自适应并发限制，
+    瞬时错误（超时、429/5xx）按退避重试，熔断时快速失败
+
+    开启 LLM_HEDGING、阶段在 LLM_HEDGING_STAGES 中且提供 hedge_key（如 locale）时按该分组的延迟分布对冲，
+    validate 用于判断响应是否有效；
+    开启 LLM_CACHE_MODE 时先查本地响应缓存
+    """
+    route = model_router.resolve(stage, locale)
+    check = validate or has_text
+
+    cache_key = None
+    if llm_cache.enabled:
+        started = time.time()
+        cache_key = llm_cache.key(route["model"], route["generation_config"], prompt)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            model_profiler.record_call(stage, route["model"], time.time() - started, usage_counts(cached), check(cached))
+            return cached
+
+    def call_with_key(client, timeout):
+        # 直接用该密钥的客户端发请求，响应包装为 SDK 的 GenerateContentResponse（提供 text / usage_metadata）
+        request = {
+            "model": route["model"] if route["model"].startswith("models/") else f"models/{route['model']}",
+            "contents": [glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        }
+        if route["generation_config"]:
+            request["generation_config"] = glm.GenerationConfig(**route["generation_config"])
+        response = client.generate_content(glm.GenerateContentRequest(**request), timeout=timeout)
+        return GenerateContentResponse.from_response(response)
+
+    def pooled_call(timeout):
+        return key_pool.call(lambda client: call_with_key(client, timeout),
+                             tokens_of=lambda response: usage_counts(response)["total_tokens"], timeout=timeout)
+
+    def attempt(timeout):
+        started = time.time()
+        try:
+            response = llm_limiter.call(pooled_call, timeout)
+        except Exception:
+            model_profiler.record_call(stage, route["model"], time.time() - started, error=True)
+            raise
+        usage = usage_counts(response)
+        get_token_budget().record(stage, locale, usage["prompt_tokens"], usage["output_tokens"])
+        model_profiler.record_call(stage, route["model"], time.time() - started, usage, check(response))
+        return response
+
+    def hedged_attempt(timeout):
+        # 只对冲单次尝试：重试退避在 resilient_call 中进行，服务过载退避期间不会发出重复请求
+        return hedger.call(hedge_key, lambda: attempt(timeout), validate)
+
+    if LLM_HEDGING and hedge_key and stage in LLM_HEDGING_STAGES:
+        response = resilient_call("gemini", hedged_attempt, deadline=LLM_CALL_DEADLINE)
+    else:
+        response = resilient_call("gemini", attempt, deadline=LLM_CALL_DEADLINE)
+
+    # 只缓存格式有效的响应，避免回放时反复得到同一个坏结果
+    if cache_key and check(response):
+        llm_cache.put(cache_key, response.text, usage_counts(response),
+                      {"model": route["model"], "stage": stage, "locale": locale})
+    return response
+
+def has_text(response) -> bool:
+    """响应是否包含非空文本（被安全策略拦截时访问 text 会抛出异常）"""
+    try:
+        return bool(response.text)
+    except Exception:
+        return False
+
+def response_contains(response, marker: str) -> bool:
+    """对冲校验：响应文本包含指定分隔标记才算有效"""
+    try:
+        return marker in (response.text or "")
+    except Exception:
+        return False
+
+def has_article_markers(response) -> bool:
+    return response_contains(response, "===CONTENT_START===")
+
+def http_get(provider: str, url: str, timeout: float = 10, **kwargs) -> requests.Response:
+    """通过共享会话发起GET请求，受对应服务的自适应并发限制；非2xx响应抛出 HTTPError"""
+    def attempt(remaining):
+        response = http_limiters[provider].call(http_session.get, url, timeout=min(timeout, remaining), **kwargs)
+        response.raise_for_status()
+        return response
+    return resilient_call(provider, attempt, deadline=HTTP_CALL_DEADLINE)
 
 def get_unsplash_image(query="short video"):
     """从Unsplash获取图片 - 优化为短视频相关关键词"""
@@ -43,10 +290,10 @@ def get_unsplash_image(query="short video"):
             query = random.choice(short_video_keywords)
 
         headers = {"Authorization": f"Client-ID {UNSPLASH_ACCESS_KEY}"}
-        response = requests.get(
+        response = http_get(
+            "unsplash",
             f"https://api.unsplash.com/search/photos?query={query}&per_page=30&orientation=landscape",
-            headers=headers,
-            timeout=10
+            headers=headers
         )
 
         if response.status_code == 200:
@@ -60,9 +307,8 @@ def get_unsplash_image(query="short video"):
         print(f"获取Unsplash图片失败: {e}")
         return "https://images.unsplash.com/photo-1611605698335-8b1569810432?w=800&q=80"
 
-def generate_seed_keywords(language: str, count: int = 8) -> List[str]:
+def generate_seed_keywords(language: str, count: int = 8, locale: str = None) -> List[str]:
     """生成种子关键词"""
-    model = GenerativeModel("gemini-2.5-flash-preview-05-20")
     
     prompt = f"""你是一位专业的SEO关键词研究专家，专注于快手视频下载相关的关键词研究。
 
@@ -92,7 +338,7 @@ def generate_seed_keywords(language: str, count: int = 8) -> List[str]:
 (唯一性标识: {int(time.time())})"""
 
     try:
-        result = model.generate_content(prompt)
+        result = generate_content(prompt, stage="seed_keywords", locale=locale)
         if not result.text:
             raise ValueError("AI未能生成种子关键词")
         
@@ -127,7 +373,7 @@ def get_default_seed_keywords(language: str, count: int) -> List[str]:
             "快手短视频下载",
             "快手下载器",
             "快手视频下载工具",
-            "快手视频保存",
+            "快手视频无水印下载",
             "快手短视频",
             "下载快手视频"
         ]
@@ -145,6 +391,31 @@ def get_default_seed_keywords(language: str, count: int) -> List[str]:
     
     return default_keywords[:count]
 
+_keyword_bank = None
+_keyword_bank_lock = threading.Lock()
+
+def get_keyword_bank() -> KeywordBank:
+    """获取本地关键词库（进程内单例）"""
+    global _keyword_bank
+    with _keyword_bank_lock:
+        if _keyword_bank is None:
+            _keyword_bank = KeywordBank(sandbox_path('keyword_bank.sqlite'))
+    return _keyword_bank
+
+def get_seed_keywords(language: str, locale: str, count: int) -> List[str]:
+    """从关键词库抽取最久未使用的种子词，库存不足时才调用AI补充新种子词"""
+    bank = get_keyword_bank()
+    available = bank.available_seed_count(locale)
+
+    # 库存低于两次运行的用量时补充，避免每次运行都调用AI
+    if available < count * 2:
+        print(f"📦 {language}关键词库可用种子词不足（{available}个），调用AI补充...")
+        bank.add_seeds(locale, generate_seed_keywords(language, count, locale))
+    else:
+        print(f"📦 {language}关键词库可用种子词 {available} 个，跳过AI种子词生成")
+
+    return bank.draw_seeds(locale, count)
+
 def get_google_suggestions(keyword: str, max_suggestions: int = 8) -> List[str]:
     """使用Google自动完成API获取关键词建议"""
     try:
@@ -156,8 +427,7 @@ def get_google_suggestions(keyword: str, max_suggestions: int = 8) -> List[str]:
         
         print(f"🔍 获取'{keyword}'的Google自动完成建议...")
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        response = http_get("google_suggest", url, params=params)
         
         suggestions_data = response.json()
         if len(suggestions_data) >= 2 and isinstance(suggestions_data[1], list):
@@ -187,32 +457,24 @@ def expand_keywords_with_google(seed_keywords: List[str], max_per_keyword: int =
     
     print(f"\n🚀 开始扩展{len(seed_keywords)}个种子关键词...")
     
-    for i, keyword in enumerate(seed_keywords, 1):
-        print(f"\n进度: {i}/{len(seed_keywords)} - 处理: {keyword}")
-        
-        suggestions = get_google_suggestions(keyword, max_per_keyword)
+    # 并发请求，实际在途数由 google_suggest 限流器根据响应情况控制
+    with ThreadPoolExecutor(max_workers=HTTP_MAX_CONCURRENCY) as executor:
+        all_suggestions = list(executor.map(lambda keyword: get_google_suggestions(keyword, max_per_keyword), seed_keywords))
+
+    for keyword, suggestions in zip(seed_keywords, all_suggestions):
         if suggestions:
             expanded_keywords[keyword] = suggestions
-        
-        # 避免请求过于频繁
-        if i < len(seed_keywords):
-            time.sleep(1)  # 1秒延迟
     
     return expanded_keywords
 
-def generate_categorized_topics_by_keywords_with_count(expanded_keywords: Dict[str, List[str]], language: str, target_count: int) -> Dict[str, List[str]]:
+def generate_categorized_topics_by_keywords_with_count(expanded_keywords: Dict[str, List[str]], language: str, target_count: int,
+                                                      covered_texts: List[str] = None, history: Dict[str, int] = None,
+                                                      locale: str = None) -> Dict[str, List[str]]:
     """根据扩展的关键词和目标数量，按分类生成文章题目"""
-    model = GenerativeModel("gemini-2.5-flash-preview-05-20")
 
-    # 将所有关键词合并成一个列表用于AI分析
-    all_keywords = []
-    for seed_keyword, suggestions in expanded_keywords.items():
-        all_keywords.append(seed_keyword)
-        all_keywords.extend(suggestions)
-
-    # 去重
-    unique_keywords = list(set(all_keywords))
-    keywords_text = '\n'.join(f"- {kw}" for kw in unique_keywords[:50])  # 限制关键词数量
+    # 按综合得分确定性地选出关键词（限制关键词数量）
+    selected_keywords = select_keywords(expanded_keywords, 50, covered_texts, history)
+    keywords_text = '\n'.join(f"- {kw}" for kw in selected_keywords)
 
     # 根据目标数量分配文章类型
     if target_count <= 3:
@@ -282,7 +544,8 @@ def generate_categorized_topics_by_keywords_with_count(expanded_keywords: Dict[s
 (唯一性标识: {int(time.time())})"""
 
     try:
-        result = model.generate_content(prompt)
+        result = generate_content(prompt, stage="topics", locale=locale,
+                                  validate=lambda r: response_contains(r, "===SEARCH_KEYWORDS_END==="))
         if not result.text:
             raise ValueError("AI未能生成分类文章题目")
 
@@ -303,19 +566,14 @@ def generate_categorized_topics_by_keywords_with_count(expanded_keywords: Dict[s
         print(f"❌ 分类文章题目生成失败: {e}")
         return get_default_category_topics_with_count(language, target_count)
 
-def generate_categorized_topics_by_keywords(expanded_keywords: Dict[str, List[str]], language: str) -> Dict[str, List[str]]:
+def generate_categorized_topics_by_keywords(expanded_keywords: Dict[str, List[str]], language: str,
+                                            covered_texts: List[str] = None, history: Dict[str, int] = None,
+                                            locale: str = None) -> Dict[str, List[str]]:
     """根据扩展的关键词，按分类生成文章题目"""
-    model = GenerativeModel("gemini-2.5-flash-preview-05-20")
-    
-    # 将所有关键词合并成一个列表用于AI分析
-    all_keywords = []
-    for seed_keyword, suggestions in expanded_keywords.items():
-        all_keywords.append(seed_keyword)
-        all_keywords.extend(suggestions)
     
-    # 去重
-    unique_keywords = list(set(all_keywords))
-    keywords_text = '\n'.join(f"- {kw}" for kw in unique_keywords[:50])  # 限制关键词数量
+    # 按综合得分确定性地选出关键词（限制关键词数量）
+    selected_keywords = select_keywords(expanded_keywords, 50, covered_texts, history)
+    keywords_text = '\n'.join(f"- {kw}" for kw in selected_keywords)
     
     prompt = f"""你是一位专业的SEO内容策略师，专注于KuaishouVideoDownload（快手视频下载器）相关的内容创作。
 
@@ -367,7 +625,8 @@ def generate_categorized_topics_by_keywords(expanded_keywords: Dict[str, List[st
 (唯一性标识: {int(time.time())})"""
 
     try:
-        result = model.generate_content(prompt)
+        result = generate_content(prompt, stage="topics", locale=locale,
+                                  validate=lambda r: response_contains(r, "===SEARCH_KEYWORDS_END==="))
         if not result.text:
             raise ValueError("AI未能生成分类文章题目")
         
@@ -388,6 +647,144 @@ def generate_categorized_topics_by_keywords(expanded_keywords: Dict[str, List[st
         print(f"❌ 分类文章题目生成失败: {e}")
         return get_default_category_topics(language)
 
+def fetch_posts_since(locale: str, since: str = None, fields: str = "slug, title, created_at") -> List[Dict[str, Any]]:
+    """分页获取指定语言的已发布文章（since 为 None 时获取全部）"""
+    return list(get_post_store().iter_posts(fields, status="online", locale=locale, since=since))
+
+def sync_post_index(index, locale: str, field: str, label: str):
+    """增量同步本地文章索引：只拉取上次同步之后新增的文章"""
+    since = None
+    if index.last_synced:
+        # 文章的 created_at 会被随机前移最多72小时，同步窗口需要覆盖这段偏移
+        since = (datetime.fromisoformat(index.last_synced) - timedelta(days=4)).isoformat()
+
+    try:
+        synced_at = datetime.now().isoformat()
+        added = 0
+        for post in fetch_posts_since(locale, since, f"slug, {field}, created_at"):
+            if index.add(post.get('slug'), post.get(field) or ''):
+                added += 1
+        index.last_synced = synced_at
+        index.save()
+        print(f"📇 {locale}{label}: {len(index)}条记录（新增同步 {added} 篇）")
+    except Exception as e:
+        print(f"⚠️ {label}同步失败，使用本地索引: {e}")
+
+# 每个语言的本地索引在进程内只加载一次；多个worker线程共享时通过锁串行化加载和更新
+_topic_indexes: Dict[str, TopicIndex] = {}
+_content_indexes: Dict[str, SimHashIndex] = {}
+_index_lock = threading.RLock()
+
+def get_topic_index(locale: str) -> TopicIndex:
+    """加载并同步题目 MinHash 索引"""
+    with _index_lock:
+        if locale not in _topic_indexes:
+            index = TopicIndex.load(locale, sandbox_path('topic_index', f'{locale}.json'))
+            sync_post_index(index, locale, "title", "题目索引")
+            _topic_indexes[locale] = index
+        return _topic_indexes[locale]
+
+def get_content_index(locale: str) -> SimHashIndex:
+    """加载并同步正文 SimHash 索引"""
+    with _index_lock:
+        if locale not in _content_indexes:
+            index = SimHashIndex.load(locale, sandbox_path('simhash_index', f'{locale}.json'))
+            sync_post_index(index, locale, "content", "正文指纹索引")
+            _content_indexes[locale] = index
+        return _content_indexes[locale]
+
+def refresh_post_indexes(locale: str):
+    """增量同步已加载的索引，守护进程中每轮调度前调用以纳入其他进程发布的文章"""
+    with _index_lock:
+        if locale in _topic_indexes:
+            sync_post_index(_topic_indexes[locale], locale, "title", "题目索引")
+        if locale in _content_indexes:
+            sync_post_index(_content_indexes[locale], locale, "content", "正文指纹索引")
+
+def generate_replacement_topics(expanded_keywords: Dict[str, List[str]], language: str, count: int, avoid_topics: List[str],
+                                locale: str = None) -> List[str]:
+    """为被判定为重复的题目生成替代题目"""
+    avoid_text = '\n'.join(f"- {topic}" for topic in avoid_topics)
+
+    prompt = f"""你是一位专业的SEO内容策略师，专注于KuaishouVideoDownload（快手视频下载器）相关的内容创作。
+
+## 任务
+以下题目与已发布的文章过于相似，请基于关键词生成{count}个全新的文章题目。
+
+{build_keywords_context(expanded_keywords)}
+
+## 需要避免的题目（不要生成与这些相似的题目）：
+{avoid_text}
+
+## 语言要求
+{language}
+
+## 输出要求
+- 直接输出{count}个题目
+- 每行一个题目
+- 不包含编号或符号
+- 切入角度、目标设备或使用场景需要与上述题目明显不同
+
+(唯一性标识: {int(time.time())})"""
+
+    try:
+        result = generate_content(prompt, stage="replacement_topics", locale=locale)
+        if not result.text:
+            return []
+        topics = []
+        for line in result.text.strip().split('\n'):
+            topic = re.sub(r'^\d+\.?\s*', '', line.strip())
+            topic = re.sub(r'^[•\-\*]\s*', '', topic).strip().strip('"').strip()
+            if topic and not topic.startswith('#'):
+                topics.append(topic)
+        return topics[:count]
+    except Exception as e:
+        print(f"❌ 替代题目生成失败: {e}")
+        return []
+
+def dedupe_categorized_topics(categorized_topics: Dict[str, List[str]], expanded_keywords: Dict[str, List[str]],
+                              language: str, locale: str, max_rounds: int = 2) -> Dict[str, List[str]]:
+    """在调用文章生成之前，过滤与已发布文章近似的题目，并请求替代题目"""
+    index = get_topic_index(locale)
+    flat = [(category, topic) for category, topics in categorized_topics.items() for topic in topics]
+    with _index_lock:
+        accepted, rejected = screen_topics(index, [topic for _, topic in flat])
+    accepted_set = set(accepted)
+
+    result = {category: [] for category in categorized_topics}
+    pending_categories = []
+    for category, topic in flat:
+        if topic in accepted_set:
+            result[category].append(topic)
+            accepted_set.discard(topic)
+        else:
+            pending_categories.append(category)
+
+    for item in rejected:
+        print(f"   🚫 重复题目: {item['topic']} ≈ {item['duplicate_of']} ({item['similarity']:.2f})")
+
+    avoid_topics = [item['topic'] for item in rejected] + [item['duplicate_of'] for item in rejected]
+    for round_num in range(1, max_rounds + 1):
+        if not pending_categories:
+            break
+        print(f"🔁 第{round_num}轮请求 {len(pending_categories)} 个替代题目...")
+        candidates = generate_replacement_topics(expanded_keywords, language, len(pending_categories), avoid_topics, locale)
+        current = [topic for topics in result.values() for topic in topics]
+        with _index_lock:
+            screened, rejected_again = screen_topics(index, current + candidates)
+        new_topics = [topic for topic in screened if topic not in current]
+        avoid_topics.extend(item['topic'] for item in rejected_again)
+
+        for topic in new_topics:
+            if not pending_categories:
+                break
+            result[pending_categories.pop(0)].append(topic)
+
+    if pending_categories:
+        print(f"⚠️ 仍有 {len(pending_categories)} 个题目无法找到不重复的替代")
+
+    return result
+
 def extract_category_topics(content: str, start_delimiter: str, end_delimiter: str) -> List[str]:
     """从分隔符中提取分类题目"""
     try:
@@ -657,29 +1054,94 @@ def generate_unique_slug(base_slug, locale):
     counter = 1
     
     while True:
-        result = supabase.table("posts").select("slug").eq("slug", slug).eq("locale", locale).execute()
-        if not result.data:
+        if not get_post_store().find_posts("slug", slug=slug, locale=locale, limit=1):
             break
         slug = f"{base_slug}-{counter}"
         counter += 1
         
     return slug
 
-def generate_article(topic, language, locale, keywords_context=""):
-    """生成单篇文章，带重试机制"""
-    max_retries = 2  # 最多重试2次
+class TargetReached(Exception):
+    """本轮已插入足够的文章，多生成的文章不再入库"""
+
+class InsertReservation:
+    """插入名额：超额并发生成时，保证成功插入的文章数不超过目标篇数"""
+
+    def __init__(self, target: int):
+        self.target = target
+        self.reserved = 0
+        self.inserted = 0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """插入前占用一个名额，名额已满返回 False"""
+        with self.lock:
+            if self.reserved >= self.target:
+                return False
+            self.reserved += 1
+            return True
+
+    def confirm(self):
+        with self.lock:
+            self.inserted += 1
+
+    def release(self):
+        """插入失败时归还名额"""
+        with self.lock:
+            self.reserved -= 1
+
+    def reached(self) -> bool:
+        with self.lock:
+            return self.inserted >= self.target
+
+def generate_article(topic, language, locale, keywords_context="", reservation: InsertReservation = None):
+    """生成单篇文章，带重试机制；预计超出 token 预算时跳过"""
+    if not get_token_budget().allow_article():
+        return {
+            "success": False,
+            "skipped": True,
+            "topic": topic,
+            "error": get_token_budget().exhausted_reason or "Token 预算不足",
+        }
+    try:
+        return _generate_article_with_retries(topic, language, locale, keywords_context, reservation)
+    finally:
+        get_token_budget().record_article()
+
+# 单篇文章生成失败后最多重试的次数
+ARTICLE_MAX_RETRIES = 2
+
+def retryable_article_error(error) -> str:
+    """可以重新生成解决的失败返回原因说明，其余返回 None"""
+    error_msg = str(error)
+    if "格式标记" in error_msg:
+        return "格式标记问题"
+    if "内容重复" in error_msg:
+        return "与现有文章重复"
+    return None
+
+def _generate_article_with_retries(topic, language, locale, keywords_context="", reservation: InsertReservation = None):
+    max_retries = ARTICLE_MAX_RETRIES
 
     for attempt in range(max_retries + 1):
         try:
             if attempt > 0:
                 print(f"🔄 第{attempt + 1}次尝试生成文章: {topic}")
 
-            return _generate_article_attempt(topic, language, locale, keywords_context)
+            return _generate_article_attempt(topic, language, locale, keywords_context, reservation)
 
+        except TargetReached as e:
+            print(f"⏭️ {e}，跳过: {topic}")
+            return {
+                "success": False,
+                "skipped": True,
+                "topic": topic,
+                "error": str(e),
+            }
         except Exception as e:
-            error_msg = str(e)
-            if "格式标记" in error_msg and attempt < max_retries:
-                print(f"⚠️ 第{attempt + 1}次尝试失败（格式标记问题），准备重试...")
+            reason = retryable_article_error(e)
+            if reason and attempt < max_retries:
+                print(f"⚠️ 第{attempt + 1}次尝试失败（{reason}），准备重新生成...")
                 continue
             else:
                 # 最后一次尝试失败，或者非格式标记问题
@@ -690,29 +1152,40 @@ def generate_article(topic, language, locale, keywords_context=""):
                     "error": str(e),
                 }
 
-def _generate_article_attempt(topic, language, locale, keywords_context=""):
-    """单次文章生成尝试"""
+def _generate_article_attempt(topic, language, locale, keywords_context="", reservation: InsertReservation = None):
+    """单次文章生成尝试：起草 → 校验 → 入库"""
+    if reservation and reservation.reached():
+        raise TargetReached("已达到目标篇数")
     print(f"正在生成{language}文章: {topic}")
 
-    # 获取现有文章作为内链参考
-    existing_posts = supabase.table("posts").select("title, slug, locale").eq("status", "online").eq("locale", locale).limit(10).execute()
+    internal_links_text = get_internal_links_text(locale)
+    if ARTICLE_GENERATION_MODE == "sections":
+        draft = draft_article_sections(topic, language, locale, keywords_context, internal_links_text)
+    else:
+        draft = draft_article_single(topic, language, locale, keywords_context, internal_links_text)
+    draft = validate_article_draft(draft, locale)
+    return persist_article(draft, topic, language, locale, reservation)
+
+def get_internal_links_text(locale):
+    """获取现有文章作为内链参考"""
+    existing_posts = get_post_store().find_posts("title, slug, locale", status="online", locale=locale, limit=10)
 
     internal_links_text = ""
-    if existing_posts.data:
+    if existing_posts:
         if locale == "en":
             internal_links_text = "\n## Existing Articles (for internal linking):\n"
-            for post in existing_posts.data:
+            for post in existing_posts:
                 url = f"{SITE_URL}/posts/{post['slug']}"
                 internal_links_text += f"- [{post['title']}]({url})\n"
         else:
             internal_links_text = "\n## 现有文章列表（用于内链参考）：\n"
-            for post in existing_posts.data:
-                url = f"{SITE_URL}/zh/posts/{post['slug']}"
+            for post in existing_posts:
+                url = f"{SITE_URL}/{locale}/posts/{post['slug']}"
                 internal_links_text += f"- [{post['title']}]({url})\n"
+    return internal_links_text
 
-    model = GenerativeModel("gemini-2.5-flash-preview-05-20")
-
-    # 构建关键词上下文
+def build_keywords_section(keywords_context):
+    """构建关键词上下文"""
     keywords_section = ""
     if keywords_context:
         keywords_section = f"""
@@ -726,6 +1199,17 @@ def _generate_article_attempt(topic, language, locale, keywords_context=""):
 - 在标题、小标题和正文中合理分布关键词
 - 确保关键词使用不影响内容的自然性和可读性
 - 优先使用长尾关键词和语义相关的词汇"""
+    return keywords_section
+
+def draft_article_single(topic, language, locale, keywords_context, internal_links_text):
+    """一次调用生成完整文章，返回解析后的 title/slug/description/content"""
+    prompt = build_article_prompt(topic, language, locale, keywords_context, internal_links_text)
+    result = generate_content(prompt, stage="article", locale=locale, hedge_key=locale, validate=has_article_markers)
+    return parse_article_response(result.text, topic)
+
+def build_article_prompt(topic, language, locale, keywords_context, internal_links_text):
+    """构建单次生成完整文章的提示词"""
+    keywords_section = build_keywords_section(keywords_context)
 
     # 根据语言和地区设置提示词
     if locale == "en":
@@ -998,9 +1482,10 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
 
         (内部唯一性标识: {int(time.time())})"""
 
-    result = model.generate_content(prompt)
-    text = result.text
+    return prompt
 
+def parse_article_response(text, topic):
+    """解析整篇文章的分隔标记，返回草稿"""
     if not text:
         raise Exception("AI未能生成有效内容")
 
@@ -1021,6 +1506,145 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
         print("⚠️ 内容解析失败，使用原始文本并清理格式标记")
         content = clean_content_markers(text)
 
+    return {"title": title, "slug": slug, "description": description, "content": content, "stage": "article"}
+
+def draft_article_outline(topic, language, locale, keywords_context):
+    """生成文章大纲：标题、slug、描述和H2章节列表"""
+    prompt = f"""你是一位资深的SEO文章创作者，专注于 KuaishouVideoDownload（快手视频下载器）相关内容创作。
+
+## 任务
+为以下题目规划一篇1000-1500字的SEO博客文章大纲：{topic}
+
+{build_keywords_section(keywords_context)}
+
+## 语言要求
+标题、描述和章节标题使用{language}；slug使用英文
+
+## 输出格式
+===TITLE_START===
+[SEO优化的标题，最多60个字符]
+===TITLE_END===
+
+===SLUG_START===
+[URL友好的英文slug，例如：kuaishou-video-download-guide]
+===SLUG_END===
+
+===DESCRIPTION_START===
+[元描述，150-160个字符]
+===DESCRIPTION_END===
+
+===SECTIONS_START===
+[5-7个H2章节标题，每行一个，不带编号和#号；第一个为引入，最后一个为总结]
+===SECTIONS_END===
+
+(唯一性标识: {int(time.time())})"""
+
+    result = generate_content(prompt, stage="outline", locale=locale, hedge_key=f"{locale}:outline", validate=lambda r: response_contains(r, "===SECTIONS_END==="))
+    text = result.text
+    if not text:
+        raise Exception("AI未能生成有效大纲")
+
+    title = extract_delimiter_content(text, "===TITLE_START===", "===TITLE_END===") or topic
+    sections = [
+        re.sub(r'^(#+|\d+\.)\s*', '', line.strip()).strip()
+        for line in (extract_delimiter_content(text, "===SECTIONS_START===", "===SECTIONS_END===") or "").split('\n')
+    ]
+    sections = [section for section in sections if section]
+    if len(sections) < 3:
+        raise Exception("大纲缺少格式标记或章节过少，需要重新生成")
+
+    return {
+        "title": title,
+        "slug": extract_delimiter_content(text, "===SLUG_START===", "===SLUG_END===") or generate_slug(title),
+        "description": extract_delimiter_content(text, "===DESCRIPTION_START===", "===DESCRIPTION_END===") or f"关于{title}的详细指南",
+        "sections": sections,
+    }
+
+def draft_article_section(outline, index, language, locale, keywords_context, links: List[str], external_link: bool):
+    """生成大纲中的单个章节正文（不含H2标题）"""
+    sections = outline["sections"]
+    heading = sections[index]
+    outline_text = '\n'.join(f"{i + 1}. {section}" for i, section in enumerate(sections))
+    words = max(120, 1300 // len(sections))
+    links_text = ""
+    if links:
+        links_text = "## 内链要求\n在本节正文中自然插入以下现有文章链接，使用描述性锚文本：\n" + '\n'.join(links)
+    external_text = "- 可包含1个指向权威网站（与快手、视频下载或社交媒体相关）的外部链接" if external_link else "- 不要添加外部链接"
+
+    prompt = f"""你是一位资深的SEO文章创作者，正在撰写文章《{outline['title']}》中的一节。
+
+## 全文大纲
+{outline_text}
+
+## 任务
+只撰写第{index + 1}节「{heading}」的正文，约{words}字，不要重复其他章节的内容。
+
+## 要求
+- 语言：{language}
+- 使用Markdown格式，可使用H3小标题，不要输出本节的H2标题
+- 自然流畅的写作风格，避免AI生成的痕迹
+{external_text}
+
+{links_text}
+
+{build_keywords_section(keywords_context)}
+
+## 输出格式
+===SECTION_START===
+[本节正文]
+===SECTION_END===
+
+(唯一性标识: {int(time.time())})"""
+
+    result = generate_content(prompt, stage="section", locale=locale, hedge_key=f"{locale}:section",
+                              validate=lambda r: response_contains(r, "===SECTION_END==="))
+    text = result.text
+    if not text:
+        raise Exception(f"章节「{heading}」生成失败")
+    body = extract_delimiter_content(text, "===SECTION_START===", "===SECTION_END===") or clean_content_markers(text)
+    return f"## {heading}\n\n{body.strip()}"
+
+def draft_article_sections(topic, language, locale, keywords_context, internal_links_text):
+    """先生成大纲，再并发生成各章节并拼接为完整文章；耗时接近最慢的单个章节"""
+    outline = draft_article_outline(topic, language, locale, keywords_context)
+    sections = outline["sections"]
+    print(f"🧩 大纲: {len(sections)} 个章节，开始并发生成...")
+
+    # 内链轮流分配到中间章节，外链放在第2节和倒数第2节
+    links = [line for line in internal_links_text.split('\n') if line.startswith('- [')]
+    body_indexes = list(range(1, len(sections) - 1)) or list(range(len(sections)))
+    assigned_links = {i: [] for i in range(len(sections))}
+    for n, link in enumerate(links[:max(3, len(body_indexes))]):
+        assigned_links[body_indexes[n % len(body_indexes)]].append(link)
+    external_indexes = {body_indexes[0], body_indexes[-1]}
+
+    with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+        futures = [
+            executor.submit(draft_article_section, outline, i, language, locale, keywords_context,
+                            assigned_links[i], i in external_indexes)
+            for i in range(len(sections))
+        ]
+        bodies = [future.result() for future in futures]
+
+    content = f"# {outline['title']}\n\n" + '\n\n'.join(bodies)
+    return {"title": outline["title"], "slug": outline["slug"], "description": outline["description"],
+            "content": content, "stage": "section"}
+
+def validate_article_draft(draft, locale):
+    """清理并校验草稿，不合格时抛出异常（由 generate_article 决定是否重试）；结果计入产出该草稿的阶段/模型画像"""
+    stage = draft.get("stage", "article")
+    model = model_router.resolve(stage, locale)["model"]
+    try:
+        checked = _check_article_draft(draft, locale)
+    except Exception:
+        model_profiler.record_validation(stage, model, False)
+        raise
+    model_profiler.record_validation(stage, model, True)
+    return checked
+
+def _check_article_draft(draft, locale):
+    title, slug, description, content = draft["title"], draft["slug"], draft["description"], draft["content"]
+
     # 二次验证和清理所有字段
     title = validate_and_clean_content(title, "标题")
     description = validate_and_clean_content(description, "描述")
@@ -1040,11 +1664,28 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
     if not final_validation_result["valid"]:
         raise Exception(f"内容验证失败: {final_validation_result['reason']}")
 
-    # 生成唯一slug
-    final_slug = generate_unique_slug(slug, locale)
-
-    # 获取封面图片 - 使用短视频相关关键词
-    cover_url = get_unsplash_image("short video")
+    # 正文近似去重 - 与已发布文章的 SimHash 汉明距离过近时重新生成
+    duplicate = get_content_index(locale).find_duplicate(content)
+    if duplicate:
+        raise Exception(f"内容重复: 与现有文章 {duplicate['key']} 近似（汉明距离 {duplicate['distance']}）")
+
+    return {"title": title, "slug": slug, "description": description, "content": content}
+
+def enrich_article(draft, locale, cover_url: str = None):
+    """生成唯一slug并获取封面（未提供时），返回补全后的草稿"""
+    return dict(draft,
+                slug=generate_unique_slug(draft["slug"], locale),
+                # 获取封面图片 - 使用短视频相关关键词
+                cover_url=cover_url or get_unsplash_image("short video"),
+                enriched=True)
+
+def persist_article(draft, topic, language, locale, reservation: InsertReservation = None,
+                    cover_url: str = None, extra_fields: Dict[str, Any] = None):
+    """写入数据库（草稿未经 enrich_article 时先生成唯一slug、获取封面），成功后更新本地索引"""
+    if not draft.get("enriched"):
+        draft = enrich_article(draft, locale, cover_url)
+    title, final_slug, description, content = draft["title"], draft["slug"], draft["description"], draft["content"]
+    cover_url = draft["cover_url"]
 
     # 为文章添加随机的时间偏移，让发布时间更自然
     publish_time = datetime.now()
@@ -1053,8 +1694,8 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
     publish_time = publish_time.replace(hour=max(0, publish_time.hour - random_hours_back % 24))
     publish_time = publish_time.replace(minute=max(0, publish_time.minute - random_minutes_back % 60))
 
-    # 插入到数据库
-    post_uuid = str(uuid.uuid4())
+    # 插入到数据库（extra_fields 可指定确定性的 uuid，用于幂等入库）
+    post_uuid = (extra_fields or {}).get("uuid") or str(uuid.uuid4())
     insert_data = {
             "uuid": post_uuid,
             "slug": final_slug,
@@ -1069,11 +1710,36 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
             "author_name": "KuaishouVideoDownload Team",
             "author_avatar_url": "https://www.kuaishou-video-download.com/logo.png"
         }
+    insert_data.update(extra_fields or {})
 
-    result = supabase.table("posts").insert(insert_data).execute()
+    if reservation and not reservation.acquire():
+        raise TargetReached("已达到目标篇数")
+    try:
+        inserted = get_post_store().insert_post(insert_data)
+    except Exception:
+        if reservation:
+            reservation.release()
+        raise
+    if reservation:
+        if inserted:
+            reservation.confirm()
+        else:
+            reservation.release()
 
-    if result.data:
+    if inserted:
         print(f"✅ {language}文章生成成功: {title}")
+
+        # 更新本地题目和正文索引，后续筛查可以立即看到这篇文章
+        try:
+            with _index_lock:
+                topic_index = get_topic_index(locale)
+                topic_index.add(final_slug, title)
+                topic_index.save()
+                content_index = get_content_index(locale)
+                content_index.add(final_slug, content)
+                content_index.save()
+        except Exception as e:
+            print(f"⚠️ 本地索引更新失败: {e}")
         return {
             "success": True,
             "topic": topic,
@@ -1085,98 +1751,704 @@ Harap buat konten yang alami dan lancar yang menghindari jejak AI-generated yang
     else:
         raise Exception("数据库插入失败")
 
-def generate_keyword_driven_articles(language: str, locale: str, target_count: int = 5) -> Dict[str, Any]:
-    """关键词驱动的文章生成流程"""
+def fetch_translation_slug_map(locale: str) -> Dict[str, str]:
+    """英文原文slug到目标语言译文slug的映射，用于改写译文中的站内链接"""
+    store = get_post_store()
+    translations = store.find_posts("slug, source_uuid", locale=locale, translated=True)
+    if not translations:
+        return {}
+    by_source = {row["source_uuid"]: row["slug"] for row in translations}
+    sources = store.find_posts("uuid, slug", uuids=list(by_source))
+    return {row["slug"]: by_source[row["uuid"]] for row in sources}
+
+def fetch_source_posts(uuids: List[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+    """获取待翻译的英文文章：指定uuid，或最近发布的 limit 篇"""
+    fields = "uuid, slug, title, description, content, cover_url"
+    if uuids is not None:
+        return get_post_store().find_posts(fields, locale="en", status="online", uuids=uuids)
+    return get_post_store().find_posts(fields, locale="en", status="online", order="id", desc=True, limit=limit)
+
+def translate_post(source: Dict[str, Any], language: str, locale: str, slug_map: Dict[str, str]) -> Dict[str, Any]:
+    """把一篇英文文章翻译为目标语言并入库，译文通过 source_uuid 关联原文；预计超出 token 预算时跳过"""
+    if not get_token_budget().allow_article():
+        return {"success": False, "skipped": True, "topic": source["slug"], "error": get_token_budget().exhausted_reason or "Token 预算不足"}
     try:
-        print(f"\n🎯 开始{language}关键词驱动的内容生成流程（目标：{target_count}篇）...")
+        print(f"🌐 翻译为{language}: {source['title']}")
+        # 标题、描述和各章节作为独立片段，分批并发翻译
+        parts = [source["title"], source["description"]] + split_sections(source["content"])
+        batches = batch_parts(parts, TRANSLATION_BATCH_CHARS)
+
+        def translate_batch(indexes):
+            batch = [parts[i] for i in indexes]
+            result = generate_content(build_translation_prompt(batch, language), stage="translate", locale=locale,
+                                      hedge_key=f"{locale}:translate",
+                                      validate=lambda r: response_contains(r, f"===PART_{len(batch)}_END==="))
+            return parse_translation(result.text or "", len(batch))
+
+        with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+            translated = [part for batch in executor.map(translate_batch, batches) for part in batch]
+
+        content = rewrite_internal_links('\n\n'.join(translated[2:]), SITE_URL, locale, slug_map)
+        draft = validate_article_draft({
+            "title": translated[0],
+            "slug": source["slug"],
+            "description": translated[1],
+            "content": content,
+            "stage": "translate",
+        }, locale)
+        result = persist_article(draft, f"translation:{source['slug']}", language, locale,
+                                 cover_url=source.get("cover_url"), extra_fields={"source_uuid": source["uuid"]})
+        slug_map[source["slug"]] = result["slug"]
+        print(f"   ✅ {len(batches)} 次翻译请求完成 {len(parts)} 个片段")
+        return result
+    except Exception as e:
+        print(f"❌ {language}翻译失败 '{source['slug']}': {e}")
+        return {"success": False, "topic": source["slug"], "error": str(e)}
+    finally:
+        get_token_budget().record_article()
+
+def fan_out_translations(source_posts: List[Dict[str, Any]], locales: List[str] = None) -> Dict[str, Dict[str, int]]:
+    """把英文文章翻译扩散到其他语言，已有译文（相同 source_uuid）的跳过"""
+    locales = validate_fanout_locales(locales) if locales else TRANSLATION_FANOUT_LOCALES
+    stats = {}
+    if not source_posts:
+        return stats
+    for locale in locales:
+        language = language_for_locale(locale)
+        existing = get_post_store().find_posts("source_uuid", locale=locale,
+                                               source_uuids=[p["uuid"] for p in source_posts])
+        done = {row["source_uuid"] for row in existing}
+        pending = [post for post in source_posts if post["uuid"] not in done]
+        print(f"\n🌐 {language}翻译扩散: 待翻译 {len(pending)} 篇（已有译文 {len(done)} 篇）")
+
+        slug_map = fetch_translation_slug_map(locale)
+        with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as executor:
+            results = list(executor.map(lambda post: translate_post(post, language, locale, slug_map), pending))
+        stats[locale] = {
+            "success": sum(1 for r in results if r["success"]),
+            "failure": sum(1 for r in results if not r["success"] and not r.get("skipped")),
+            "skipped": len(done) + sum(1 for r in results if r.get("skipped")),
+        }
+        print(f"✅ {language}翻译完成: 成功 {stats[locale]['success']} 篇，失败 {stats[locale]['failure']} 篇")
+    print_token_summary()
+    model_profiler.print_report()
+    model_profiler.save_report(sandbox_path('model_profile.json'))
+    return stats
+
+def print_token_summary():
+    """打印本次运行的 token 用量（按 阶段@语言）和预算状态"""
+    if llm_cache.enabled:
+        print(f"🗄️ LLM响应缓存: {llm_cache.summary()}")
+    if http_cassette:
+        print(f"📼 HTTP cassette: {http_cassette.summary()}")
+    summary = get_token_budget().summary()
+    print(f"💰 Token 用量: 输入 {summary['prompt_tokens']}，输出 {summary['output_tokens']}，合计 {summary['total_tokens']}")
+    for key, entry in summary["by_stage"].items():
+        print(f"   {key:<24}{entry['calls']:>5} 次  输入 {entry['prompt_tokens']:>9}  输出 {entry['output_tokens']:>9}")
+    if summary["budget_exhausted"]:
+        print(f"   ⛔ {summary['budget_exhausted']}")
+
+def research_topics(language: str, locale: str, target_count: int) -> Dict[str, Any]:
+    """关键词研究阶段：种子词 → Google扩展 → 分类题目 → 去重，返回待生成的题目"""
+    # 步骤1: 从关键词库获取种子关键词（库存不足时由AI补充）
+    print(f"\n📊 步骤1: 获取{language}种子关键词")
+    keyword_bank = get_keyword_bank()
+    seed_keywords = get_seed_keywords(language, locale, max(6, target_count))
+
+    if not seed_keywords:
+        print(f"❌ {language}种子关键词生成失败")
+        return None
 
-        # 步骤1: 生成种子关键词
-        print(f"\n📊 步骤1: 生成{language}种子关键词")
-        seed_keywords = generate_seed_keywords(language, max(6, target_count))
+    print(f"🔑 {language}种子关键词:")
+    for i, keyword in enumerate(seed_keywords, 1):
+        print(f"   {i}. {keyword}")
+
+    # 步骤2: 使用Google自动完成扩展关键词
+    print(f"\n🔍 步骤2: 扩展{language}关键词")
+    expanded_keywords = expand_keywords_with_google(seed_keywords, 5)
+    keyword_bank.add_expansions(locale, expanded_keywords)
+
+    print(f"\n📈 {language}扩展后的关键词集合:")
+    total_keywords = 0
+    for seed, suggestions in expanded_keywords.items():
+        print(f"   🌱 {seed}: {len(suggestions)}个建议")
+        total_keywords += len(suggestions)
+    print(f"   总计: {len(seed_keywords)}个种子关键词 → {total_keywords}个扩展关键词")
+
+    # 步骤3: 基于关键词生成分类文章题目
+    print(f"\n📝 步骤3: 生成{language}分类文章题目")
+    with _index_lock:
+        covered_texts = get_topic_index(locale).texts()
+    categorized_topics = generate_categorized_topics_by_keywords_with_count(
+        expanded_keywords, language, target_count, covered_texts, keyword_bank.usage_history(locale), locale=locale
+    )
+
+    # 步骤3.5: 过滤与已发布文章近似的题目
+    print(f"\n🧹 步骤3.5: 检查{language}题目是否与已发布文章重复")
+    categorized_topics = dedupe_categorized_topics(categorized_topics, expanded_keywords, language, locale)
+
+    print(f"\n📚 {language}生成的分类文章题目:")
+    all_topics = []
+    for category, topics in categorized_topics.items():
+        print(f"   📂 {category}: {len(topics)}个题目")
+        for topic in topics:
+            print(f"      • {topic}")
+            all_topics.append((category, topic))
+
+    # 限制文章数量到目标数量
+    if len(all_topics) > target_count:
+        all_topics = all_topics[:target_count]
+        print(f"📏 限制文章数量到目标数量: {target_count}篇")
+
+    return {
+        "seed_keywords": seed_keywords,
+        "expanded_keywords": expanded_keywords,
+        "total_keywords": total_keywords,
+        "categorized_topics": categorized_topics,
+        "all_topics": all_topics,
+        # 构建关键词上下文
+        "keywords_context": build_keywords_context(expanded_keywords),
+    }
+
+def build_article_pipeline(language: str, locale: str, keywords_context: str, reservation: InsertReservation,
+                           on_result=None) -> Pipeline:
+    """文章流水线：生成（LLM）→ 校验 → 补全（唯一slug、封面）→ 入库
+
+    封面不依赖正文，题目进入生成阶段时即在后台预取；校验失败且可重试的条目送回生成阶段；
+    条目为 {"topic", "category", "attempt"}，结果格式与 generate_article 相同
+    """
+    # 内链参考对同一批文章相同，只查询一次
+    internal_links_text = get_internal_links_text(locale)
+    cover_executor = ThreadPoolExecutor(max_workers=PIPELINE_ENRICH_WORKERS, thread_name_prefix="cover")
+
+    def finish(item, result):
+        if item.get("budgeted"):
+            get_token_budget().record_article()
+        return result
+
+    def skipped(item, reason):
+        print(f"⏭️ {reason}，跳过: {item['topic']}")
+        return finish(item, {"success": False, "skipped": True, "topic": item["topic"], "error": reason})
+
+    def generate(item):
+        if reservation.reached():
+            return Finished(skipped(item, "已达到目标篇数"))
+        if item["attempt"] == 0:
+            if not get_token_budget().allow_article():
+                return Finished(skipped(item, get_token_budget().exhausted_reason or "Token 预算不足"))
+            item = dict(item, budgeted=True, cover=cover_executor.submit(get_unsplash_image, "short video"))
+            print(f"\n📝 生成文章: {item['topic']} (分类: {item['category']})")
+        else:
+            print(f"🔄 第{item['attempt'] + 1}次尝试生成文章: {item['topic']}")
+        try:
+            if ARTICLE_GENERATION_MODE == "sections":
+                draft = draft_article_sections(item["topic"], language, locale, keywords_context, internal_links_text)
+            else:
+                draft = draft_article_single(item["topic"], language, locale, keywords_context, internal_links_text)
+        except Exception as e:
+            retry_or_raise(item, e)
+        return dict(item, draft=draft)
+
+    def retry_or_raise(item, error):
+        """可重新生成解决的失败（格式标记、内容重复）在重试次数内送回生成阶段，其余交给 on_error"""
+        reason = retryable_article_error(error)
+        if reason and item["attempt"] < ARTICLE_MAX_RETRIES:
+            print(f"⚠️ 第{item['attempt'] + 1}次尝试失败（{reason}），准备重新生成...")
+            raise Retry("generate", dict(item, attempt=item["attempt"] + 1))
+        raise error
+
+    def validate(item):
+        try:
+            return dict(item, draft=validate_article_draft(item["draft"], locale))
+        except Exception as e:
+            retry_or_raise(item, e)
+
+    def enrich(item):
+        if reservation.reached():
+            return Finished(skipped(item, "已达到目标篇数"))
+        return dict(item, draft=enrich_article(item["draft"], locale, item["cover"].result()))
 
-        if not seed_keywords:
-            print(f"❌ {language}种子关键词生成失败")
+    def persist(item):
+        try:
+            return finish(item, persist_article(item["draft"], item["topic"], language, locale, reservation))
+        except TargetReached as e:
+            return skipped(item, str(e))
+
+    def on_error(item, error):
+        print(f"❌ {language}文章生成失败 '{item['topic']}': {error}")
+        return finish(item, {"success": False, "topic": item["topic"], "error": str(error)})
+
+    return Pipeline([
+        Stage("generate", generate, workers=LLM_MAX_CONCURRENCY * key_pool.size),
+        Stage("validate", validate, workers=PIPELINE_VALIDATE_WORKERS),
+        Stage("enrich", enrich, workers=PIPELINE_ENRICH_WORKERS),
+        Stage("persist", persist, workers=PIPELINE_PERSIST_WORKERS),
+    ], queue_size=PIPELINE_QUEUE_SIZE, on_error=on_error, on_result=on_result, on_close=cover_executor.shutdown)
+
+def generate_keyword_driven_articles(language: str, locale: str, target_count: int = 5,
+                                     overprovision: int = None, batch: bool = None) -> Dict[str, Any]:
+    """关键词驱动的文章生成流程
+
+    overprovision（默认 ARTICLE_OVERPROVISION）大于0时多准备 k 个题目并发生成，
+    成功插入 target_count 篇后取消尚未开始的文章，进行中的文章在插入前被名额拦下；
+    batch（默认 ARTICLE_BATCH_MODE）为真时改为提交批处理任务，完成后统一入库
+    """
+    overprovision = ARTICLE_OVERPROVISION if overprovision is None else overprovision
+    if ARTICLE_BATCH_MODE if batch is None else batch:
+        job_id = submit_article_batch(language, locale, target_count, overprovision)
+        if not job_id:
+            return {"success": 0, "failure": 0, "topics": [], "results": []}
+        return ingest_article_batch(job_id)
+    try:
+        print(f"\n🎯 开始{language}关键词驱动的内容生成流程（目标：{target_count}篇"
+              f"{f'，超额准备 {overprovision} 个题目' if overprovision else ''}）...")
+
+        research = research_topics(language, locale, target_count + overprovision)
+        if not research:
             return {"success": 0, "failure": 0, "topics": [], "results": []}
 
-        print(f"🔑 {language}种子关键词:")
-        for i, keyword in enumerate(seed_keywords, 1):
-            print(f"   {i}. {keyword}")
-
-        # 步骤2: 使用Google自动完成扩展关键词
-        print(f"\n🔍 步骤2: 扩展{language}关键词")
-        expanded_keywords = expand_keywords_with_google(seed_keywords, 5)
-
-        print(f"\n📈 {language}扩展后的关键词集合:")
-        total_keywords = 0
-        for seed, suggestions in expanded_keywords.items():
-            print(f"   🌱 {seed}: {len(suggestions)}个建议")
-            total_keywords += len(suggestions)
-        print(f"   总计: {len(seed_keywords)}个种子关键词 → {total_keywords}个扩展关键词")
-
-        # 步骤3: 基于关键词生成分类文章题目
-        print(f"\n📝 步骤3: 生成{language}分类文章题目")
-        categorized_topics = generate_categorized_topics_by_keywords_with_count(expanded_keywords, language, target_count)
-
-        print(f"\n📚 {language}生成的分类文章题目:")
-        all_topics = []
-        for category, topics in categorized_topics.items():
-            print(f"   📂 {category}: {len(topics)}个题目")
-            for topic in topics:
-                print(f"      • {topic}")
-                all_topics.append((category, topic))
-
-        # 限制文章数量到目标数量
-        if len(all_topics) > target_count:
-            all_topics = all_topics[:target_count]
-            print(f"📏 限制文章数量到目标数量: {target_count}篇")
+        keyword_bank = get_keyword_bank()
+        seed_keywords = research["seed_keywords"]
+        all_topics = research["all_topics"]
+        keywords_context = research["keywords_context"]
 
         # 步骤4: 执行文章生成
         print(f"\n🚀 步骤4: 开始生成{language}文章...")
 
-        # 构建关键词上下文
-        keywords_context = build_keywords_context(expanded_keywords)
-
         results = []
         success_count = 0
         failure_count = 0
-
-        for category, topic in all_topics:
-            topic_to_use = topic
-
-            print(f"\n📝 生成文章: {topic_to_use} (分类: {category})")
-            result = generate_article(topic_to_use, language, locale, keywords_context)
-            results.append(result)
-
-            if result["success"]:
-                success_count += 1
-                print(f"✅ 成功: {result['title']}")
-            else:
-                failure_count += 1
-                print(f"❌ 失败: {result.get('error', '未知错误')}")
-
-            # 延迟避免API限制
-            time.sleep(3)
+        skipped_count = 0
+        reservation = InsertReservation(target_count)
+
+        results_lock = threading.Lock()
+
+        def handle_result(result):
+            nonlocal success_count, failure_count, skipped_count
+            with results_lock:
+                results.append(result)
+                if result["success"]:
+                    success_count += 1
+                    print(f"✅ 成功: {result['title']}")
+                    keyword_bank.record_article(locale, seed_keywords, result["uuid"], result["slug"])
+                elif result.get("skipped"):
+                    skipped_count += 1
+                else:
+                    failure_count += 1
+                    print(f"❌ 失败: {result.get('error', '未知错误')}")
+
+        if ARTICLE_PIPELINE:
+            # 分阶段流水线：达到目标篇数后不再送入新题目
+            pipeline = build_article_pipeline(language, locale, keywords_context, reservation, handle_result)
+            pipeline.run([{"topic": topic, "category": category, "attempt": 0} for category, topic in all_topics],
+                         stop_when=reservation.reached)
+            skipped_count += pipeline.unfed
+            print(f"🏭 流水线状态: {pipeline.summary()}")
+        else:
+            def generate_one(category, topic):
+                print(f"\n📝 生成文章: {topic} (分类: {category})")
+                return generate_article(topic, language, locale, keywords_context, reservation)
+
+            # 并发生成，实际在途LLM调用数由自适应限流器控制，不再固定间隔等待
+            with ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY) as executor:
+                futures = [executor.submit(generate_one, category, topic) for category, topic in all_topics]
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        skipped_count += 1
+                        continue
+                    handle_result(future.result())
+                    if reservation.reached():
+                        cancelled = sum(f.cancel() for f in futures)
+                        if cancelled:
+                            print(f"🎯 已达到目标 {target_count} 篇，取消 {cancelled} 个未开始的题目")
+
+        print(f"⚙️ 并发控制状态: {llm_limiter.snapshot()}")
+        if key_pool.size > 1:
+            print(f"🔑 密钥池状态: {key_pool.snapshot()}")
+        if LLM_HEDGING:
+            print(f"🪁 对冲统计: {hedger.summary()}")
+        print_token_summary()
+        model_profiler.print_report()
+        model_profiler.save_report(sandbox_path('model_profile.json'))
 
         print(f"\n🎉 {language}关键词驱动生成完成!")
         print(f"   📊 种子关键词: {len(seed_keywords)} 个")
-        print(f"   🔍 扩展关键词: {total_keywords} 个")
+        print(f"   📦 关键词库: {keyword_bank.stats(locale)}")
+        print(f"   🔍 扩展关键词: {research['total_keywords']} 个")
         print(f"   📝 成功生成文章: {success_count} 篇")
         print(f"   ❌ 失败: {failure_count} 篇")
+        if overprovision:
+            print(f"   ⏭️ 超额题目未使用: {skipped_count} 个")
 
         return {
             "success": success_count,
             "failure": failure_count,
+            "skipped": skipped_count,
             "topics": [topic for _, topic in all_topics],
             "results": results,
             "seed_keywords": seed_keywords,
-            "expanded_keywords": expanded_keywords,
-            "categorized_topics": categorized_topics
+            "expanded_keywords": research["expanded_keywords"],
+            "categorized_topics": research["categorized_topics"]
         }
 
     except Exception as e:
         print(f"❌ {language}关键词驱动生成失败: {e}")
         return {"success": 0, "failure": 0, "topics": [], "results": []}
 
+def run_batch_request(line: Dict[str, Any]) -> str:
+    """本地批处理的单条请求：与交互式生成共用模型路由、密钥池、限流和 token 预算"""
+    if not get_token_budget().allow_article():
+        raise Exception(get_token_budget().exhausted_reason or "Token 预算不足")
+    try:
+        prompt = line["request"]["contents"][0]["parts"][0]["text"]
+        response = generate_content(prompt, stage="article", locale=line["metadata"]["locale"], validate=has_article_markers)
+        return response.text
+    finally:
+        get_token_budget().record_article()
+
+_batch_processor = None
+
+def batch_root() -> str:
+    """批处理任务目录（dry-run 时使用沙盒目录）"""
+    return sandbox_path('batches') or BATCH_DIR
+
+def get_batch_processor() -> LocalBatchProcessor:
+    """批处理接口；当前使用本地执行的替身，请求行与 Gemini 批处理的JSONL格式一致"""
+    global _batch_processor
+    if _batch_processor is None:
+        _batch_processor = LocalBatchProcessor(run_batch_request, workers=LLM_MAX_CONCURRENCY * key_pool.size,
+                                               root=batch_root())
+    return _batch_processor
+
+def submit_article_batch(language: str, locale: str, target_count: int, overprovision: int = 0) -> str:
+    """关键词研究后把所有文章提示词写成JSONL任务文件并提交，返回任务ID"""
+    print(f"\n📦 {language}批量模式: 目标 {target_count} 篇{f'，超额准备 {overprovision} 个题目' if overprovision else ''}")
+    research = research_topics(language, locale, target_count + overprovision)
+    if not research or not research["all_topics"]:
+        print(f"❌ {language}没有可提交的题目")
+        return None
+
+    internal_links_text = get_internal_links_text(locale)
+    route = model_router.resolve("article", locale)
+    lines = []
+    for category, topic in research["all_topics"]:
+        prompt = build_article_prompt(topic, language, locale, research["keywords_context"], internal_links_text)
+        lines.append({
+            "key": topic_key(locale, topic),
+            "request": {
+                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "generation_config": route["generation_config"],
+            },
+            "metadata": {"topic": topic, "category": category, "language": language, "locale": locale},
+        })
+
+    job = BatchJob.create(lines, {
+        "language": language,
+        "locale": locale,
+        "target_count": target_count,
+        "model": route["model"],
+        "seed_keywords": research["seed_keywords"],
+    }, root=batch_root())
+    get_batch_processor().submit(job.job_id)
+    print(f"📤 已提交批处理任务 {job.job_id}: {len(lines)} 个请求（{job.job_path}）")
+    return job.job_id
+
+def ingest_article_batch(job_id: str, wait: bool = True) -> Dict[str, Any]:
+    """轮询批处理任务，把已完成的结果经 解析 → 校验 → slug → 入库 写入数据库
+
+    以题目为幂等键：每条结果对应确定性的文章 uuid，已入库（记录在 ingested.jsonl 或数据库中已存在）的跳过，
+    因此可以重复执行，也可以在任务未完成时先入库已有结果
+    """
+    job = BatchJob(job_id, batch_root())
+    manifest = job.load_manifest()
+    language, locale = manifest["language"], manifest["locale"]
+    processor = get_batch_processor()
+    state = wait_for_job(processor, job_id, BATCH_POLL_SECONDS, None if wait else 0)
+    print(f"\n📥 批处理任务 {job_id} 状态: {state}，开始入库")
+
+    requests_by_key = {line["key"]: line for line in job.requests()}
+    ingested = job.ingested()
+    keyword_bank = get_keyword_bank()
+    reservation = InsertReservation(manifest["target_count"])
+    for record in ingested.values():
+        if record.get("uuid"):
+            reservation.acquire()
+            reservation.confirm()
+
+    def ingest_one(result):
+        key = result["key"]
+        topic = requests_by_key[key]["metadata"]["topic"]
+        if ingested.get(key, {}).get("uuid"):
+            return {"success": False, "skipped": True, "topic": topic, "error": "已入库"}
+        if "error" in result:
+            return {"success": False, "topic": topic, "error": result["error"]}
+
+        if reservation.reached():
+            return {"success": False, "skipped": True, "topic": topic, "error": "已达到目标篇数"}
+
+        post_uuid = str(uuid.uuid5(uuid.NAMESPACE_URL, f"batch:{key}"))
+        try:
+            existing = get_post_store().find_posts("uuid, slug, title", uuids=[post_uuid])
+            if existing:
+                job.record_ingested({"key": key, "uuid": post_uuid, "slug": existing[0]["slug"]})
+                return {"success": False, "skipped": True, "topic": topic, "error": "已入库"}
+
+            draft = validate_article_draft(parse_article_response(result.get("text"), topic), locale)
+            article = persist_article(draft, topic, language, locale, reservation, extra_fields={"uuid": post_uuid})
+        except TargetReached as e:
+            return {"success": False, "skipped": True, "topic": topic, "error": str(e)}
+        except Exception as e:
+            job.record_ingested({"key": key, "error": str(e)})
+            print(f"❌ 入库失败 '{topic}': {e}")
+            return {"success": False, "topic": topic, "error": str(e)}
+        job.record_ingested({"key": key, "uuid": article["uuid"], "slug": article["slug"]})
+        keyword_bank.record_article(locale, manifest.get("seed_keywords", []), article["uuid"], article["slug"])
+        return article
+
+    with ThreadPoolExecutor(max_workers=HTTP_MAX_CONCURRENCY) as executor:
+        results = list(executor.map(ingest_one, processor.results(job_id)))
+
+    stats = {
+        "success": sum(1 for r in results if r["success"]),
+        "failure": sum(1 for r in results if not r["success"] and not r.get("skipped")),
+        "skipped": sum(1 for r in results if r.get("skipped")),
+        "pending": len(requests_by_key) - len(results),
+    }
+    print_token_summary()
+    print(f"🎉 批处理任务 {job_id} 入库完成: 成功 {stats['success']} 篇，失败 {stats['failure']} 篇，"
+          f"跳过 {stats['skipped']} 篇，未完成 {stats['pending']} 条")
+    return dict(stats, job_id=job_id, topics=[line["metadata"]["topic"] for line in requests_by_key.values()],
+                results=results, seed_keywords=manifest.get("seed_keywords", []))
+
+# 命令行语言参数：(别名, 语言名称, locale, 默认篇数)
+LANGUAGE_OPTIONS = [
+    (["chinese", "zh", "中文"], "Chinese (Simplified)", "zh", 5),
+    (["english", "en", "英文"], "English", "en", 10),
+    (["hindi", "hi", "हिंदी"], "Hindi", "hi", 8),
+    (["urdu", "ur", "bn", "اردو"], "Urdu", "bn", 3),
+    (["indonesian", "id", "bahasa"], "Indonesian", "id", 3),
+]
+
+def language_for_locale(locale: str):
+    """语言代码对应的语言名，不支持时返回 None"""
+    return next((language for _, language, option_locale, _ in LANGUAGE_OPTIONS if option_locale == locale), None)
+
+def validate_fanout_locales(locales: List[str]) -> List[str]:
+    """只保留可作为翻译目标的语言（LANGUAGE_OPTIONS 中除英文原文外的语言），其余告警并跳过"""
+    valid = []
+    for locale in locales:
+        if locale == "en" or language_for_locale(locale) is None:
+            print(f"⚠️ 不支持的翻译目标语言 '{locale}'，已跳过（可选: "
+                  f"{', '.join(l for _, _, l, _ in LANGUAGE_OPTIONS if l != 'en')}）")
+        else:
+            valid.append(locale)
+    return valid
+
+TRANSLATION_FANOUT_LOCALES = validate_fanout_locales(TRANSLATION_FANOUT_LOCALES)
+
+def resolve_language(name: str):
+    """将命令行语言参数解析为 (语言名称, locale, 默认篇数)，未知语言默认英文"""
+    for aliases, language, locale, default_count in LANGUAGE_OPTIONS:
+        if name.lower() in aliases:
+            return language, locale, default_count
+    return "English", "en", 10
+
+def create_topic_queue():
+    """按 TOPIC_QUEUE_BACKEND 创建题目队列（sqlite 本地共享 / supabase 跨runner共享，dry-run 时总是本地）"""
+    if os.getenv('TOPIC_QUEUE_BACKEND', 'sqlite').lower() == 'supabase' and not DRY_RUN:
+        return SupabaseTopicQueue(get_supabase(), deadline=SUPABASE_CALL_DEADLINE)
+    return SQLiteTopicQueue(sandbox_path('topic_queue.sqlite'))
+
+def enqueue_keyword_topics(language: str, locale: str, target_count: int, queue) -> int:
+    """执行关键词研究阶段，并把题目写入工作队列"""
+    print(f"\n🎯 开始{language}关键词研究并入队（目标：{target_count}篇）...")
+    research = research_topics(language, locale, target_count)
+    if not research:
+        return 0
+
+    items = [{
+        "locale": locale,
+        "language": language,
+        "category": category,
+        "topic": topic,
+        "payload": {
+            "keywords_context": research["keywords_context"],
+            "seed_keywords": research["seed_keywords"],
+        },
+    } for category, topic in research["all_topics"]]
+    added = queue.enqueue(items)
+    print(f"📥 {language}题目入队: 新增 {added} 个（重复 {len(items) - added} 个已忽略）")
+    print(f"📊 当前队列: {queue.depth(locale)}")
+    return added
+
+def run_topic_worker(queue, locales: List[str] = None, max_items: int = None,
+                     lease_seconds: int = DEFAULT_LEASE_SECONDS, stop_event: threading.Event = None,
+                     idle_wait: float = None, state: DaemonState = None) -> Dict[str, int]:
+    """从工作队列领取题目并生成文章，直到队列为空或达到数量上限
+
+    设置 idle_wait 时队列为空不退出，而是等待后继续领取，直到 stop_event 被设置（守护进程模式）
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    stats = {"success": 0, "failure": 0, "skipped": 0}
+    keyword_bank = get_keyword_bank()
+    stop_event = stop_event or threading.Event()
+
+    requeued = queue.requeue_expired()
+    print(f"👷 Worker {worker_id} 启动（语言: {locales or '全部'}，回收过期租约 {requeued} 个）")
+
+    while not stop_event.is_set() and (max_items is None or stats["success"] + stats["failure"] < max_items):
+        # 预算不足时不再领取题目，留在队列中等待下次运行（守护进程模式下等待每日预算恢复）
+        if get_token_budget().check():
+            if idle_wait is None:
+                print("💰 Token 预算不足，Worker退出")
+                break
+            stop_event.wait(idle_wait)
+            continue
+
+        item = queue.claim(worker_id, lease_seconds, locales)
+        if item is None:
+            if idle_wait is None:
+                print("📭 队列已空，Worker退出")
+                break
+            stop_event.wait(idle_wait)
+            continue
+
+        print(f"\n📝 领取题目 #{item['id']}（第{item['attempts']}次尝试）: {item['topic']}")
+        if state:
+            state.start_work(worker_id, item)
+
+        # 后台心跳续租，防止长时间生成期间租约过期被其他worker领取
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(lease_seconds / 3):
+                try:
+                    renewed = queue.heartbeat(item['id'], worker_id, lease_seconds)
+                except Exception as e:
+                    # 续租失败不退出心跳，下一轮再试（租约为心跳间隔的3倍）
+                    print(f"⚠️ 题目 #{item['id']} 续租失败，稍后重试: {e}")
+                    continue
+                if not renewed:
+                    print(f"⚠️ 题目 #{item['id']} 的租约已丢失")
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            payload = item["payload"]
+            result = generate_article(item["topic"], item["language"], item["locale"], payload.get("keywords_context", ""))
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        if result["success"]:
+            stats["success"] += 1
+            try:
+                queue.complete(item["id"], worker_id, {"uuid": result["uuid"], "slug": result["slug"], "title": result["title"]})
+            except Exception as e:
+                # 文章已入库，完成状态写入失败不中断 worker
+                print(f"⚠️ 题目 #{item['id']} 完成状态写入失败: {e}")
+            keyword_bank.record_article(item["locale"], payload.get("seed_keywords", []), result["uuid"], result["slug"])
+        elif result.get("skipped"):
+            # 未实际生成（如领取后预算耗尽），放回队列且不消耗尝试次数
+            stats["skipped"] += 1
+            queue.release(item["id"], worker_id)
+            print(f"⏭️ 题目 #{item['id']} 已放回队列: {result.get('error') or '跳过'}")
+            if state:
+                state.finish_work(worker_id, item, False, skipped=True)
+            # 跳过说明预算已不足，不立即领取下一个题目（避免反复领取、放回）
+            if idle_wait is None:
+                break
+            stop_event.wait(idle_wait)
+            continue
+        else:
+            stats["failure"] += 1
+            status = queue.fail(item["id"], worker_id, result.get("error") or "未知错误")
+            print(f"❌ 题目 #{item['id']} 失败，状态: {status}")
+        if state:
+            state.finish_work(worker_id, item, result["success"])
+
+    print(f"\n🏁 Worker {worker_id} 完成: 成功 {stats['success']} 篇，失败 {stats['failure']} 篇，放回队列 {stats['skipped']} 篇")
+    return stats
+
+def run_scheduled_enqueue(language: str, locale: str, target_count: int, queue, state: DaemonState):
+    """守护进程调度任务：队列中待处理题目不足时才做关键词研究补充"""
+    started = time.time()
+    pending = queue.depth(locale).get("queued", 0)
+    added = 0
+    if pending < target_count:
+        refresh_post_indexes(locale)
+        added = enqueue_keyword_topics(language, locale, target_count - pending, queue)
+    else:
+        print(f"⏭️ {language}队列中已有 {pending} 个待处理题目，跳过本轮关键词研究")
+    state.record_run(locale, {
+        "language": language,
+        "target_count": target_count,
+        "pending_before": pending,
+        "enqueued": added,
+        "duration_seconds": round(time.time() - started, 1),
+    })
+
+def run_daemon(schedule: str = None, workers: int = None, status_port: int = None):
+    """常驻运行：内部按语言定时（带抖动）补充题目队列，worker线程持续消费，并提供本地状态端点"""
+    schedule = schedule or os.getenv('DAEMON_SCHEDULE', 'en:10')
+    workers = workers or int(os.getenv('DAEMON_WORKERS', '2'))
+    status_port = status_port or int(os.getenv('DAEMON_STATUS_PORT', '8787'))
+    interval = float(os.getenv('DAEMON_INTERVAL_HOURS', '24')) * 3600
+    jitter = float(os.getenv('DAEMON_JITTER_MINUTES', '30')) * 60
+    idle_wait = float(os.getenv('DAEMON_IDLE_WAIT_SECONDS', '30'))
+
+    queue = create_topic_queue()
+    state = DaemonState()
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        print(f"\n🛑 收到信号 {signum}，等待进行中的文章完成后退出...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    server = start_status_server(status_port, lambda: dict(
+        state.snapshot(queue.depth()),
+        limiters={limiter.name: limiter.snapshot() for limiter in [llm_limiter, *http_limiters.values()]},
+        gemini_keys=key_pool.snapshot(),
+        hedging=hedger.summary() if LLM_HEDGING else None,
+        model_profile=model_profiler.report(),
+        token_budget=dict(get_token_budget().summary(), daily_total=get_token_budget().daily_total(),
+                          run_limit=TOKEN_RUN_BUDGET, daily_limit=TOKEN_DAILY_BUDGET),
+    ))
+    print(f"📡 状态端点: http://127.0.0.1:{status_port}/status")
+
+    scheduler = JitteredScheduler(state)
+    locales = []
+    for name, count in parse_schedule(schedule):
+        language, locale, default_count = resolve_language(name)
+        locales.append(locale)
+        target_count = count or default_count
+        scheduler.add(locale, interval, jitter,
+                      lambda l=language, loc=locale, c=target_count: run_scheduled_enqueue(l, loc, c, queue, state))
+        print(f"🗓️ {language}: 每 {interval / 3600:g} 小时补充 {target_count} 篇（抖动 ±{jitter / 60:g} 分钟）")
+
+    worker_threads = [
+        threading.Thread(target=run_topic_worker, kwargs={
+            "queue": queue, "locales": locales, "stop_event": stop_event,
+            "idle_wait": idle_wait, "state": state,
+        }, name=f"topic-worker-{i}")
+        for i in range(workers)
+    ]
+    for thread in worker_threads:
+        thread.start()
+
+    try:
+        scheduler.run(stop_event)
+    finally:
+        stop_event.set()
+        for thread in worker_threads:
+            thread.join()
+        server.shutdown()
+        print("👋 守护进程已退出")
+
 def main():
     """主函数 - 英文文章生成"""
     print("🚀 开始执行每日英文文章生成任务")
@@ -1193,24 +2465,37 @@ def main():
     print(f"📊 统计结果:")
     print(f"   🇺🇸 英文: 成功 {english_results['success']} 篇，失败 {english_results['failure']} 篇")
 
+    # 翻译扩散：把本次新增的英文文章翻译到其他语言
+    translation_results = {}
+    if TRANSLATION_FANOUT_LOCALES:
+        new_uuids = [r["uuid"] for r in english_results.get("results", []) if r.get("success")]
+        if new_uuids:
+            translation_results = fan_out_translations(fetch_source_posts(new_uuids))
+    translated = {locale: translation_results.get(locale, {"success": 0, "failure": 0}) for locale in ("hi", "bn", "id")}
+
     # 记录任务执行日志到数据库
     try:
+        tokens = get_token_budget().summary()
         log_data = {
             "execution_date": datetime.now().date().isoformat(),
             "english_success": english_results["success"],
             "english_failure": english_results["failure"],
-            "hindi_success": 0,
-            "hindi_failure": 0,
-            "bengali_success": 0,
-            "bengali_failure": 0,
-            "indonesian_success": 0,
-            "indonesian_failure": 0,
-            "total_success": english_results["success"],
-            "total_failure": english_results["failure"],
-            "generation_method": "keyword_driven_english_only",
+            "hindi_success": translated["hi"]["success"],
+            "hindi_failure": translated["hi"]["failure"],
+            "bengali_success": translated["bn"]["success"],
+            "bengali_failure": translated["bn"]["failure"],
+            "indonesian_success": translated["id"]["success"],
+            "indonesian_failure": translated["id"]["failure"],
+            "total_success": english_results["success"] + sum(t["success"] for t in translated.values()),
+            "total_failure": english_results["failure"] + sum(t["failure"] for t in translated.values()),
+            "generation_method": "keyword_driven_english_translation_fanout" if translation_results else "keyword_driven_english_only",
+            "prompt_tokens": tokens["prompt_tokens"],
+            "output_tokens": tokens["output_tokens"],
+            "total_tokens": tokens["total_tokens"],
+            "token_usage": tokens["by_stage"],
             "created_at": datetime.now().isoformat()
         }
-        supabase.table("auto_generation_logs").insert(log_data).execute()
+        get_post_store().insert_log(log_data)
         print(f"✅ 执行日志已记录到数据库")
     except Exception as log_error:
         print(f"⚠️ 日志记录失败（不影响主要功能）: {log_error}")
@@ -1220,6 +2505,11 @@ def main():
 if __name__ == "__main__":
     import sys
 
+    # --dry-run 可出现在任意位置：文章读写本地SQLite，不连接生产库
+    if "--dry-run" in sys.argv:
+        sys.argv.remove("--dry-run")
+        enable_dry_run()
+
     # 支持命令行参数
     if len(sys.argv) > 1:
         command = sys.argv[1].lower()
@@ -1265,6 +2555,37 @@ if __name__ == "__main__":
                 print(f"\n🇺🇸 默认生成英文内容({target_count}篇)...")
                 result = generate_keyword_driven_articles("English", "en", target_count)
                 print(f"✅ 英文生成完成: 成功 {result['success']} 篇")
+        elif command == "enqueue":
+            # 仅执行关键词研究，把题目写入工作队列
+            language, locale, default_count = resolve_language(sys.argv[2] if len(sys.argv) > 2 else "english")
+            count = int(sys.argv[3]) if len(sys.argv) > 3 else default_count
+            enqueue_keyword_topics(language, locale, count, create_topic_queue())
+        elif command == "worker":
+            # 从工作队列领取题目生成文章，可在多个进程/runner上同时运行
+            locales = None
+            if len(sys.argv) > 2 and sys.argv[2].lower() != "all":
+                locales = [resolve_language(name)[1] for name in sys.argv[2].split(',')]
+            max_items = int(sys.argv[3]) if len(sys.argv) > 3 else None
+            run_topic_worker(create_topic_queue(), locales, max_items)
+        elif command == "translate":
+            # 把最近的英文文章翻译到其他语言（已有译文的跳过）
+            locales = TRANSLATION_FANOUT_LOCALES or ["hi", "bn", "id"]
+            if len(sys.argv) > 2 and sys.argv[2].lower() != "all":
+                locales = [resolve_language(name)[1] for name in sys.argv[2].split(',')]
+            limit = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+            fan_out_translations(fetch_source_posts(limit=limit), locales)
+        elif command == "batch":
+            # 批量模式：关键词研究后提交批处理任务并等待入库；batch ingest <job_id> 对已有任务重新入库（幂等）
+            if len(sys.argv) > 3 and sys.argv[2].lower() == "ingest":
+                ingest_article_batch(sys.argv[3])
+            else:
+                language, locale, default_count = resolve_language(sys.argv[2] if len(sys.argv) > 2 else "english")
+                count = int(sys.argv[3]) if len(sys.argv) > 3 else default_count
+                generate_keyword_driven_articles(language, locale, count, batch=True)
+        elif command == "daemon":
+            # 常驻模式：调度配置如 "en:10,id:3"，缺省读取 DAEMON_SCHEDULE
+            run_daemon(sys.argv[2] if len(sys.argv) > 2 else None,
+                       int(sys.argv[3]) if len(sys.argv) > 3 else None)
         else:
             print(f"❌ 未知命令: {command}")
             print("💡 可用命令:")
@@ -1276,6 +2597,13 @@ if __name__ == "__main__":
             print("     - indonesian/id/bahasa (默认3篇)")
             print("     - chinese/zh/中文 (默认5篇)")
             print("   count: 可选，指定生成文章数量")
+            print("   python auto_generate_articles.py enqueue [language] [count]  # 关键词研究并写入题目队列")
+            print("   python auto_generate_articles.py worker [language,...|all] [max]  # 从题目队列领取并生成")
+            print("   python auto_generate_articles.py translate [language,...|all] [count]  # 把最近的英文文章翻译到其他语言")
+            print("   python auto_generate_articles.py batch [language] [count]  # 批量模式：提交批处理任务，完成后统一入库")
+            print("   python auto_generate_articles.py batch ingest <job_id>  # 对已有批处理任务（重新）入库")
+            print("   python auto_generate_articles.py daemon [language:count,...] [workers]  # 常驻定时生成，状态见 /status")
+            print("   以上命令都可加 --dry-run：文章和日志写入本地SQLite（python post_store.py mirror|synthetic 准备数据）")
             print("   示例:")
             print("     python auto_generate_articles.py keywords english 10")
             print("     python auto_generate_articles.py keywords english 15")
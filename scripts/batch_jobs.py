@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+离线批量生成 - 把文章提示词写成JSONL任务文件提交给批处理接口，轮询完成后按题目幂等入库
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from data_dir import DATA_DIR
+
+BATCH_DIR = os.path.join(DATA_DIR, 'batches')
+
+# 批处理任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class BatchJob:
+    """一个批处理任务的本地目录：job.jsonl（请求）、results.jsonl（结果）、manifest.json（元数据和状态）、
+    ingested.jsonl（入库记录，只追加）
+
+    请求行格式与 Gemini 批处理接口一致：{"key": ..., "request": {"contents": [...], "generation_config": {...}}}，
+    另附 metadata（题目、语言等）供入库使用。
+    """
+
+    def __init__(self, job_id: str, root: str = BATCH_DIR):
+        self.job_id = job_id
+        self.dir = os.path.join(root, job_id)
+        self.lock = threading.Lock()
+
+    @property
+    def job_path(self) -> str:
+        return os.path.join(self.dir, 'job.jsonl')
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.dir, 'results.jsonl')
+
+    @property
+    def ingested_path(self) -> str:
+        return os.path.join(self.dir, 'ingested.jsonl')
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.dir, 'manifest.json')
+
+    @classmethod
+    def create(cls, lines: List[Dict[str, Any]], meta: Dict[str, Any], root: str = BATCH_DIR) -> "BatchJob":
+        """写入任务文件和清单，返回新任务"""
+        job = cls(f"{meta.get('locale', 'job')}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}", root)
+        os.makedirs(job.dir, exist_ok=True)
+        with open(job.job_path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
+        job.save_manifest(dict(meta, job_id=job.job_id, requests=len(lines), state=JOB_PENDING,
+                               created_at=datetime.now().isoformat()))
+        return job
+
+    def requests(self) -> List[Dict[str, Any]]:
+        return list(read_jsonl(self.job_path))
+
+    def results(self) -> List[Dict[str, Any]]:
+        """每个请求最近一次的结果（{"key", "text"} 或 {"key", "error"}）"""
+        return list({result["key"]: result for result in read_jsonl(self.results_path)}.values())
+
+    def append_result(self, result: Dict[str, Any]):
+        with self.lock:
+            with open(self.results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    def ingested(self) -> Dict[str, Dict[str, Any]]:
+        """每个请求最近一次的入库记录（成功记录含 uuid，失败记录含 error）"""
+        return {record["key"]: record for record in read_jsonl(self.ingested_path)}
+
+    def record_ingested(self, record: Dict[str, Any]):
+        with self.lock:
+            with open(self.ingested_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def load_manifest(self) -> Dict[str, Any]:
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: Dict[str, Any]):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def update_manifest(self, fn: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """在锁内读取、修改并写回清单"""
+        with self.lock:
+            manifest = self.load_manifest()
+            fn(manifest)
+            self.save_manifest(manifest)
+            return manifest
+
+class LocalBatchProcessor:
+    """本地批处理替身，接口与远程批处理服务一致（submit / status / results）
+
+    在后台线程中用 call_fn(request_line) -> 文本 逐行执行任务文件，结果追加到 results.jsonl。
+    已有结果的请求不会重复执行，因此进程中断后再次查询状态会从断点继续。
+    """
+
+    def __init__(self, call_fn: Callable[[Dict[str, Any]], str], workers: int = 4, root: str = BATCH_DIR):
+        self.call_fn = call_fn
+        self.workers = workers
+        self.root = root
+        self.threads: Dict[str, threading.Thread] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, job_id: str) -> str:
+        with self.lock:
+            thread = self.threads.get(job_id)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self._process, args=(job_id,), daemon=True, name=f"batch-{job_id}")
+                self.threads[job_id] = thread
+                thread.start()
+        return job_id
+
+    def _process(self, job_id: str):
+        job = BatchJob(job_id, self.root)
+        job.update_manifest(lambda m: m.update(state=JOB_RUNNING))
+        # 上次执行出错的请求在续跑时重试
+        done = {result["key"] for result in job.results() if "text" in result}
+        pending = [line for line in job.requests() if line["key"] not in done]
+
+        def run(line):
+            try:
+                job.append_result({"key": line["key"], "text": self.call_fn(line)})
+            except Exception as e:
+                job.append_result({"key": line["key"], "error": str(e)})
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(run, pending))
+        except Exception as e:
+            error = str(e)
+            job.update_manifest(lambda m: m.update(state=JOB_FAILED, error=error))
+            return
+        job.update_manifest(lambda m: m.update(state=JOB_SUCCEEDED, completed_at=datetime.now().isoformat()))
+
+    def status(self, job_id: str) -> str:
+        """任务状态；清单显示未完成但本进程内没有在处理时（如进程重启后）自动续跑"""
+        state = BatchJob(job_id, self.root).load_manifest()["state"]
+        if state in (JOB_PENDING, JOB_RUNNING):
+            with self.lock:
+                thread = self.threads.get(job_id)
+            if thread is None or not thread.is_alive():
+                self.submit(job_id)
+                return JOB_RUNNING
+        return state
+
+    def results(self, job_id: str) -> List[Dict[str, Any]]:
+        return BatchJob(job_id, self.root).results()
+
+def wait_for_job(processor, job_id: str, poll_interval: float = 30.0, timeout: Optional[float] = None) -> str:
+    """轮询直到任务结束或超时，返回最终状态"""
+    started = time.time()
+    while True:
+        state = processor.status(job_id)
+        if state in (JOB_SUCCEEDED, JOB_FAILED):
+            return state
+        if timeout is not None and time.time() - started >= timeout:
+            return state
+        done = len(processor.results(job_id))
+        print(f"⏳ 批处理任务 {job_id}: {state}，已完成 {done} 条")
+        time.sleep(poll_interval)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+文章正文近似去重 - 64位 SimHash 指纹与分块（bit-sliced）汉明距离索引
+"""
+import os
+import re
+import json
+import hashlib
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from data_dir import DATA_DIR
+
+# 汉明距离不超过该值视为近似重复（64位指纹的常用阈值）
+MAX_HAMMING_DISTANCE = int(os.getenv('SIMHASH_MAX_DISTANCE', '3'))
+
+if not 0 <= MAX_HAMMING_DISTANCE < 64:
+    raise ValueError(f"SIMHASH_MAX_DISTANCE 须在 0-63 之间: {MAX_HAMMING_DISTANCE}")
+
+def block_layout(max_distance: int) -> List[Tuple[int, int]]:
+    """把64位指纹切分为 max_distance+1 个（尽量等宽的）分块，返回各块的 (位移, 掩码)
+
+    距离不超过 max_distance 时至少有一个分块完全相同（抽屉原理），按分块查找不会漏掉候选
+    """
+    blocks = max_distance + 1
+    layout, shift = [], 0
+    for i in range(blocks):
+        bits = 64 // blocks + (1 if i < 64 % blocks else 0)
+        layout.append((shift, (1 << bits) - 1))
+        shift += bits
+    return layout
+
+# 默认阈值3：4个16位分块
+BLOCK_LAYOUT = block_layout(MAX_HAMMING_DISTANCE)
+
+SHINGLE_SIZE = 3
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+def tokenize(content: str) -> List[str]:
+    """去除Markdown链接/URL等噪声后分词，中日韩字符逐字切分"""
+    content = re.sub(r'\]\([^)]*\)', ']', content)
+    content = re.sub(r'https?://\S+', ' ', content)
+    content = content.lower()
+    return re.findall(r'[぀-ヿ一-鿿]|[^\W぀-ヿ一-鿿]+', content)
+
+def simhash(content: str) -> int:
+    """计算正文的64位 SimHash 指纹（按词 n-gram 加权，向量化累加）"""
+    tokens = tokenize(content)
+    if len(tokens) >= SHINGLE_SIZE:
+        features = Counter(' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1))
+    else:
+        features = Counter(tokens)
+    if not features:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'big') for f in features],
+        dtype=np.uint64
+    )
+    weights = np.array(list(features.values()), dtype=np.int64)
+    bits = ((hashes[:, None] >> _BIT_SHIFTS[None, :]) & np.uint64(1)).astype(np.int64)
+    totals = ((bits * 2 - 1) * weights[:, None]).sum(axis=0)
+    return int(sum(1 << i for i in np.nonzero(totals > 0)[0].tolist()))
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个指纹之间的汉明距离"""
+    return bin(a ^ b).count('1')
+
+class SimHashIndex:
+    """单个语言的正文指纹索引，按分块（默认4个16位分块）建立查找表，持久化到本地 JSON 文件"""
+
+    def __init__(self, locale: str, path: Optional[str] = None):
+        self.locale = locale
+        self.path = path or os.path.join(DATA_DIR, 'simhash_index', f'{locale}.json')
+        self.fingerprints: Dict[str, int] = {}
+        self.tables: List[Dict[int, List[str]]] = [{} for _ in BLOCK_LAYOUT]
+        self.last_synced: Optional[str] = None
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def _insert(self, key: str, fingerprint: int):
+        self.fingerprints[key] = fingerprint
+        for table, (shift, mask) in zip(self.tables, BLOCK_LAYOUT):
+            table.setdefault((fingerprint >> shift) & mask, []).append(key)
+
+    def add(self, key: str, content: str) -> bool:
+        """添加一篇文章的正文指纹（以slug为键），已存在则跳过"""
+        if not key or not content or key in self.fingerprints:
+            return False
+        self._insert(key, simhash(content))
+        return True
+
+    def find_duplicate(self, content: str, max_distance: int = MAX_HAMMING_DISTANCE) -> Optional[Dict[str, Any]]:
+        """查找汉明距离最近且不超过阈值的已有文章
+
+        阈值超过分块布局能保证的距离（max_distance > MAX_HAMMING_DISTANCE）时逐一比较全部指纹
+        """
+        fingerprint = simhash(content)
+        if max_distance > MAX_HAMMING_DISTANCE:
+            candidates = self.fingerprints
+        else:
+            # 任一分块相同的文章都是候选（去重）
+            candidates = dict.fromkeys(key for table, (shift, mask) in zip(self.tables, BLOCK_LAYOUT)
+                                       for key in table.get((fingerprint >> shift) & mask, ()))
+        best = None
+        for key in candidates:
+            distance = hamming_distance(fingerprint, self.fingerprints[key])
+            if distance <= max_distance and (best is None or distance < best['distance']):
+                best = {'key': key, 'distance': distance, 'fingerprint': f"{fingerprint:016x}"}
+        return best
+
+    def save(self):
+        """写入本地索引文件"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            'locale': self.locale,
+            'last_synced': self.last_synced,
+            'fingerprints': {key: f"{fp:016x}" for key, fp in self.fingerprints.items()},
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, locale: str, path: Optional[str] = None) -> 'SimHashIndex':
+        """读取本地索引文件，不存在时返回空索引"""
+        index = cls(locale, path)
+        try:
+            with open(index.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return index
+        except Exception as e:
+            print(f"⚠️ 读取正文指纹索引失败，将重建: {e}")
+            return index
+
+        index.last_synced = data.get('last_synced')
+        for key, fp in data.get('fingerprints', {}).items():
+            index._insert(key, int(fp, 16))
+        return index
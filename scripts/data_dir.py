@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+"""
+本地数据目录 - 索引、缓存、队列、账本等本地状态的统一根目录（BLOG_DATA_DIR 覆盖）
+"""
+import os
+from pathlib import Path
+
+DATA_DIR = os.getenv('BLOG_DATA_DIR', str(Path(__file__).resolve().parent.parent / '.blog_data'))
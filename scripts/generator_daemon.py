@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+文章生成守护进程组件 - 带抖动的内部调度器、运行状态和本地状态端点
+"""
+import json
+import time
+import random
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def parse_schedule(spec: str) -> List[Tuple[str, Optional[int]]]:
+    """解析调度配置，如 "en:10,id:1,hi:1"，返回 [(语言参数, 篇数)]，篇数缺省为None"""
+    jobs = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, count = part.partition(':')
+        jobs.append((name.strip(), int(count) if count.strip() else None))
+    return jobs
+
+class DaemonState:
+    """守护进程运行状态：进行中的任务、各语言最近一次运行和累计指标"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now().isoformat()
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.last_runs: Dict[str, Dict[str, Any]] = {}
+        self.next_runs: Dict[str, str] = {}
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def start_work(self, worker_id: str, item: Dict[str, Any]):
+        with self.lock:
+            self.in_flight[worker_id] = {
+                "id": item.get("id"),
+                "locale": item.get("locale"),
+                "topic": item.get("topic"),
+                "started_at": datetime.now().isoformat(),
+            }
+
+    def finish_work(self, worker_id: str, item: Dict[str, Any], success: bool, skipped: bool = False):
+        with self.lock:
+            self.in_flight.pop(worker_id, None)
+            totals = self.totals.setdefault(item.get("locale"), {"success": 0, "failure": 0})
+            outcome = "success" if success else "skipped" if skipped else "failure"
+            totals[outcome] = totals.get(outcome, 0) + 1
+
+    def record_run(self, name: str, metrics: Dict[str, Any]):
+        with self.lock:
+            self.last_runs[name] = dict(metrics, finished_at=datetime.now().isoformat())
+
+    def set_next_run(self, name: str, when: float):
+        with self.lock:
+            self.next_runs[name] = datetime.fromtimestamp(when).isoformat()
+
+    def snapshot(self, queue_depth: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "queue_depth": queue_depth or {},
+                "in_flight": list(self.in_flight.values()),
+                "next_runs": dict(self.next_runs),
+                "last_runs": dict(self.last_runs),
+                "totals": {k: dict(v) for k, v in self.totals.items()},
+            }
+
+class JitteredScheduler:
+    """按固定间隔 + 随机抖动执行任务；任务在调度线程中顺序执行"""
+
+    def __init__(self, state: Optional[DaemonState] = None):
+        self.jobs: List[Dict[str, Any]] = []
+        self.state = state
+
+    def add(self, name: str, interval: float, jitter: float, fn: Callable[[], Any]):
+        """添加任务：首次在 [0, jitter) 秒内执行，此后每 interval ± jitter 秒执行一次"""
+        job = {"name": name, "interval": interval, "jitter": jitter, "fn": fn,
+               "next_run": time.time() + random.uniform(0, jitter)}
+        self.jobs.append(job)
+        if self.state:
+            self.state.set_next_run(name, job["next_run"])
+
+    def run(self, stop_event: threading.Event):
+        """运行调度循环，直到 stop_event 被设置"""
+        while not stop_event.is_set() and self.jobs:
+            job = min(self.jobs, key=lambda j: j["next_run"])
+            delay = job["next_run"] - time.time()
+            if delay > 0:
+                stop_event.wait(min(delay, 60))
+                continue
+
+            try:
+                job["fn"]()
+            except Exception as e:
+                print(f"❌ 调度任务 {job['name']} 执行失败: {e}")
+
+            job["next_run"] = time.time() + job["interval"] + random.uniform(-job["jitter"], job["jitter"])
+            if self.state:
+                self.state.set_next_run(job["name"], job["next_run"])
+
+def start_status_server(port: int, snapshot_fn: Callable[[], Dict[str, Any]], host: str = "127.0.0.1"):
+    """在后台线程启动状态端点（GET /status 返回JSON），返回server对象"""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') not in ("", "/status"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            try:
+                body = json.dumps(snapshot_fn(), ensure_ascii=False, indent=2).encode('utf-8')
+                self.send_response(200)
+            except Exception as e:
+                body = json.dumps({"error": str(e)}, ensure_ascii=False).encode('utf-8')
+                self.send_response(500)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+对冲请求 - 调用超过该分组观测到的 p90 延迟仍未返回时发出一次重复请求，先返回的有效结果胜出
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+class LatencyTracker:
+    """按分组（如 locale）记录最近的调用延迟并计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+        self.lock = threading.Lock()
+
+    def record(self, key: str, latency: float):
+        with self.lock:
+            self.samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+
+    def quantile(self, key: str, q: float, min_samples: int = 5) -> Optional[float]:
+        """样本不足 min_samples 时返回 None"""
+        with self.lock:
+            values = sorted(self.samples.get(key, ()))
+        if len(values) < min_samples:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+class Hedger:
+    """对冲调用器
+
+    主请求开始执行后超过分组 p90 延迟仍未返回时，在额外成本比例（对冲次数/主请求次数）不超过 max_extra_ratio 的前提下
+    发出一次重复请求。两者中先返回且通过 validate 的结果胜出，另一个被取消（尚未开始时）或忽略。
+    延迟从主请求真正开始执行时计算，线程池排队的时间不会触发对冲。
+    """
+
+    def __init__(self, quantile: float = 0.9, max_extra_ratio: float = 0.1, min_samples: int = 5,
+                 max_workers: int = 32):
+        self.quantile = quantile
+        self.max_extra_ratio = max_extra_ratio
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "skipped_by_budget": 0}
+
+    def _timed(self, key: str, fn: Callable[[], Any], running: threading.Event = None):
+        if running is not None:
+            running.set()
+        started = time.time()
+        result = fn()
+        self.latencies.record(key, time.time() - started)
+        return result
+
+    def _try_reserve_hedge(self) -> bool:
+        with self.lock:
+            if self.stats["hedged"] + 1 > self.max_extra_ratio * self.stats["calls"]:
+                self.stats["skipped_by_budget"] += 1
+                return False
+            self.stats["hedged"] += 1
+            return True
+
+    def call(self, key: str, fn: Callable[[], Any], validate: Callable[[Any], bool] = None) -> Any:
+        """执行 fn，必要时对冲；两个请求都无效时以主请求的结果为准"""
+        validate = validate or (lambda result: True)
+        with self.lock:
+            self.stats["calls"] += 1
+
+        running = threading.Event()
+        primary = self.executor.submit(self._timed, key, fn, running)
+        delay = self.latencies.quantile(key, self.quantile, self.min_samples)
+        if delay is None:
+            return primary.result()
+
+        running.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._try_reserve_hedge():
+            return primary.result()
+
+        print(f"🪁 [{key}] 请求超过 p{int(self.quantile * 100)} 延迟 {delay:.1f}s，发出对冲请求")
+        hedge = self.executor.submit(self._timed, key, fn)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None or not validate(future.result()):
+                    continue
+                for other in pending:
+                    other.cancel()
+                if future is hedge:
+                    with self.lock:
+                        self.stats["hedge_wins"] += 1
+                return future.result()
+
+        # 两者都无效时返回主请求的结果（或抛出其异常），交由调用方处理
+        return primary.result()
+
+    def summary(self) -> Dict[str, Any]:
+        """对冲统计：触发率、命中率（对冲请求先返回的比例）和额外成本比例"""
+        with self.lock:
+            stats = dict(self.stats)
+        stats["extra_cost_ratio"] = round(stats["hedged"] / stats["calls"], 3) if stats["calls"] else 0.0
+        stats["hit_rate"] = round(stats["hedge_wins"] / stats["hedged"], 3) if stats["hedged"] else 0.0
+        return stats
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+HTTP录制/回放 - 在传输层拦截 requests 会话（Google建议、Unsplash）和 supabase/postgrest 的 httpx 客户端，
+把规范化的请求/响应保存为 cassette 文件，离线回放完整运行（可注入延迟）
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import httpx
+except ImportError:  # supabase 客户端依赖 httpx，单独使用时可能未安装
+    httpx = None
+
+CASSETTE_MODES = ("passthrough", "record", "replay")
+
+# 不写入 cassette 的查询参数（密钥类）
+SECRET_PARAMS = {"apikey", "api_key", "key", "client_id", "access_token", "token"}
+
+# 保留的响应头，其余（日期、服务器标识、限流计数等）丢弃
+KEPT_RESPONSE_HEADERS = {"content-type", "content-range", "retry-after", "location"}
+
+class CassetteMiss(Exception):
+    """replay 模式下 cassette 中没有匹配的请求"""
+
+def normalize_url(url: str) -> str:
+    """去掉协议和主机（录制和回放可以使用不同的 Supabase 项目地址），查询参数排序并移除密钥"""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in SECRET_PARAMS)
+    return parts.path + (f"?{urlencode(params)}" if params else "")
+
+def normalize_body(body: Any) -> str:
+    """请求体统一为文本，JSON按键排序"""
+    if body is None:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+    try:
+        return json.dumps(json.loads(body), ensure_ascii=False, sort_keys=True)
+    except (TypeError, ValueError):
+        return str(body)
+
+class Cassette:
+    """一个 cassette 文件中的全部交互
+
+    回放时先按 (方法, 规范化URL, 请求体) 精确匹配，找不到再忽略请求体只按 (方法, URL) 匹配
+    （插入请求的 uuid、时间戳每次都不同）。同一请求有多条记录时按录制顺序依次返回，用尽后重复最后一条。
+    latency 为 None 时不等待，"recorded" 按录制时的耗时等待，数字为固定等待秒数。
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: Any = None):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知的cassette模式: {mode}（可选 {', '.join(CASSETTE_MODES)}）")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.interactions: List[Dict[str, Any]] = []
+        self.cursors: Dict[Tuple, int] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay" or (mode == "record" and os.path.exists(path)):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.interactions = json.load(f).get("interactions", [])
+
+    @staticmethod
+    def _body_hash(body: str) -> str:
+        return hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+
+    def _find(self, method: str, url: str, body: str) -> Optional[Dict[str, Any]]:
+        for match_key in [(method, url, self._body_hash(body)), (method, url)]:
+            candidates = [i for i in self.interactions
+                          if (i["request"]["method"], i["request"]["url"], i["request"]["body_hash"])[:len(match_key)] == match_key]
+            if candidates:
+                cursor = self.cursors.get(match_key, 0)
+                self.cursors[match_key] = cursor + 1
+                return candidates[min(cursor, len(candidates) - 1)]
+        return None
+
+    def play(self, method: str, url: str, body: Any) -> Dict[str, Any]:
+        """返回匹配的录制响应 {"status", "headers", "body", "elapsed"}，按配置注入延迟"""
+        method, url, body = method.upper(), normalize_url(url), normalize_body(body)
+        with self.lock:
+            interaction = self._find(method, url, body)
+            if interaction is None:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"cassette 中没有匹配的请求: {method} {url}")
+            self.stats["replayed"] += 1
+        response = interaction["response"]
+        delay = response.get("elapsed", 0) if self.latency == "recorded" else self.latency
+        if delay:
+            time.sleep(float(delay))
+        return response
+
+    def record(self, method: str, url: str, body: Any, status: int, headers: Dict[str, str], content: bytes,
+               elapsed: float):
+        body = normalize_body(body)
+        interaction = {
+            "request": {
+                "method": method.upper(),
+                "url": normalize_url(url),
+                "body_hash": self._body_hash(body),
+                "body": body[:2000],
+            },
+            "response": {
+                "status": status,
+                "headers": {k.lower(): v for k, v in headers.items() if k.lower() in KEPT_RESPONSE_HEADERS},
+                "body": content.decode('utf-8', errors='replace'),
+                "elapsed": round(elapsed, 3),
+            },
+        }
+        with self.lock:
+            self.interactions.append(interaction)
+            self.stats["recorded"] += 1
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"recorded_at": datetime.now().isoformat(), "interactions": self.interactions},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.stats, mode=self.mode, interactions=len(self.interactions))
+
+class CassetteAdapter(HTTPAdapter):
+    """requests 传输适配器：回放时不发出网络请求，录制时转发并记录"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == "replay":
+            recorded = self.cassette.play(request.method, request.url, request.body)
+            response = requests.Response()
+            response.status_code = recorded["status"]
+            response.headers.update(recorded["headers"])
+            response._content = recorded["body"].encode('utf-8')
+            response.encoding = 'utf-8'
+            response.url = request.url
+            response.request = request
+            return response
+
+        started = time.time()
+        response = super().send(request, **kwargs)
+        if self.cassette.mode == "record":
+            self.cassette.record(request.method, request.url, request.body, response.status_code,
+                                 response.headers, response.content, time.time() - started)
+        return response
+
+if httpx is not None:
+    class CassetteTransport(httpx.BaseTransport):
+        """httpx 传输层（supabase/postgrest 使用）：回放时不发出网络请求，录制时转发并记录"""
+
+        def __init__(self, cassette: Cassette, inner: "httpx.BaseTransport"):
+            self.cassette = cassette
+            self.inner = inner
+
+        def handle_request(self, request):
+            body = request.read()
+            if self.cassette.mode == "replay":
+                recorded = self.cassette.play(request.method, str(request.url), body)
+                return httpx.Response(recorded["status"], headers=recorded["headers"],
+                                      content=recorded["body"].encode('utf-8'), request=request)
+
+            started = time.time()
+            response = self.inner.handle_request(request)
+            if self.cassette.mode == "record":
+                content = response.read()
+                self.cassette.record(request.method, str(request.url), body, response.status_code,
+                                     dict(response.headers), content, time.time() - started)
+                response = httpx.Response(response.status_code, headers=response.headers, content=content,
+                                          request=request)
+            return response
+
+        def close(self):
+            self.inner.close()
+
+def install_cassette(cassette: Cassette, session: requests.Session = None, supabase_client=None):
+    """把 cassette 挂到 requests 会话和 supabase 客户端的 postgrest 会话上"""
+    if session is not None:
+        adapter = CassetteAdapter(cassette)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    if supabase_client is not None and httpx is not None:
+        http_client = supabase_client.postgrest.session
+        http_client._transport = CassetteTransport(cassette, http_client._transport)
+    return cassette
+
+def cassette_from_env() -> Optional[Cassette]:
+    """按 HTTP_CASSETTE（文件路径）、HTTP_CASSETTE_MODE 和 HTTP_CASSETTE_LATENCY 创建 cassette，未配置时返回 None"""
+    path = os.getenv('HTTP_CASSETTE', '').strip()
+    mode = os.getenv('HTTP_CASSETTE_MODE', 'replay').lower()
+    if not path or mode == "passthrough":
+        return None
+    latency = os.getenv('HTTP_CASSETTE_LATENCY', '').strip() or None
+    if latency and latency != "recorded":
+        latency = float(latency)
+    return Cassette(path, mode, latency)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+IndexNow 推送脚本 - sitemap 更新后通知搜索引擎新增URL
+"""
+import os
+import sys
+import json
+import time
+import threading
+import requests
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 环境变量配置
+INDEXNOW_KEY = os.getenv('INDEXNOW_KEY')
+INDEXNOW_ENDPOINTS = os.getenv('INDEXNOW_ENDPOINTS', 'https://api.indexnow.org/indexnow')
+INDEXNOW_BATCH_SIZE = int(os.getenv('INDEXNOW_BATCH_SIZE', '1000'))
+INDEXNOW_RATE_LIMIT = float(os.getenv('INDEXNOW_RATE_LIMIT', '1'))  # 每个端点每秒最多请求数
+INDEXNOW_MAX_RETRIES = int(os.getenv('INDEXNOW_MAX_RETRIES', '3'))
+SITE_URL = os.getenv('NEXT_PUBLIC_WEB_URL', 'https://kuaishou-video-download.com')
+
+# IndexNow 协议单次最多提交10000个URL
+INDEXNOW_MAX_BATCH = 10000
+
+def get_endpoints() -> List[str]:
+    """解析配置的IndexNow端点列表（逗号分隔）"""
+    return [e.strip() for e in INDEXNOW_ENDPOINTS.split(',') if e.strip()]
+
+def create_session(max_retries: int = INDEXNOW_MAX_RETRIES, pool_size: int = 4) -> requests.Session:
+    """创建带连接池和指数退避重试的HTTP会话"""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Content-Type': 'application/json; charset=utf-8'})
+    return session
+
+def chunk_urls(urls: List[str], batch_size: int) -> List[List[str]]:
+    """按批次大小切分URL列表"""
+    batch_size = max(1, min(batch_size, INDEXNOW_MAX_BATCH))
+    return [urls[i:i + batch_size] for i in range(0, len(urls), batch_size)]
+
+class RateLimiter:
+    """简单的最小间隔限速器"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.last_call = 0.0
+
+    def wait(self):
+        """等待直到允许下一次请求"""
+        if self.interval <= 0:
+            return
+        elapsed = time.monotonic() - self.last_call
+        if elapsed < self.interval:
+            time.sleep(self.interval - elapsed)
+        self.last_call = time.monotonic()
+
+def write_key_file(key: str = None, public_dir: str = "public") -> Optional[str]:
+    """写入密钥文件 public/<key>.txt：搜索引擎按 keyLocation 访问该文件校验密钥，文件须随站点一起部署"""
+    key = key or INDEXNOW_KEY
+    if not key:
+        return None
+    path = os.path.join(public_dir, f"{key}.txt")
+    os.makedirs(public_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(key)
+    return path
+
+def notify_new_urls(urls: List[str], endpoints: List[str] = None, key: str = None,
+                    batch_size: int = INDEXNOW_BATCH_SIZE, rate: float = INDEXNOW_RATE_LIMIT,
+                    session: requests.Session = None) -> Dict[str, Any]:
+    """将新增URL分批推送到IndexNow端点"""
+    key = key or INDEXNOW_KEY
+    endpoints = endpoints or get_endpoints()
+    stats = {"submitted": 0, "batches": 0, "failed_batches": 0}
+
+    if not urls:
+        print("ℹ️ 没有新增URL，跳过IndexNow推送")
+        return stats
+    if not key:
+        print("⚠️ 未配置INDEXNOW_KEY，跳过IndexNow推送")
+        return stats
+
+    # 去重并保持顺序，保证批次内容稳定
+    urls = list(dict.fromkeys(urls))
+    host = urlparse(SITE_URL).netloc
+    batches = chunk_urls(urls, batch_size)
+    session = session or create_session()
+
+    print(f"📣 开始向 {len(endpoints)} 个IndexNow端点推送 {len(urls)} 个URL（{len(batches)} 批）")
+
+    for endpoint in endpoints:
+        limiter = RateLimiter(rate)
+        for i, batch in enumerate(batches, 1):
+            payload = {
+                "host": host,
+                "key": key,
+                "keyLocation": f"{SITE_URL}/{key}.txt",
+                "urlList": batch,
+            }
+            limiter.wait()
+            stats["batches"] += 1
+            try:
+                response = session.post(endpoint, data=json.dumps(payload), timeout=15)
+                # IndexNow: 200 已接收，202 已接收待验证
+                if response.status_code in (200, 202):
+                    stats["submitted"] += len(batch)
+                    print(f"✅ {endpoint} 第{i}/{len(batches)}批推送成功 ({len(batch)}个URL)")
+                else:
+                    stats["failed_batches"] += 1
+                    print(f"❌ {endpoint} 第{i}/{len(batches)}批推送失败: HTTP {response.status_code}")
+            except Exception as e:
+                stats["failed_batches"] += 1
+                print(f"❌ {endpoint} 第{i}/{len(batches)}批推送异常: {e}")
+
+    return stats
+
+class MockIndexNowHandler(BaseHTTPRequestHandler):
+    """本地IndexNow模拟端点，记录收到的推送请求"""
+
+    received: List[Dict[str, Any]] = []
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        if not payload.get('key') or not isinstance(payload.get('urlList'), list):
+            self.send_response(422)
+        else:
+            self.received.append(payload)
+            self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_server(port: int = 0):
+    """在后台线程启动本地模拟端点，返回 (server, endpoint_url)"""
+    MockIndexNowHandler.received = []
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockIndexNowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/indexnow"
+    return server, endpoint
+
+if __name__ == "__main__":
+    # 启动本地模拟端点: python scripts/indexnow.py mock [port]
+    if len(sys.argv) > 1 and sys.argv[1] == "mock":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+        server, endpoint = start_mock_server(port)
+        print(f"🧪 IndexNow模拟端点已启动: {endpoint}")
+        print(f"💡 使用 INDEXNOW_ENDPOINTS={endpoint} 运行 update_sitemap.py")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        print("💡 用法: python scripts/indexnow.py mock [port]")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Gemini API 密钥池 - 多个密钥（或项目）按权重分担请求，跟踪每个密钥的配额用量，
+选择负载最低的密钥，并隔离返回 429/403 的密钥
+"""
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from adaptive_concurrency import classify_overload
+
+# 403 多为密钥失效、被停用或项目配额耗尽，隔离时间远长于 429
+FORBIDDEN_QUARANTINE_SECONDS = 600
+
+def parse_keys(spec: str) -> List[Tuple[str, float]]:
+    """解析 "key1:3,key2,key3:0.5" 形式的密钥列表，权重缺省为 1"""
+    keys = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, _, weight = entry.partition(':')
+        keys.append((key.strip(), float(weight) if weight.strip() else 1.0))
+    return keys
+
+def error_status(error: BaseException) -> Optional[int]:
+    """读取异常对应的HTTP状态码（google.api_core 异常的 code 或 requests 响应）"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    return status if isinstance(status, int) else None
+
+class NoKeyAvailable(Exception):
+    """所有密钥都处于隔离中"""
+
+class PooledKey:
+    """单个密钥的状态：在途请求、最近一分钟的请求和 token 记录、隔离截止时间"""
+
+    def __init__(self, key: str, weight: float = 1.0):
+        self.key = key
+        self.weight = weight
+        self.in_flight = 0
+        self.requests: deque = deque()   # 最近一分钟的请求时间
+        self.tokens: deque = deque()     # 最近一分钟的 (时间, token数)
+        self.calls = 0
+        self.errors = 0
+        self.strikes = 0
+        self.quarantined_until = 0.0
+        self.client = None
+
+    @property
+    def label(self) -> str:
+        return f"…{self.key[-4:]}"
+
+    def _trim(self, now: float):
+        while self.requests and now - self.requests[0] > 60:
+            self.requests.popleft()
+        while self.tokens and now - self.tokens[0][0] > 60:
+            self.tokens.popleft()
+
+    def minute_tokens(self) -> int:
+        return sum(count for _, count in self.tokens)
+
+class KeyPool:
+    """按权重分摊请求的密钥池
+
+    rpm_limit / tpm_limit 为权重 1 的密钥每分钟的请求数和 token 数上限（0 为不限制），
+    权重为 w 的密钥上限为 w 倍。每次调用选择 (在途数 + 最近一分钟请求数) / 权重 最低且未超配额的密钥；
+    返回 429 的密钥按 Retry-After（或指数增长的隔离时间）暂停使用，返回 403 的密钥隔离更长时间。
+    """
+
+    def __init__(self, keys: List[Tuple[str, float]], rpm_limit: int = 0, tpm_limit: int = 0,
+                 quarantine_seconds: float = 30.0, client_factory: Callable[[str], Any] = None):
+        if not keys:
+            raise ValueError("密钥池为空")
+        self.keys = [PooledKey(key, weight) for key, weight in keys]
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.quarantine_seconds = quarantine_seconds
+        self.client_factory = client_factory
+        self.condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def _has_quota(self, entry: PooledKey) -> bool:
+        if self.rpm_limit and len(entry.requests) >= self.rpm_limit * entry.weight:
+            return False
+        if self.tpm_limit and entry.minute_tokens() >= self.tpm_limit * entry.weight:
+            return False
+        return True
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledKey:
+        """选择负载最低的可用密钥；全部隔离或超配额时等待，超过 timeout 抛出 NoKeyAvailable"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while True:
+                now = time.time()
+                candidates = []
+                for entry in self.keys:
+                    entry._trim(now)
+                    if entry.quarantined_until <= now and self._has_quota(entry):
+                        candidates.append(entry)
+                if candidates:
+                    entry = min(candidates, key=lambda e: ((e.in_flight + len(e.requests)) / e.weight, e.in_flight))
+                    entry.in_flight += 1
+                    entry.requests.append(now)
+                    return entry
+
+                # 等到最早解除隔离或最早一条请求记录滑出一分钟窗口
+                wake = [e.quarantined_until for e in self.keys if e.quarantined_until > now]
+                wake += [e.requests[0] + 60 for e in self.keys if e.requests]
+                wake += [e.tokens[0][0] + 60 for e in self.keys if e.tokens]
+                wait = max(0.05, min(wake) - now) if wake else 1.0
+                if deadline is not None:
+                    if now >= deadline:
+                        raise NoKeyAvailable(f"{self.size} 个密钥均不可用（隔离中或已达配额）")
+                    wait = min(wait, deadline - now)
+                self.condition.wait(timeout=wait)
+
+    def release(self, entry: PooledKey, tokens: int = 0, error: BaseException = None):
+        """归还密钥并记录用量；429/403 时隔离该密钥"""
+        with self.condition:
+            entry.in_flight -= 1
+            entry.calls += 1
+            if tokens:
+                entry.tokens.append((time.time(), tokens))
+            status = error_status(error) if error is not None else None
+            if status in (429, 403):
+                entry.errors += 1
+                entry.strikes += 1
+                if status == 403:
+                    duration = FORBIDDEN_QUARANTINE_SECONDS
+                else:
+                    _, retry_after = classify_overload(error)
+                    duration = retry_after or min(300.0, self.quarantine_seconds * 2 ** (entry.strikes - 1))
+                entry.quarantined_until = max(entry.quarantined_until, time.time() + duration)
+                print(f"🔑 密钥 {entry.label} 返回 {status}，隔离 {duration:.0f}s（连续 {entry.strikes} 次）")
+            elif error is not None:
+                entry.errors += 1
+            else:
+                entry.strikes = 0
+            self.condition.notify_all()
+
+    def client(self, entry: PooledKey):
+        """密钥对应的客户端（首次使用时由 client_factory 创建并缓存）"""
+        with self.condition:
+            if entry.client is None and self.client_factory is not None:
+                entry.client = self.client_factory(entry.key)
+            return entry.client
+
+    def call(self, fn: Callable[[Any], Any], tokens_of: Callable[[Any], int] = None,
+             timeout: Optional[float] = None) -> Any:
+        """用选中密钥的客户端执行 fn(client)
+
+        某个密钥返回 429/403 时隔离它并立即换用其他可用密钥重试；没有其他可用密钥时抛出原异常，
+        交由外层的重试/退避处理
+        """
+        tried = set()
+        while True:
+            entry = self.acquire(timeout)
+            try:
+                result = fn(self.client(entry))
+            except Exception as e:
+                self.release(entry, error=e)
+                tried.add(entry.key)
+                if error_status(e) in (429, 403) and len(tried) < self.size and self.available():
+                    continue
+                raise
+            self.release(entry, tokens_of(result) if tokens_of else 0)
+            return result
+
+    def available(self) -> int:
+        """当前未被隔离的密钥数"""
+        now = time.time()
+        with self.condition:
+            return sum(1 for entry in self.keys if entry.quarantined_until <= now)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """各密钥状态（只显示末4位），用于日志和状态端点"""
+        now = time.time()
+        with self.condition:
+            rows = []
+            for entry in self.keys:
+                entry._trim(now)
+                rows.append({
+                    "key": entry.label,
+                    "weight": entry.weight,
+                    "in_flight": entry.in_flight,
+                    "rpm": len(entry.requests),
+                    "tpm": entry.minute_tokens(),
+                    "calls": entry.calls,
+                    "errors": entry.errors,
+                    "quarantined_for": max(0.0, round(entry.quarantined_until - now, 1)),
+                })
+            return rows
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+关键词库 - 本地SQLite持久化种子词和扩展词，记录使用情况和产出文章
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+from data_dir import DATA_DIR
+
+# 种子词使用后的冷却天数，冷却期内不会再次被抽取
+SEED_COOLDOWN_DAYS = int(os.getenv('KEYWORD_SEED_COOLDOWN_DAYS', '7'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keywords (
+    locale TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    source TEXT NOT NULL,              -- seed / suggestion
+    seed TEXT,                         -- 扩展词对应的种子词
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    times_seen INTEGER NOT NULL DEFAULT 1,
+    times_used INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT,
+    articles INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (locale, keyword)
+);
+CREATE TABLE IF NOT EXISTS keyword_articles (
+    locale TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    article_uuid TEXT NOT NULL,
+    slug TEXT,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (locale, keyword, article_uuid)
+);
+CREATE INDEX IF NOT EXISTS idx_keywords_draw ON keywords(locale, source, last_used);
+"""
+
+class KeywordBank:
+    """关键词库：种子词按最久未使用 + 价值优先的顺序抽取"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DATA_DIR, 'keyword_bank.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # 每次操作独立连接，允许多线程/多进程共享同一个库文件
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _upsert(self, conn, locale: str, keyword: str, source: str, seed: Optional[str], now: str):
+        conn.execute(
+            """INSERT INTO keywords (locale, keyword, source, seed, first_seen, last_seen)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(locale, keyword) DO UPDATE SET
+                   last_seen = excluded.last_seen,
+                   times_seen = times_seen + 1,
+                   source = CASE WHEN keywords.source = 'seed' THEN 'seed' ELSE excluded.source END""",
+            (locale, keyword, source, seed, now, now)
+        )
+
+    def add_seeds(self, locale: str, keywords: List[str]):
+        """写入种子词"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            for keyword in dict.fromkeys(k.strip() for k in keywords if k and k.strip()):
+                self._upsert(conn, locale, keyword, 'seed', None, now)
+
+    def add_expansions(self, locale: str, expanded_keywords: Dict[str, List[str]]):
+        """写入Google自动完成扩展得到的关键词"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            for seed, suggestions in expanded_keywords.items():
+                for keyword in dict.fromkeys(s.strip() for s in suggestions if s and s.strip()):
+                    if keyword != seed:
+                        self._upsert(conn, locale, keyword, 'suggestion', seed, now)
+
+    def available_seed_count(self, locale: str, cooldown_days: int = SEED_COOLDOWN_DAYS) -> int:
+        """冷却期外可抽取的种子词数量"""
+        cutoff = (datetime.now() - timedelta(days=cooldown_days)).isoformat()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM keywords WHERE locale = ? AND source = 'seed' AND (last_used IS NULL OR last_used < ?)",
+                (locale, cutoff)
+            ).fetchone()
+        return row[0]
+
+    def draw_seeds(self, locale: str, count: int) -> List[str]:
+        """抽取最久未使用的高价值种子词，并记录本次使用（冷却期外的种子词自然排在前面）"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT keyword FROM keywords
+                   WHERE locale = ? AND source = 'seed'
+                   ORDER BY last_used IS NOT NULL, last_used, (times_seen + 2 * articles) DESC, keyword
+                   LIMIT ?""",
+                (locale, count)
+            ).fetchall()
+            keywords = [row['keyword'] for row in rows]
+            conn.executemany(
+                "UPDATE keywords SET times_used = times_used + 1, last_used = ? WHERE locale = ? AND keyword = ?",
+                [(now, locale, keyword) for keyword in keywords]
+            )
+        return keywords
+
+    def record_article(self, locale: str, keywords: List[str], article_uuid: str, slug: Optional[str] = None):
+        """记录关键词产出的文章"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            for keyword in dict.fromkeys(keywords):
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO keyword_articles (locale, keyword, article_uuid, slug, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (locale, keyword, article_uuid, slug, now)
+                )
+                if cursor.rowcount:
+                    conn.execute(
+                        "UPDATE keywords SET articles = articles + 1 WHERE locale = ? AND keyword = ?",
+                        (locale, keyword)
+                    )
+
+    def usage_history(self, locale: str) -> Dict[str, int]:
+        """关键词（小写）到历史使用次数（抽取次数 + 产出文章数）的映射，用于关键词评分"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT keyword, times_used + articles AS used FROM keywords WHERE locale = ? AND times_used + articles > 0",
+                (locale,)
+            ).fetchall()
+        return {' '.join(row['keyword'].lower().split()): row['used'] for row in rows}
+
+    def stats(self, locale: str) -> Dict[str, int]:
+        """关键词库统计"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT SUM(source = 'seed') AS seeds, SUM(source = 'suggestion') AS suggestions,
+                          COALESCE(SUM(articles), 0) AS articles
+                   FROM keywords WHERE locale = ?""",
+                (locale,)
+            ).fetchone()
+        return {'seeds': row['seeds'] or 0, 'suggestions': row['suggestions'] or 0, 'articles': row['articles']}
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+关键词评分与筛选 - 批量向量化计算特征，确定性地选出Top-K关键词
+"""
+import re
+import numpy as np
+from typing import List, Dict, Optional
+
+# 各特征的权重
+WEIGHT_FREQUENCY = 1.0    # 在多少个种子词的扩展结果中出现
+WEIGHT_RANK = 0.8         # Google建议中的排名（种子词本身视为第0名）
+WEIGHT_LENGTH = 0.6       # 长尾程度，3-6个词最佳
+WEIGHT_COVERAGE = 1.2     # 与已发布文章的词重叠（惩罚）
+WEIGHT_HISTORY = 0.7      # 历史使用次数（惩罚）
+
+IDEAL_LENGTH = 4.5
+LENGTH_SPREAD = 2.5
+
+def normalize_keyword(keyword: str) -> str:
+    """归一化关键词，用于合并大小写、空白不同的重复项"""
+    return re.sub(r'\s+', ' ', keyword.strip().lower())
+
+def keyword_tokens(text: str) -> List[str]:
+    """分词：中日韩字符逐字切分，其余按单词切分"""
+    return re.findall(r'[぀-ヿ一-鿿]|[^\W぀-ヿ一-鿿]+', text.lower())
+
+def score_keywords(expanded_keywords: Dict[str, List[str]], covered_texts: Optional[List[str]] = None,
+                   history: Optional[Dict[str, int]] = None) -> Dict[str, np.ndarray]:
+    """计算所有候选关键词的特征和综合得分，返回按字母序排列的候选及其得分数组"""
+    # 展开为 (关键词, 排名) 观测序列：种子词排名0，第i个建议排名i+1
+    observed = []
+    ranks = []
+    for seed, suggestions in expanded_keywords.items():
+        observed.append(normalize_keyword(seed))
+        ranks.append(0)
+        for i, suggestion in enumerate(suggestions, 1):
+            observed.append(normalize_keyword(suggestion))
+            ranks.append(i)
+
+    pairs = [(kw, rank) for kw, rank in zip(observed, ranks) if kw]
+    if not pairs:
+        return {'keywords': np.array([], dtype=object), 'scores': np.array([])}
+
+    # 候选按字母序编号，保证结果与哈希顺序无关
+    candidates, inverse = np.unique(np.array([kw for kw, _ in pairs], dtype=object), return_inverse=True)
+    rank_array = np.array([rank for _, rank in pairs], dtype=np.float64)
+    n = len(candidates)
+
+    frequency = np.bincount(inverse, minlength=n).astype(np.float64)
+    best_rank = np.full(n, np.inf)
+    np.minimum.at(best_rank, inverse, rank_array)
+
+    # 分词后展平为 token id 数组，批量计算长度和覆盖率
+    token_lists = [keyword_tokens(kw) for kw in candidates]
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.float64)
+    cjk_chars = np.array([sum(1 for t in tokens if len(t) == 1 and t >= '぀') for tokens in token_lists], dtype=np.float64)
+    effective_length = lengths - cjk_chars + cjk_chars / 2  # 中文约2字为一词
+
+    vocabulary: Dict[str, int] = {}
+    flat_ids = np.array([vocabulary.setdefault(t, len(vocabulary)) for tokens in token_lists for t in tokens], dtype=np.int64)
+    owners = np.repeat(np.arange(n), lengths.astype(np.int64))
+
+    covered_ids = np.array(
+        sorted({vocabulary[t] for text in (covered_texts or []) for t in keyword_tokens(text) if t in vocabulary}),
+        dtype=np.int64
+    )
+    hits = np.isin(flat_ids, covered_ids).astype(np.float64)
+    coverage = np.bincount(owners, weights=hits, minlength=n) / np.maximum(lengths, 1)
+
+    history = history or {}
+    used = np.log1p(np.array([history.get(kw, 0) for kw in candidates], dtype=np.float64))
+
+    scores = (
+        WEIGHT_FREQUENCY * frequency / frequency.max()
+        + WEIGHT_RANK / (1 + best_rank)
+        + WEIGHT_LENGTH * np.exp(-((effective_length - IDEAL_LENGTH) / LENGTH_SPREAD) ** 2)
+        - WEIGHT_COVERAGE * coverage
+        - WEIGHT_HISTORY * (used / used.max() if used.max() > 0 else used)
+    )
+
+    return {
+        'keywords': candidates,
+        'scores': scores,
+        'frequency': frequency,
+        'rank': best_rank,
+        'length': effective_length,
+        'coverage': coverage,
+        'history': used,
+    }
+
+def select_keywords(expanded_keywords: Dict[str, List[str]], top_k: int = 50,
+                    covered_texts: Optional[List[str]] = None, history: Optional[Dict[str, int]] = None) -> List[str]:
+    """按综合得分确定性地选出Top-K关键词（同分按字母序）"""
+    scored = score_keywords(expanded_keywords, covered_texts, history)
+    keywords = scored['keywords']
+    if len(keywords) == 0:
+        return []
+    # 得分取整到1e-9消除浮点误差，字母序编号作为次级排序键
+    order = np.lexsort((np.arange(len(keywords)), -np.round(scored['scores'], 9)))
+    return [str(keywords[i]) for i in order[:top_k]]
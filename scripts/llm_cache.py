@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存 - 以 (模型, 生成参数, 规范化提示词) 的哈希为键把响应存到本地磁盘，
+支持 record（命中则复用，未命中则调用并写入）、replay（只读缓存，未命中报错）和 passthrough（不使用缓存）三种模式
+"""
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+from data_dir import DATA_DIR
+
+CACHE_MODES = ("passthrough", "record", "replay")
+
+# 提示词末尾的唯一性标识，如 "(唯一性标识: 1718000000)"、"(Internal note for uniqueness: 1718000000)"
+UNIQUENESS_SUFFIX = re.compile(r'\([^()\n]*[:：]\s*\d{9,11}\)')
+
+class CacheMiss(Exception):
+    """replay 模式下缓存中没有对应的响应"""
+
+def normalize_prompt(prompt: str) -> str:
+    """去掉唯一性时间戳并统一空白，使同一提示词在不同运行中得到相同的键"""
+    prompt = UNIQUENESS_SUFFIX.sub('', prompt)
+    lines = [line.rstrip() for line in prompt.replace('\r\n', '\n').split('\n')]
+    return '\n'.join(lines).strip()
+
+class CachedUsage:
+    """与 usage_metadata 字段一致的用量记录"""
+
+    def __init__(self, usage: Dict[str, int]):
+        self.prompt_token_count = usage.get("prompt_tokens", 0)
+        self.candidates_token_count = usage.get("output_tokens", 0)
+        self.total_token_count = usage.get("total_tokens", 0)
+
+class CachedResponse:
+    """从缓存读出的响应，提供管线用到的 text 和 usage_metadata"""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.text = entry["text"]
+        self.usage_metadata = CachedUsage(entry.get("usage", {}))
+        self.cache_key = entry["key"]
+
+class LLMCache:
+    """内容寻址的磁盘缓存，每个响应一个JSON文件（按键的前两位分目录）"""
+
+    def __init__(self, mode: str = "passthrough", path: Optional[str] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"未知的缓存模式: {mode}（可选 {', '.join(CACHE_MODES)}）")
+        self.mode = mode
+        self.path = path or os.path.join(DATA_DIR, 'llm_cache')
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "passthrough"
+
+    def key(self, model: str, generation_config: Dict[str, Any], prompt: str) -> str:
+        material = json.dumps({
+            "model": model,
+            "generation_config": generation_config or {},
+            "prompt": normalize_prompt(prompt),
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """读取缓存；replay 模式下未命中抛出 CacheMiss"""
+        path = self._file(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            with self.lock:
+                self.stats["misses"] += 1
+            if self.mode == "replay":
+                raise CacheMiss(f"缓存未命中: {key[:12]}（replay 模式不调用模型，请先用 record 模式运行）")
+            return None
+        with self.lock:
+            self.stats["hits"] += 1
+        return CachedResponse(entry)
+
+    def put(self, key: str, text: str, usage: Dict[str, int], meta: Dict[str, Any] = None):
+        """写入响应（先写临时文件再替换，避免并发读到半个文件）"""
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = dict(meta or {}, key=key, text=text, usage=usage, created_at=datetime.now().isoformat())
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        with self.lock:
+            self.stats["writes"] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["mode"] = self.mode
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+模型路由与性能画像 - 按生成阶段（和语言）选择模型与生成参数，统计各 (阶段, 模型) 的延迟、token 和通过率
+"""
+import os
+import json
+import threading
+from typing import Any, Dict, List, Optional
+from data_dir import DATA_DIR
+
+DEFAULT_MODEL = "gemini-2.5-flash-preview-05-20"
+
+# 各阶段默认路由：输出上限按阶段产出的长度设置（2.5系列的思考 token 也计入输出上限，需留出余量）
+DEFAULT_ROUTES: Dict[str, Dict[str, Any]] = {
+    "seed_keywords": {"max_output_tokens": 2048},
+    "topics": {"max_output_tokens": 4096},
+    "replacement_topics": {"max_output_tokens": 2048},
+    "outline": {"max_output_tokens": 2048},
+    "section": {"max_output_tokens": 4096},
+    "article": {"max_output_tokens": 16384},
+    "translate": {"max_output_tokens": 16384},
+}
+
+GENERATION_CONFIG_KEYS = ("max_output_tokens", "temperature", "top_p", "top_k")
+
+def load_routes() -> Dict[str, Dict[str, Any]]:
+    """默认路由叠加 MODEL_ROUTES 环境变量（JSON字符串或JSON文件路径）中的覆盖项
+
+    键为阶段名或 "阶段@locale"，值可包含 model 和生成参数，例如：
+    {"seed_keywords": {"model": "gemini-2.0-flash-lite"}, "article@hi": {"temperature": 0.8}}
+    """
+    routes = {stage: dict(route) for stage, route in DEFAULT_ROUTES.items()}
+    spec = os.getenv('MODEL_ROUTES', '').strip()
+    if not spec:
+        return routes
+    try:
+        if not spec.startswith('{'):
+            with open(spec, 'r', encoding='utf-8') as f:
+                spec = f.read()
+        for key, route in json.loads(spec).items():
+            routes.setdefault(key, {}).update(route)
+    except Exception as e:
+        print(f"⚠️ MODEL_ROUTES 解析失败，使用默认路由: {e}")
+    return routes
+
+class ModelRouter:
+    """按 (阶段, locale) 解析模型和生成参数：阶段@locale 覆盖阶段，阶段覆盖全局默认"""
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None, default_model: str = DEFAULT_MODEL):
+        self.routes = routes if routes is not None else load_routes()
+        self.default_model = default_model
+
+    def resolve(self, stage: str, locale: Optional[str] = None) -> Dict[str, Any]:
+        route = dict(self.routes.get(stage, {}))
+        if locale:
+            route.update(self.routes.get(f"{stage}@{locale}", {}))
+        return {
+            "model": route.get("model", self.default_model),
+            "generation_config": {k: route[k] for k in GENERATION_CONFIG_KEYS if k in route},
+        }
+
+def usage_counts(response) -> Dict[str, int]:
+    """从响应的 usage_metadata 读取 token 用量"""
+    usage = getattr(response, 'usage_metadata', None)
+    return {
+        "prompt_tokens": getattr(usage, 'prompt_token_count', 0) or 0,
+        "output_tokens": getattr(usage, 'candidates_token_count', 0) or 0,
+        "total_tokens": getattr(usage, 'total_token_count', 0) or 0,
+    }
+
+class ModelProfiler:
+    """按 (阶段, 模型) 汇总调用延迟、token 用量、响应格式通过率和内容校验通过率"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: Dict[tuple, Dict[str, Any]] = {}
+
+    def _entry(self, stage: str, model: str) -> Dict[str, Any]:
+        return self.entries.setdefault((stage, model), {
+            "calls": 0, "errors": 0, "latencies": [], "prompt_tokens": 0, "output_tokens": 0,
+            "format_ok": 0, "validated": 0, "valid": 0,
+        })
+
+    def record_call(self, stage: str, model: str, latency: float, usage: Optional[Dict[str, int]] = None,
+                    format_ok: bool = True, error: bool = False):
+        with self.lock:
+            entry = self._entry(stage, model)
+            entry["calls"] += 1
+            if error:
+                entry["errors"] += 1
+                return
+            entry["latencies"].append(latency)
+            entry["prompt_tokens"] += (usage or {}).get("prompt_tokens", 0)
+            entry["output_tokens"] += (usage or {}).get("output_tokens", 0)
+            entry["format_ok"] += int(format_ok)
+
+    def record_validation(self, stage: str, model: str, passed: bool):
+        """记录下游内容校验（如 validate_article_draft）的结果"""
+        with self.lock:
+            entry = self._entry(stage, model)
+            entry["validated"] += 1
+            entry["valid"] += int(passed)
+
+    def report(self) -> List[Dict[str, Any]]:
+        rows = []
+        with self.lock:
+            for (stage, model), entry in sorted(self.entries.items()):
+                latencies = sorted(entry["latencies"])
+                ok_calls = len(latencies)
+                rows.append({
+                    "stage": stage,
+                    "model": model,
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "p50_latency": round(latencies[ok_calls // 2], 2) if ok_calls else None,
+                    "p90_latency": round(latencies[min(ok_calls - 1, int(ok_calls * 0.9))], 2) if ok_calls else None,
+                    "avg_prompt_tokens": round(entry["prompt_tokens"] / ok_calls) if ok_calls else 0,
+                    "avg_output_tokens": round(entry["output_tokens"] / ok_calls) if ok_calls else 0,
+                    "format_ok_rate": round(entry["format_ok"] / ok_calls, 3) if ok_calls else None,
+                    "validation_pass_rate": round(entry["valid"] / entry["validated"], 3) if entry["validated"] else None,
+                })
+        return rows
+
+    def print_report(self):
+        rows = self.report()
+        if not rows:
+            return
+        print("\n📈 模型画像（阶段 / 模型）:")
+        print(f"   {'阶段':<20}{'模型':<34}{'调用':>5}{'错误':>5}{'p50s':>8}{'p90s':>8}{'入tok':>8}{'出tok':>8}{'格式':>7}{'校验':>7}")
+        for row in rows:
+            fmt = lambda v: '-' if v is None else f"{v:.0%}"
+            print(f"   {row['stage']:<20}{row['model']:<34}{row['calls']:>5}{row['errors']:>5}"
+                  f"{row['p50_latency'] or '-':>8}{row['p90_latency'] or '-':>8}"
+                  f"{row['avg_prompt_tokens']:>8}{row['avg_output_tokens']:>8}"
+                  f"{fmt(row['format_ok_rate']):>7}{fmt(row['validation_pass_rate']):>7}")
+
+    def save_report(self, path: Optional[str] = None):
+        """写入本地JSON报告"""
+        path = path or os.path.join(DATA_DIR, 'model_profile.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+分阶段流水线 - 各阶段有独立的 worker 数和有界队列（背压），不同文章的各阶段相互重叠，吞吐由最慢的阶段决定
+"""
+import time
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+class Finished:
+    """阶段函数返回它表示提前结束（如跳过），result 作为该条目的最终结果"""
+
+    def __init__(self, result: Any):
+        self.result = result
+
+class Retry(Exception):
+    """阶段函数抛出它表示把条目送回 stage 阶段重新处理（不受队列容量限制，避免回环死锁）"""
+
+    def __init__(self, stage: str, item: Any):
+        super().__init__(stage)
+        self.stage = stage
+        self.item = item
+
+class Stage:
+    """流水线阶段：fn(item) 返回交给下一阶段的条目，最后一个阶段的返回值即最终结果"""
+
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: Optional[int] = None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.queue: Optional[queue.Queue] = None
+        self.retries: deque = deque()
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+
+    def take(self, timeout: float) -> Any:
+        """优先取回退的条目，其次从队列取；超时抛出 queue.Empty"""
+        with self.lock:
+            if self.retries:
+                return self.retries.popleft()
+        return self.queue.get(timeout=timeout)
+
+class Pipeline:
+    """有界队列串联的多阶段流水线
+
+    on_error(item, error) 把未处理的异常转换为该条目的最终结果；stop_when() 返回真时不再送入新条目，
+    已在流水线中的条目照常处理完；on_close() 在全部条目处理完后调用（释放阶段外的资源）。
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 on_error: Callable[[Any, BaseException], Any] = None,
+                 on_result: Callable[[Any], None] = None, on_close: Callable[[], None] = None):
+        self.stages = stages
+        self.index = {stage.name: i for i, stage in enumerate(stages)}
+        for stage in stages:
+            stage.queue = queue.Queue(maxsize=stage.queue_size or queue_size)
+        self.on_error = on_error or (lambda item, error: {"success": False, "error": str(error)})
+        self.on_result = on_result
+        self.on_close = on_close
+        self.lock = threading.Lock()
+        self.results: List[Any] = []
+        self.in_flight = 0
+        self.fed = 0
+        self.unfed = 0
+        self.feeding_done = threading.Event()
+        self.all_done = threading.Event()
+        self.started = 0.0
+
+    def _finish(self, result: Any):
+        with self.lock:
+            self.results.append(result)
+            self.in_flight -= 1
+            done = self.feeding_done.is_set() and self.in_flight == 0
+        if self.on_result:
+            self.on_result(result)
+        if done:
+            self.all_done.set()
+
+    def _worker(self, position: int):
+        stage = self.stages[position]
+        while not self.all_done.is_set():
+            try:
+                item = stage.take(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            started = time.time()
+            try:
+                output = stage.fn(item)
+            except Retry as retry:
+                with stage.lock:
+                    stage.busy += time.time() - started
+                self.stages[self.index[retry.stage]].retries.append(retry.item)
+                continue
+            except Exception as e:
+                with stage.lock:
+                    stage.busy += time.time() - started
+                    stage.errors += 1
+                self._finish(self.on_error(item, e))
+                continue
+            with stage.lock:
+                stage.busy += time.time() - started
+                stage.processed += 1
+
+            if isinstance(output, Finished):
+                self._finish(output.result)
+            elif position == len(self.stages) - 1:
+                self._finish(output)
+            else:
+                # 下一阶段队列已满时阻塞，形成背压
+                self.stages[position + 1].queue.put(output)
+
+    def run(self, items: Iterable[Any], stop_when: Callable[[], bool] = None) -> List[Any]:
+        """处理全部条目，返回各条目的最终结果（按完成顺序）"""
+        self.started = time.time()
+        threads = [threading.Thread(target=self._worker, args=(position,), daemon=True,
+                                    name=f"pipeline-{stage.name}-{n}")
+                   for position, stage in enumerate(self.stages) for n in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+
+        items = list(items)
+        for i, item in enumerate(items):
+            if stop_when and stop_when():
+                self.unfed = len(items) - i
+                break
+            with self.lock:
+                self.in_flight += 1
+                self.fed += 1
+            self.stages[0].queue.put(item)
+
+        with self.lock:
+            self.feeding_done.set()
+            if self.in_flight == 0:
+                self.all_done.set()
+        self.all_done.wait()
+        for thread in threads:
+            thread.join()
+        if self.on_close:
+            self.on_close()
+        return self.results
+
+    def summary(self) -> Dict[str, Any]:
+        """各阶段处理数、忙碌时间和利用率（忙碌时间 / (worker数 × 总耗时)），利用率最高的阶段即瓶颈"""
+        elapsed = max(time.time() - self.started, 1e-6)
+        stages = {}
+        for stage in self.stages:
+            with stage.lock:
+                stages[stage.name] = {
+                    "workers": stage.workers,
+                    "processed": stage.processed,
+                    "errors": stage.errors,
+                    "busy_seconds": round(stage.busy, 1),
+                    "utilization": round(stage.busy / (stage.workers * elapsed), 2),
+                }
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        return {"elapsed_seconds": round(elapsed, 1), "fed": self.fed, "unfed": self.unfed,
+                "bottleneck": bottleneck, "stages": stages}
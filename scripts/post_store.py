@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+文章存储抽象 - 脚本用到的 posts / auto_generation_logs 操作，提供 Supabase 实现和本地SQLite实现（dry-run 沙盒、
+生产数据镜像、合成数据压测）
+"""
+import os
+import sys
+import json
+import uuid
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from resilience import execute_with_retry, resilient_call, is_unique_violation
+from data_dir import DATA_DIR
+
+POST_COLUMNS = ("id", "uuid", "slug", "title", "description", "content", "created_at", "updated_at", "status",
+                "cover_url", "author_name", "author_avatar_url", "locale", "source_uuid")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid TEXT UNIQUE NOT NULL,
+    slug TEXT,
+    title TEXT,
+    description TEXT,
+    content TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    status TEXT,
+    cover_url TEXT,
+    author_name TEXT,
+    author_avatar_url TEXT,
+    locale TEXT,
+    source_uuid TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_locale_slug ON posts(locale, slug);
+CREATE INDEX IF NOT EXISTS idx_posts_status_locale ON posts(status, locale, id);
+CREATE INDEX IF NOT EXISTS idx_posts_source_uuid ON posts(source_uuid);
+CREATE TABLE IF NOT EXISTS auto_generation_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execution_date TEXT,
+    data TEXT NOT NULL,                -- 完整日志记录（JSON）
+    created_at TEXT NOT NULL
+);
+"""
+
+def parse_fields(fields: str) -> List[str]:
+    """解析 "slug, title" 形式的字段列表，只允许 posts 表的列"""
+    columns = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [column for column in columns if column not in POST_COLUMNS]
+    if unknown:
+        raise ValueError(f"posts 表没有这些列: {unknown}")
+    return columns
+
+class SupabasePostStore:
+    """Supabase 实现：客户端在第一次使用时才创建，查询带瞬时错误重试"""
+
+    def __init__(self, client_factory: Callable[[], Any], deadline: float = 60.0):
+        self.client_factory = client_factory
+        self.deadline = deadline
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def find_posts(self, fields: str, locale: str = None, status: str = None, slug: str = None,
+                   uuids: List[str] = None, source_uuids: List[str] = None, translated: bool = None,
+                   since: str = None, after_id: int = None, order: str = None, desc: bool = False,
+                   limit: int = None) -> List[Dict[str, Any]]:
+        """按条件查询文章；translated=True 只返回有 source_uuid 的译文"""
+        query = self.client.table("posts").select(fields)
+        if locale is not None:
+            query = query.eq("locale", locale)
+        if status is not None:
+            query = query.eq("status", status)
+        if slug is not None:
+            query = query.eq("slug", slug)
+        if uuids is not None:
+            query = query.in_("uuid", uuids)
+        if source_uuids is not None:
+            query = query.in_("source_uuid", source_uuids)
+        if translated:
+            query = query.not_.is_("source_uuid", "null")
+        if since:
+            query = query.gte("created_at", since)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        if order:
+            query = query.order(order, desc=desc)
+        if limit is not None:
+            query = query.limit(limit)
+        return execute_with_retry(query, deadline=self.deadline).data or []
+
+    def insert_post(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """插入文章，返回插入的行（失败时为 None）
+
+        插入不是幂等的：上一次尝试可能已在服务端提交、只是响应超时，重试时会遇到 uuid 唯一冲突。
+        因此重试时的唯一冲突按 uuid 查回已插入的行视为成功；首次尝试的冲突照常抛出。
+        """
+        attempts = 0
+
+        def attempt(timeout):
+            nonlocal attempts
+            attempts += 1
+            try:
+                return self.client.table("posts").insert(data).execute().data
+            except Exception as e:
+                if attempts == 1 or not is_unique_violation(e):
+                    raise
+                rows = self.client.table("posts").select("*").eq("uuid", data["uuid"]).execute().data
+                if not rows:
+                    raise
+                print(f"♻️ 重试时发现文章已插入（uuid {data['uuid']}），按成功处理")
+                return rows
+
+        rows = resilient_call("supabase", attempt, deadline=self.deadline)
+        return rows[0] if rows else None
+
+    def insert_log(self, data: Dict[str, Any]):
+        execute_with_retry(self.client.table("auto_generation_logs").insert(data), deadline=self.deadline)
+
+    def iter_posts(self, fields: str, page_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        """按 id 游标分页遍历全部匹配的文章（不受单次查询1000行的限制）"""
+        return _iter_posts(self, fields, page_size, **filters)
+
+class SQLitePostStore:
+    """本地SQLite实现：dry-run 时代替生产库，可从 Supabase 镜像真实数据或灌入合成文章"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('DRY_RUN_DB') or os.path.join(DATA_DIR, 'dry_run_posts.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def find_posts(self, fields: str, locale: str = None, status: str = None, slug: str = None,
+                   uuids: List[str] = None, source_uuids: List[str] = None, translated: bool = None,
+                   since: str = None, after_id: int = None, order: str = None, desc: bool = False,
+                   limit: int = None) -> List[Dict[str, Any]]:
+        columns = parse_fields(fields)
+        where, params = [], []
+        for column, value in (("locale", locale), ("status", status), ("slug", slug)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        for column, values in (("uuid", uuids), ("source_uuid", source_uuids)):
+            if values is not None:
+                if not values:
+                    return []
+                where.append(f"{column} IN ({','.join('?' * len(values))})")
+                params.extend(values)
+        if translated:
+            where.append("source_uuid IS NOT NULL")
+        if since:
+            where.append("created_at >= ?")
+            params.append(since)
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+
+        sql = f"SELECT {', '.join(columns)} FROM posts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if order:
+            parse_fields(order)
+            sql += f" ORDER BY {order} {'DESC' if desc else 'ASC'}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def insert_post(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return dict(data) if self.insert_many([data]) else None
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]], chunk_size: int = 5000) -> int:
+        """批量插入（合成数据、镜像用），返回插入行数"""
+        count = 0
+        with self._connect() as conn:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    count += self._insert_chunk(conn, chunk)
+                    chunk = []
+            if chunk:
+                count += self._insert_chunk(conn, chunk)
+        return count
+
+    @staticmethod
+    def _insert_chunk(conn, rows: List[Dict[str, Any]]) -> int:
+        columns = [column for column in POST_COLUMNS if column != "id"]
+        cursor = conn.executemany(
+            f"INSERT OR IGNORE INTO posts ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row.get(column) for column in columns) for row in rows]
+        )
+        return cursor.rowcount
+
+    def insert_log(self, data: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO auto_generation_logs (execution_date, data, created_at) VALUES (?, ?, ?)",
+                (data.get("execution_date"), json.dumps(data, ensure_ascii=False), datetime.now().isoformat())
+            )
+
+    def iter_posts(self, fields: str, page_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+        return _iter_posts(self, fields, page_size, **filters)
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+def _iter_posts(store, fields: str, page_size: int, **filters) -> Iterator[Dict[str, Any]]:
+    columns = [field.strip() for field in fields.split(',')]
+    select = fields if "id" in columns else f"{fields}, id"
+    after_id = None
+    while True:
+        batch = store.find_posts(select, after_id=after_id, order="id", limit=page_size, **filters)
+        for row in batch:
+            yield row if "id" in columns else {k: v for k, v in row.items() if k != "id"}
+        if len(batch) < page_size:
+            return
+        after_id = batch[-1]["id"]
+
+def mirror_posts(source, target: SQLitePostStore, locales: List[str] = None, page_size: int = 1000) -> int:
+    """把生产库的已发布文章只读地复制到本地SQLite（已存在的 uuid 跳过）"""
+    fields = ", ".join(column for column in POST_COLUMNS if column != "id")
+    total = 0
+    for locale in locales or [None]:
+        total += target.insert_many(source.iter_posts(fields, page_size, locale=locale, status="online"))
+    return total
+
+def synthetic_posts(count: int, locales: List[str] = None, days: int = 365) -> Iterator[Dict[str, Any]]:
+    """生成合成文章（压测、百万级sitemap构建），内容为短占位文本"""
+    locales = locales or ["en", "zh", "hi", "bn", "id"]
+    now = datetime.now()
+    words = ["kuaishou", "video", "download", "guide", "mobile", "save", "watermark", "hd", "tips", "app"]
+    for i in range(count):
+        title_words = random.sample(words, 5)
+        created_at = (now - timedelta(minutes=random.randint(0, days * 24 * 60))).isoformat()
+        yield {
+            "uuid": str(uuid.uuid4()),
+            "slug": f"{'-'.join(title_words)}-{i}",
+            "title": ' '.join(title_words).title(),
+            "description": f"Synthetic post {i}",
+            "content": f"# {' '.join(title_words).title()}\n\n" + ' '.join(random.choices(words, k=200)),
+            "created_at": created_at,
+            "updated_at": created_at,
+            "status": "online",
+            "cover_url": None,
+            "author_name": "KuaishouVideoDownload Team",
+            "author_avatar_url": None,
+            "locale": random.choice(locales),
+            "source_uuid": None,
+        }
+
+if __name__ == "__main__":
+    # python post_store.py mirror [locale,...]     把生产库已发布文章镜像到 dry-run 数据库
+    # python post_store.py synthetic <count> [locale,...]  向 dry-run 数据库灌入合成文章
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    store = SQLitePostStore()
+    if command == "mirror":
+        from supabase import create_client
+        source = SupabasePostStore(lambda: create_client(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY')))
+        locales = sys.argv[2].split(',') if len(sys.argv) > 2 else None
+        print(f"✅ 已镜像 {mirror_posts(source, store, locales)} 篇文章到 {store.path}")
+    elif command == "synthetic":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+        locales = sys.argv[3].split(',') if len(sys.argv) > 3 else None
+        started = datetime.now()
+        inserted = store.insert_many(synthetic_posts(count, locales))
+        print(f"✅ 已写入 {inserted} 篇合成文章（{(datetime.now() - started).total_seconds():.1f}s），"
+              f"当前共 {store.count()} 篇: {store.path}")
+    else:
+        print("💡 可用命令:")
+        print("   python post_store.py mirror [locale,...]  # 镜像生产库已发布文章到本地 dry-run 数据库")
+        print("   python post_store.py synthetic <count> [locale,...]  # 灌入合成文章用于压测")
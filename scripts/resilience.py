@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+外部调用容错层 - 错误分类（瞬时/永久）、指数退避+抖动重试、按服务的熔断器和单次调用截止时间
+"""
+import time
+import random
+import threading
+import requests
+from typing import Any, Callable, Dict, Optional
+from adaptive_concurrency import classify_overload
+
+try:
+    import httpx
+except ImportError:  # supabase 客户端依赖 httpx，单独使用时可能未安装
+    httpx = None
+
+# 可重试的HTTP状态码
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# google.api_core 中表示瞬时故障的异常类名
+TRANSIENT_EXCEPTION_NAMES = {
+    'DeadlineExceeded', 'ServiceUnavailable', 'InternalServerError', 'ResourceExhausted',
+    'TooManyRequests', 'GatewayTimeout', 'BadGateway', 'Aborted', 'RetryError',
+}
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+class CallDeadlineExceeded(Exception):
+    """调用在截止时间内未能成功"""
+
+def is_transient(error: BaseException) -> bool:
+    """判断异常是否为瞬时故障（超时、连接失败、429/5xx），其余视为永久错误不重试"""
+    if isinstance(error, (CircuitOpenError, CallDeadlineExceeded)):
+        return False
+    if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+        return True
+    if httpx is not None and isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status in TRANSIENT_STATUS_CODES
+    return type(error).__name__ in TRANSIENT_EXCEPTION_NAMES
+
+def is_unique_violation(error: BaseException) -> bool:
+    """唯一约束冲突（Postgres 23505），如重复的 uuid"""
+    return str(getattr(error, 'code', '')) == '23505' or 'duplicate key' in str(error)
+
+class CircuitBreaker:
+    """熔断器：连续瞬时失败达到阈值后打开，冷却后半开放行一次试探调用"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """调用前检查，打开状态下抛出 CircuitOpenError"""
+        with self.lock:
+            if self.state == "open":
+                if time.time() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"{self.name} 熔断中，{self.reset_timeout - (time.time() - self.opened_at):.0f}s 后重试")
+                self.state = "half_open"
+                self.trial_in_flight = False
+                print(f"🔌 [{self.name}] 熔断器半开，放行试探调用")
+            if self.state == "half_open":
+                if self.trial_in_flight:
+                    raise CircuitOpenError(f"{self.name} 熔断器半开，等待试探调用结果")
+                self.trial_in_flight = True
+
+    def retry_in(self) -> float:
+        """距离可以再次放行调用的秒数（半开且试探调用未返回时给出一个短的轮询间隔）"""
+        with self.lock:
+            if self.state == "open":
+                return max(0.0, self.reset_timeout - (time.time() - self.opened_at))
+            if self.state == "half_open" and self.trial_in_flight:
+                return 1.0
+            return 0.0
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                print(f"🔌 [{self.name}] 熔断器恢复关闭")
+            self.state = "closed"
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🔌 [{self.name}] 熔断器打开（连续失败 {self.failures} 次），{self.reset_timeout:.0f}s 内拒绝调用")
+                self.state = "open"
+                self.opened_at = time.time()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(provider: str, failure_threshold: int = 5, reset_timeout: float = 60.0) -> CircuitBreaker:
+    """获取（或创建）服务对应的熔断器"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider, failure_threshold, reset_timeout)
+        return _breakers[provider]
+
+def wait_for_breaker(breaker: CircuitBreaker, remaining: float):
+    """熔断器拒绝调用时，若剩余时间足够则等到半开后再试，否则抛出 CircuitOpenError"""
+    while True:
+        try:
+            breaker.before_call()
+            return
+        except CircuitOpenError:
+            # 加抖动，避免冷却结束时所有等待的调用同时争抢试探名额
+            wait = breaker.retry_in() + random.uniform(0, 1)
+            if wait >= remaining:
+                raise
+            print(f"🔌 [{breaker.name}] 熔断中，等待 {wait:.0f}s 后重试")
+            time.sleep(wait)
+            remaining -= wait
+
+def resilient_call(provider: str, fn: Callable[[float], Any], deadline: float = 60.0, max_attempts: int = 4,
+                   base_delay: float = 1.0, max_delay: float = 30.0) -> Any:
+    """带重试、退避和熔断的调用
+
+    fn 接收本次尝试剩余的秒数（用作请求超时）。瞬时错误按 full jitter 指数退避重试，
+    服务端给出 Retry-After 时至少等待该时长；永久错误立即抛出；总耗时不超过 deadline。
+    熔断器打开时，截止时间内能等到半开则等待，不直接失败。
+    """
+    breaker = get_breaker(provider)
+    started = time.time()
+    last_error: Optional[BaseException] = None
+
+    for attempt in range(max_attempts):
+        remaining = deadline - (time.time() - started)
+        if remaining <= 0:
+            break
+        wait_for_breaker(breaker, remaining)
+        try:
+            result = fn(remaining)
+        except Exception as e:
+            if not is_transient(e):
+                # 永久错误说明服务可用，只是请求本身有问题，不计入熔断
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            last_error = e
+        else:
+            breaker.record_success()
+            return result
+
+        if attempt == max_attempts - 1:
+            break
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        _, retry_after = classify_overload(last_error)
+        if retry_after:
+            delay = max(delay, retry_after)
+        remaining = deadline - (time.time() - started)
+        if delay >= remaining:
+            break
+        print(f"🔁 [{provider}] 瞬时错误（{type(last_error).__name__}: {str(last_error)[:120]}），"
+              f"{delay:.1f}s 后第{attempt + 2}次尝试")
+        time.sleep(delay)
+
+    raise CallDeadlineExceeded(
+        f"{provider} 调用失败（{time.time() - started:.0f}s 内尝试 {attempt + 1} 次）: {last_error}"
+    ) from last_error
+
+def execute_with_retry(query, provider: str = "supabase", deadline: float = 60.0) -> Any:
+    """执行 Supabase/postgrest 查询，瞬时错误自动重试（只用于幂等的查询，插入见 post_store.insert_post）"""
+    return resilient_call(provider, lambda timeout: query.execute(), deadline=deadline)
@@ -5,7 +5,23 @@
 import os
 import re
 import sys
+import mmap
+import math
+import time
+import bisect
+import json
+import hashlib
+import argparse
+import subprocess
 from pathlib import Path
+from functools import partial
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时退回纯Python熵计算
+    np = None
 
 # 敏感信息模式
 SENSITIVE_PATTERNS = {
@@ -27,64 +43,529 @@ SENSITIVE_PATTERNS = {
     ]
 }
 
+# 形如环境变量的密钥赋值，值的香农熵过高时视为疑似泄露的真实密钥
+ENV_SECRET_PATTERN = re.compile(
+    rb'\b(?P<key>[A-Z][A-Z0-9_]*(?:KEY|SECRET|TOKEN|PASSWORD|CREDENTIALS?)[A-Z0-9_]*)\b["\']?'
+    rb'\s*[:=]\s*["\']?(?P<value>[A-Za-z0-9+/_.=-]{20,})'
+)
+ENTROPY_THRESHOLD = 4.0  # bits/字符
+ENTROPY_CATEGORY = 'high_entropy'
+
+# 项目根目录，用于生成相对路径和稳定指纹
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
 # 需要检查的文件扩展名
 CHECK_EXTENSIONS = {'.py', '.js', '.ts', '.json', '.env', '.yml', '.yaml', '.md', '.txt'}
 
 # 忽略的目录
 IGNORE_DIRS = {'node_modules', '.git', '__pycache__', '.next', 'build', 'dist'}
 
-def scan_file(file_path):
+# 超过该大小的文件使用mmap扫描，避免整体读入内存
+MMAP_THRESHOLD = 1024 * 1024
+
+# 超过该大小的文件改为分块流式扫描（可通过 --max-size 调整，单位MB）
+DEFAULT_MAX_SIZE = 5 * 1024 * 1024
+
+# 流式扫描的分块大小与块间重叠长度（重叠需大于单个匹配的最大长度）
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_OVERLAP = 4096
+
+# 二进制嗅探读取的字节数
+BINARY_SNIFF_SIZE = 8192
+
+# 增量扫描缓存文件名（位于项目根目录）
+CACHE_FILENAME = '.security_scan_cache.json'
+
+def build_combined_pattern():
+    """将所有模式合并为一个带命名分组的正则，单次遍历即可匹配全部类别"""
+    alternatives = []
+    group_categories = {}
+    index = 0
+    for category, patterns in SENSITIVE_PATTERNS.items():
+        for pattern in patterns:
+            group = f"p{index}"
+            alternatives.append(f"(?P<{group}>{pattern})")
+            group_categories[group] = category
+            index += 1
+    combined = re.compile('|'.join(alternatives).encode(), re.MULTILINE)
+    return combined, group_categories
+
+COMBINED_PATTERN, GROUP_CATEGORIES = build_combined_pattern()
+
+def build_line_index(data):
+    """预计算所有换行符的偏移量，用于二分查找行号"""
+    offsets = []
+    pos = data.find(b'\n')
+    while pos != -1:
+        offsets.append(pos)
+        pos = data.find(b'\n', pos + 1)
+    return offsets
+
+def shannon_entropy(tokens):
+    """一次性向量化计算所有token的香农熵（bits/字符）"""
+    if not tokens:
+        return []
+    if np is None:
+        entropies = []
+        for token in tokens:
+            counts = [token.count(bytes([b])) for b in set(token)]
+            entropies.append(-sum(c / len(token) * math.log2(c / len(token)) for c in counts))
+        return entropies
+
+    lengths = np.array([len(t) for t in tokens], dtype=np.int64)
+    data = np.frombuffer(b''.join(tokens), dtype=np.uint8).astype(np.int64)
+    rows = np.repeat(np.arange(len(tokens), dtype=np.int64), lengths)
+    counts = np.bincount(rows * 256 + data, minlength=len(tokens) * 256).reshape(len(tokens), 256)
+    probs = counts / lengths[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(counts > 0, probs * np.log2(probs), 0.0)
+    return (-terms.sum(axis=1)).tolist()
+
+def find_matches(data):
+    """单次遍历匹配所有模式，并对环境变量式赋值做熵检测，返回按位置排序的 (start, end, 类别, 文本)"""
+    matches = [
+        (m.start(), m.end(), GROUP_CATEGORIES[m.lastgroup], m.group())
+        for m in COMBINED_PATTERN.finditer(data)
+    ]
+
+    candidates = list(ENV_SECRET_PATTERN.finditer(data))
+    if candidates:
+        pattern_starts = [m[0] for m in matches]
+        entropies = shannon_entropy([m.group('value') for m in candidates])
+        for m, entropy in zip(candidates, entropies):
+            if entropy < ENTROPY_THRESHOLD:
+                continue
+            # 已被固定模式识别的部分不重复报告
+            i = bisect.bisect_right(pattern_starts, m.end()) - 1
+            if i >= 0 and matches[i][1] > m.start():
+                continue
+            matches.append((m.start(), m.end(), ENTROPY_CATEGORY, m.group()))
+        matches.sort(key=lambda m: m[0])
+
+    return matches
+
+def fingerprint(file_path, category, text):
+    """生成不依赖行号的稳定指纹，用于基线和抑制"""
+    try:
+        relative = Path(file_path).resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        relative = Path(file_path).as_posix()
+    raw = b'\0'.join([category.encode(), relative.encode(), text])
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+def make_finding(file_path, line_num, category, raw):
+    """构建单条发现记录"""
+    text = raw.decode('utf-8', errors='ignore')
+    return {
+        'file': str(file_path),
+        'line': line_num,
+        'category': category,
+        'match': text[:50] + '...' if len(text) > 50 else text,
+        'fingerprint': fingerprint(file_path, category, raw)
+    }
+
+def scan_buffer(data, file_path):
+    """扫描字节缓冲区（bytes或mmap）中的敏感信息"""
+    findings = []
+    line_index = None
+
+    for start, _, category, raw in find_matches(data):
+        # 只有出现匹配时才构建行号索引
+        if line_index is None:
+            line_index = build_line_index(data)
+        line_num = bisect.bisect_right(line_index, start) + 1
+        findings.append(make_finding(file_path, line_num, category, raw))
+
+    return findings
+
+def is_binary(f):
+    """嗅探文件开头是否包含NUL字节，判断是否为二进制文件"""
+    head = f.read(BINARY_SNIFF_SIZE)
+    f.seek(0)
+    return b'\0' in head
+
+# 标识符字符（ENV_SECRET_PATTERN 中 \b 的判断依据），分块起点不能落在两个标识符字符之间
+WORD_BYTES = frozenset(b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_')
+
+def chunk_boundary(buffer, limit, floor):
+    """把下一块的起点从 limit 向前移到最近的行首，没有换行时移到token边界（不早于 floor），
+    使下一块开头的上下文与整体扫描一致，不会把被截断的标识符当作新的匹配"""
+    newline = buffer.rfind(b'\n', floor, limit)
+    if newline != -1:
+        return newline + 1
+    for i in range(limit, floor, -1):
+        if buffer[i - 1] not in WORD_BYTES:
+            return i
+    return limit
+
+def scan_stream(f, file_path, chunk_size=STREAM_CHUNK_SIZE, overlap=STREAM_OVERLAP):
+    """分块流式扫描大文件，块间保留重叠区避免漏掉跨块匹配"""
+    findings = []
+    carry = b''
+    lines_before = 0    # 当前缓冲区之前的换行数
+    accepted_from = 0   # 当前缓冲区中已被上一块匹配覆盖的前缀长度
+
+    while True:
+        chunk = f.read(chunk_size)
+        is_last = len(chunk) < chunk_size
+        buffer = carry + chunk
+        if not buffer:
+            break
+        # 非最后一块时，起点落在尾部重叠区的匹配留给下一块处理（重叠区起点对齐到行首/token边界）
+        if is_last:
+            limit = len(buffer)
+        else:
+            limit = max(accepted_from, len(buffer) - overlap)
+            limit = chunk_boundary(buffer, limit, max(accepted_from, limit - overlap))
+        line_index = None
+        last_end = 0
+
+        for start, end, category, raw in find_matches(buffer):
+            if start < accepted_from:
+                continue
+            if start >= limit:
+                break
+            if not is_last and end > limit:
+                # 匹配跨过块边界：可能被截断，或与重叠区中的其他匹配相互覆盖（去重结果取决于后文），整体留给下一块
+                limit = chunk_boundary(buffer, start, max(0, start - overlap))
+                break
+            if line_index is None:
+                line_index = build_line_index(buffer)
+            last_end = max(last_end, end)
+            line_num = lines_before + bisect.bisect_right(line_index, start) + 1
+            findings.append(make_finding(file_path, line_num, category, raw))
+
+        if is_last:
+            break
+        lines_before += buffer.count(b'\n', 0, limit)
+        carry = buffer[limit:]
+        # 下一块开头已被本块匹配覆盖的部分，其中开始的匹配不再报告
+        accepted_from = max(0, max(last_end, accepted_from) - limit)
+
+    return findings
+
+def scan_file(file_path, max_size=DEFAULT_MAX_SIZE):
     """扫描单个文件中的敏感信息"""
+    return timed_scan_file(file_path, max_size)[1]
+
+def timed_scan_file(file_path, max_size=DEFAULT_MAX_SIZE):
+    """扫描单个文件并返回 (文件, 发现列表, 耗时秒数, 扫描方式)"""
+    started = time.perf_counter()
+    mode = 'read'
     findings = []
-    
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-        for category, patterns in SENSITIVE_PATTERNS.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, content, re.MULTILINE)
-                for match in matches:
-                    line_num = content[:match.start()].count('\n') + 1
-                    findings.append({
-                        'file': str(file_path),
-                        'line': line_num,
-                        'category': category,
-                        'match': match.group()[:50] + '...' if len(match.group()) > 50 else match.group()
-                    })
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                mode = 'empty'
+            elif is_binary(f):
+                mode = 'binary'
+            elif max_size and size > max_size:
+                mode = 'stream'
+                findings = scan_stream(f, file_path)
+            elif size >= MMAP_THRESHOLD:
+                mode = 'mmap'
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    findings = scan_buffer(data, file_path)
+            else:
+                findings = scan_buffer(f.read(), file_path)
     except Exception as e:
+        mode = 'error'
         print(f"⚠️ 无法读取文件 {file_path}: {e}")
-    
-    return findings
+    return file_path, findings, time.perf_counter() - started, mode
+
+def collect_files(directory):
+    """收集目录中所有需要检查的文件"""
+    file_paths = []
 
-def scan_directory(directory):
-    """扫描目录中的所有文件"""
-    all_findings = []
-    
     for root, dirs, files in os.walk(directory):
         # 过滤忽略的目录
         dirs[:] = [d for d in dirs if d not in IGNORE_DIRS]
-        
+
         for file in files:
+            # 跳过增量扫描自身的缓存文件
+            if file == CACHE_FILENAME:
+                continue
             file_path = Path(root) / file
-            
+
             # 检查文件扩展名
             if file_path.suffix in CHECK_EXTENSIONS or file.startswith('.env'):
-                findings = scan_file(file_path)
-                all_findings.extend(findings)
-    
+                file_paths.append(file_path)
+
+    return file_paths
+
+def sort_largest_first(file_paths):
+    """按文件大小降序排列，让大文件最先调度，缩短并行扫描的尾部耗时"""
+    def size_of(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    return sorted(file_paths, key=size_of, reverse=True)
+
+def scan_files(file_paths, workers=None, max_size=DEFAULT_MAX_SIZE, timings=None):
+    """使用进程池并行扫描文件列表，timings 列表会收集每个文件的扫描耗时"""
+    all_findings = []
+    file_paths = sort_largest_first(file_paths)
+    scan = partial(timed_scan_file, max_size=max_size)
+
+    if workers == 1 or len(file_paths) < 2:
+        results = map(scan, file_paths)
+        executor = None
+    else:
+        # 逐个提交而不是批量分块，保证最大的文件最先被空闲进程领取
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = (future.result() for future in as_completed([executor.submit(scan, p) for p in file_paths]))
+
+    try:
+        for file_path, findings, elapsed, mode in results:
+            all_findings.extend(findings)
+            if timings is not None:
+                timings.append({'file': str(file_path), 'seconds': elapsed, 'mode': mode})
+    finally:
+        if executor:
+            executor.shutdown()
+
     return all_findings
 
-def main():
-    """主函数"""
-    print("🔍 开始安全扫描...")
-    
-    # 获取项目根目录
-    project_root = Path(__file__).parent.parent
-    
-    # 扫描项目
-    findings = scan_directory(project_root)
-    
+def print_timings(timings, top=10):
+    """输出扫描耗时统计和最慢的文件"""
+    if not timings:
+        return
+    total = sum(t['seconds'] for t in timings)
+    skipped = sum(1 for t in timings if t['mode'] == 'binary')
+    streamed = sum(1 for t in timings if t['mode'] == 'stream')
+    print(f"⏱️ 扫描 {len(timings)} 个文件，累计耗时 {total:.3f}s（跳过二进制 {skipped} 个，流式扫描 {streamed} 个）")
+    for t in sorted(timings, key=lambda t: t['seconds'], reverse=True)[:top]:
+        print(f"   {t['seconds'] * 1000:8.1f}ms  [{t['mode']}] {t['file']}")
+
+def scan_directory(directory, workers=None, max_size=DEFAULT_MAX_SIZE, timings=None):
+    """扫描目录中的所有文件"""
+    return scan_files(collect_files(directory), workers, max_size, timings)
+
+def pattern_signature():
+    """敏感信息模式的签名，模式变化时整个缓存失效"""
+    rules = {
+        'patterns': SENSITIVE_PATTERNS,
+        'entropy': [ENV_SECRET_PATTERN.pattern.decode(), ENTROPY_THRESHOLD],
+        'fingerprint': 1,
+    }
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+def load_cache(cache_path):
+    """读取增量扫描缓存"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('signature') == pattern_signature():
+            return cache
+        print("ℹ️ 检测规则已变化，缓存失效")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ 读取扫描缓存失败，将全量扫描: {e}")
+    return {'signature': pattern_signature(), 'files': {}}
+
+def save_cache(cache_path, cache):
+    """写入增量扫描缓存"""
+    try:
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"⚠️ 写入扫描缓存失败: {e}")
+
+def file_digest(file_path):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def scan_incremental(file_paths, cache, workers=None, max_size=DEFAULT_MAX_SIZE, timings=None):
+    """增量扫描：(路径, 大小, mtime, 内容哈希) 未变化的文件直接复用缓存结果"""
+    cached_files = cache['files']
+    all_findings = []
+    pending = []
+    reused = 0
+
+    for file_path in file_paths:
+        key = str(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        entry = cached_files.get(key)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            all_findings.extend(entry['findings'])
+            reused += 1
+            continue
+
+        try:
+            digest = file_digest(file_path)
+        except OSError as e:
+            print(f"⚠️ 无法读取文件 {file_path}: {e}")
+            continue
+
+        if entry and entry['hash'] == digest:
+            # 仅mtime变化（例如checkout），内容未变
+            entry.update({'size': stat.st_size, 'mtime': stat.st_mtime_ns})
+            all_findings.extend(entry['findings'])
+            reused += 1
+            continue
+
+        cached_files[key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest, 'findings': []}
+        pending.append(file_path)
+
+    if pending:
+        findings = scan_files(pending, workers, max_size, timings)
+        for finding in findings:
+            cached_files[finding['file']]['findings'].append(finding)
+        all_findings.extend(findings)
+
+    # 清理已删除文件的缓存
+    current = {str(p) for p in file_paths}
+    for key in list(cached_files):
+        if key not in current:
+            del cached_files[key]
+
+    print(f"♻️ 增量扫描: 复用 {reused} 个文件缓存，重新扫描 {len(pending)} 个文件")
+    return all_findings
+
+def is_checked_path(relative_path):
+    """判断相对路径是否属于扫描范围"""
+    path = Path(relative_path)
+    if any(part in IGNORE_DIRS for part in path.parts[:-1]):
+        return False
+    return path.suffix in CHECK_EXTENSIONS or path.name.startswith('.env')
+
+def parse_diff_added_lines(diff_text):
+    """解析 git diff -U0 输出，返回 {文件: [(行号, 新增行内容)]}"""
+    added = {}
+    current_file = None
+    line_num = 0
+    hunk_re = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+
+    for line in diff_text.split('\n'):
+        if line.startswith('+++ '):
+            target = line[4:]
+            current_file = target[2:] if target.startswith('b/') else None
+            continue
+        if line.startswith('@@'):
+            match = hunk_re.match(line)
+            line_num = int(match.group(1)) if match else 0
+            continue
+        if current_file is None:
+            continue
+        if line.startswith('+'):
+            added.setdefault(current_file, []).append((line_num, line[1:]))
+            line_num += 1
+
+    return added
+
+def scan_git_diff(rev, project_root):
+    """只扫描相对于指定版本的新增/修改行"""
+    result = subprocess.run(
+        ['git', 'diff', '-U0', '--no-color', '--no-ext-diff', rev, '--'],
+        cwd=project_root, capture_output=True, text=True, encoding='utf-8', errors='ignore'
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"git diff 执行失败: {result.stderr.strip()}")
+
+    findings = []
+    added_lines = parse_diff_added_lines(result.stdout)
+    for relative_path, lines in added_lines.items():
+        if not is_checked_path(relative_path):
+            continue
+        file_path = Path(project_root) / relative_path
+        for line_num, text in lines:
+            for finding in scan_buffer(text.encode('utf-8'), file_path):
+                finding['line'] = line_num
+                findings.append(finding)
+
+    print(f"🔀 git diff 模式: 检查了 {len(added_lines)} 个变更文件")
+    return findings
+
+def load_baseline(baseline_path):
+    """读取基线文件中的指纹集合（支持指纹列表或本脚本输出的JSON报告）"""
+    try:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return set()
+    if isinstance(data, dict):
+        data = data.get('fingerprints') or [f['fingerprint'] for f in data.get('findings', [])]
+    return set(data)
+
+def save_baseline(baseline_path, findings):
+    """将当前所有发现的指纹写入基线文件"""
+    fingerprints = sorted({f['fingerprint'] for f in findings})
+    with open(baseline_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprints': fingerprints}, f, indent=2)
+        f.write('\n')
+    print(f"📌 已将 {len(fingerprints)} 个指纹写入基线 {baseline_path}")
+
+def relative_uri(file_path):
+    """转换为相对项目根目录的POSIX路径"""
+    try:
+        return Path(file_path).resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return Path(file_path).as_posix()
+
+def build_json_report(findings, suppressed):
+    """生成JSON格式报告"""
+    return {
+        'version': 1,
+        'findings': [dict(f, file=relative_uri(f['file'])) for f in findings],
+        'suppressed': len(suppressed),
+    }
+
+def build_sarif_report(findings):
+    """生成SARIF 2.1.0格式报告"""
+    categories = list(SENSITIVE_PATTERNS) + [ENTROPY_CATEGORY]
+    rules = [{
+        'id': category,
+        'shortDescription': {'text': f"Potential secret leak: {category}"},
+    } for category in categories]
+    results = [{
+        'ruleId': f['category'],
+        'ruleIndex': categories.index(f['category']),
+        'level': 'error',
+        'message': {'text': f"Potential {f['category']} found: {f['match']}"},
+        'locations': [{
+            'physicalLocation': {
+                'artifactLocation': {'uri': relative_uri(f['file'])},
+                'region': {'startLine': f['line']},
+            }
+        }],
+        'partialFingerprints': {'secretFingerprint/v1': f['fingerprint']},
+    } for f in findings]
+    return {
+        '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+        'version': '2.1.0',
+        'runs': [{
+            'tool': {'driver': {'name': 'security_check', 'rules': rules}},
+            'results': results,
+        }],
+    }
+
+def write_report(report, output_path):
+    """输出机器可读报告到文件或标准输出"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+def print_findings(findings, suppressed):
+    """输出人类可读的扫描结果"""
+    if suppressed:
+        print(f"🔕 已按基线抑制 {len(suppressed)} 个已知发现")
+
     if findings:
         print(f"\n❌ 发现 {len(findings)} 个潜在的敏感信息泄露:")
         print("=" * 80)
@@ -94,6 +575,7 @@ def main():
             print(f"📍 行号: {finding['line']}")
             print(f"🏷️ 类型: {finding['category']}")
             print(f"🔍 内容: {finding['match']}")
+            print(f"🔑 指纹: {finding['fingerprint']}")
             print("-" * 40)
         
         print("\n🚨 请立即采取以下措施:")
@@ -101,11 +583,77 @@ def main():
         print("2. 将敏感文件添加到 .gitignore")
         print("3. 从Git历史中移除敏感信息")
         print("4. 使用环境变量管理敏感配置")
-        
-        sys.exit(1)
     else:
         print("✅ 未发现敏感信息泄露")
-        sys.exit(0)
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="检测项目中的敏感信息泄露")
+    parser.add_argument('--workers', type=int, default=None, help="并行扫描进程数（默认CPU核数，1为单进程）")
+    parser.add_argument('--incremental', action='store_true', help="启用增量扫描，复用未变化文件的缓存结果")
+    parser.add_argument('--cache', default=None, help=f"增量扫描缓存路径（默认项目根目录下 {CACHE_FILENAME}）")
+    parser.add_argument('--max-size', type=float, default=DEFAULT_MAX_SIZE / 1024 / 1024, help="超过该大小(MB)的文件改为流式分块扫描，0表示不限制")
+    parser.add_argument('--timings', type=int, nargs='?', const=10, default=None, metavar='N', help="输出扫描最慢的N个文件（默认10）")
+    parser.add_argument('--git-diff', metavar='REV', default=None, help="只扫描相对于指定git版本的变更行")
+    parser.add_argument('--format', choices=['text', 'json', 'sarif'], default='text', help="输出格式（默认text）")
+    parser.add_argument('--output', default=None, help="json/sarif报告输出路径（默认标准输出）")
+    parser.add_argument('--baseline', default=None, help="基线文件路径，其中的指纹不再报告")
+    parser.add_argument('--update-baseline', action='store_true', help="将本次所有发现写入基线文件")
+    return parser.parse_args()
+
+def run_scan(args, project_root):
+    """按命令行参数执行扫描"""
+    print("🔍 开始安全扫描...")
+    max_size = int(args.max_size * 1024 * 1024)
+    timings = []
+    if args.git_diff:
+        findings = scan_git_diff(args.git_diff, project_root)
+    elif args.incremental:
+        cache_path = args.cache or project_root / CACHE_FILENAME
+        cache = load_cache(cache_path)
+        findings = scan_incremental(collect_files(project_root), cache, args.workers, max_size, timings)
+        save_cache(cache_path, cache)
+    else:
+        findings = scan_directory(project_root, args.workers, max_size, timings)
+
+    if args.timings is not None:
+        print_timings(timings, args.timings)
+
+    # 输出顺序与调度顺序无关，便于CI比对
+    findings.sort(key=lambda f: (relative_uri(f['file']), f['line'], f['category']))
+    return findings
+
+def main():
+    """主函数"""
+    args = parse_args()
+    
+    # 获取项目根目录
+    project_root = PROJECT_ROOT
+    
+    # 扫描项目（机器可读格式输出到标准输出时，进度信息改写到标准错误）
+    machine_stdout = args.format != 'text' and not args.output
+    if machine_stdout:
+        with redirect_stdout(sys.stderr):
+            findings = run_scan(args, project_root)
+    else:
+        findings = run_scan(args, project_root)
+
+    if args.baseline and args.update_baseline:
+        save_baseline(args.baseline, findings)
+
+    # 按基线抑制已知发现
+    baseline = load_baseline(args.baseline) if args.baseline else set()
+    suppressed = [f for f in findings if f['fingerprint'] in baseline]
+    findings = [f for f in findings if f['fingerprint'] not in baseline]
+
+    if args.format == 'json':
+        write_report(build_json_report(findings, suppressed), args.output)
+    elif args.format == 'sarif':
+        write_report(build_sarif_report(findings), args.output)
+    if args.format == 'text' or args.output:
+        print_findings(findings, suppressed)
+
+    sys.exit(1 if findings else 0)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
 测试关键词驱动文章生成功能
+
+离线回放（无需网络和API密钥）：先在能访问外部服务的环境录制一次
+    HTTP_CASSETTE=cassettes/keyword_generation.json HTTP_CASSETTE_MODE=record LLM_CACHE_MODE=record python test_keyword_generation.py
+之后用 replay 模式运行即可回放 Google建议、Supabase 和 Gemini 的响应（HTTP_CASSETTE_LATENCY=recorded 可还原录制时的延迟）
+    HTTP_CASSETTE=cassettes/keyword_generation.json HTTP_CASSETTE_MODE=replay LLM_CACHE_MODE=replay python test_keyword_generation.py
 """
 import os
 import sys
@@ -10,6 +15,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
 from auto_generate_articles import (
+    http_cassette,
     generate_seed_keywords,
     get_google_suggestions,
     expand_keywords_with_google,
@@ -117,9 +123,12 @@ def main():
         # 测试1: 种子关键词生成
         chinese_keywords, english_keywords = test_seed_keywords()
         
-        # 测试2: Google自动完成（可选，需要网络）
-        print("\n是否测试Google API? (y/n): ", end="")
-        test_google = input().lower().startswith('y')
+        # 测试2: Google自动完成（可选，需要网络；使用 cassette 时自动执行，不再询问）
+        if http_cassette:
+            test_google = True
+        else:
+            print("\n是否测试Google API? (y/n): ", end="")
+            test_google = input().lower().startswith('y')
         
         if test_google:
             test_google_suggestions()
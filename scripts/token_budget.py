@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Token 预算记账 - 按阶段和语言累计 Gemini 的 prompt/output token，执行单次运行和每日预算
+"""
+import os
+import sqlite3
+import threading
+from datetime import date
+from contextlib import contextmanager
+from typing import Dict, Optional
+from data_dir import DATA_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    day TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    output_tokens INTEGER NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, stage, locale)
+);
+"""
+
+# 计入单篇文章消耗的阶段（用于预估下一篇文章）
+ARTICLE_STAGES = ("article", "outline", "section", "translate")
+
+class TokenBudget:
+    """Token 预算：运行内累计保存在内存，每日累计写入本地SQLite（多个进程共享）
+
+    run_limit / daily_limit 为 0 表示不限制。每篇文章开始前用已完成文章的平均消耗
+    （文章类阶段的 token 总数 / 已完成文章数，尚无样本时用 article_estimate）预估，预计超出预算时不再启动新文章。
+    """
+
+    def __init__(self, run_limit: int = 0, daily_limit: int = 0, article_estimate: int = 20000,
+                 path: Optional[str] = None):
+        self.run_limit = run_limit
+        self.daily_limit = daily_limit
+        self.article_estimate = article_estimate
+        self.path = path or os.path.join(DATA_DIR, 'token_usage.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+        # 可重入：allow_article 在持锁期间调用 check（其中的统计方法也会取锁）
+        self.lock = threading.RLock()
+        self.usage: Dict[str, Dict[str, int]] = {}
+        self.articles = 0
+        self.in_flight = 0
+        self.exhausted_reason: Optional[str] = None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record(self, stage: str, locale: Optional[str], prompt_tokens: int, output_tokens: int):
+        """记录一次调用的 token 用量"""
+        locale = locale or "-"
+        with self.lock:
+            entry = self.usage.setdefault(f"{stage}@{locale}", {"prompt_tokens": 0, "output_tokens": 0, "calls": 0})
+            entry["prompt_tokens"] += prompt_tokens
+            entry["output_tokens"] += output_tokens
+            entry["calls"] += 1
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT INTO token_usage (day, stage, locale, prompt_tokens, output_tokens, calls)
+                   VALUES (?, ?, ?, ?, ?, 1)
+                   ON CONFLICT(day, stage, locale) DO UPDATE SET
+                       prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                       output_tokens = output_tokens + excluded.output_tokens,
+                       calls = calls + 1""",
+                (date.today().isoformat(), stage, locale, prompt_tokens, output_tokens)
+            )
+
+    def record_article(self):
+        """记录完成（成功或失败）一篇经 allow_article 放行的文章，用于预估后续文章的消耗"""
+        with self.lock:
+            self.articles += 1
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def run_total(self) -> int:
+        with self.lock:
+            return sum(e["prompt_tokens"] + e["output_tokens"] for e in self.usage.values())
+
+    def daily_total(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COALESCE(SUM(prompt_tokens + output_tokens), 0) FROM token_usage WHERE day = ?",
+                (date.today().isoformat(),)
+            ).fetchone()
+        return row[0]
+
+    def estimate_article(self) -> int:
+        with self.lock:
+            if not self.articles:
+                return self.article_estimate
+            tokens = sum(e["prompt_tokens"] + e["output_tokens"] for key, e in self.usage.items()
+                         if key.split('@')[0] in ARTICLE_STAGES)
+            return round(tokens / self.articles)
+
+    def check(self) -> Optional[str]:
+        """预估再启动一篇文章（连同进行中的文章）是否会超出运行或每日预算，返回超出原因或 None"""
+        if not self.run_limit and not self.daily_limit:
+            return None
+
+        estimate = self.estimate_article()
+        with self.lock:
+            pending = estimate * (self.in_flight + 1)
+        reason = None
+        if self.run_limit and self.run_total() + pending > self.run_limit:
+            reason = f"运行预算 {self.run_limit} tokens 将被超出（已用 {self.run_total()}，预估每篇 {estimate}）"
+        elif self.daily_limit and self.daily_total() + pending > self.daily_limit:
+            reason = f"每日预算 {self.daily_limit} tokens 将被超出（今日已用 {self.daily_total()}，预估每篇 {estimate}）"
+
+        with self.lock:
+            # 每日预算跨天后会恢复，因此每次重新判断，只在状态变化时提示
+            if reason and reason.split('（')[0] != (self.exhausted_reason or '').split('（')[0]:
+                print(f"💰 {reason}，停止启动新文章")
+            self.exhausted_reason = reason
+        return reason
+
+    def allow_article(self) -> bool:
+        """预算允许时放行并占用一个在途名额，文章结束后须调用 record_article
+
+        检查和占用在同一次持锁中完成，并发的 worker 不会同时通过检查而超出预算
+        """
+        with self.lock:
+            if self.check():
+                return False
+            self.in_flight += 1
+            return True
+
+    def summary(self) -> Dict[str, object]:
+        """运行内 token 汇总（总计 + 按 阶段@语言 细分）"""
+        with self.lock:
+            by_stage = {key: dict(entry) for key, entry in sorted(self.usage.items())}
+        prompt_tokens = sum(e["prompt_tokens"] for e in by_stage.values())
+        output_tokens = sum(e["output_tokens"] for e in by_stage.values())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+            "by_stage": by_stage,
+            "budget_exhausted": self.exhausted_reason,
+        }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+文章题目近似去重 - 基于 MinHash/LSH 的本地题目索引
+"""
+import os
+import re
+import json
+import zlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from data_dir import DATA_DIR
+
+# MinHash 参数：64个哈希 = 16个band × 每band 4行，约在Jaccard 0.5附近开始召回
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = float(os.getenv('TOPIC_DUPLICATE_THRESHOLD', '0.6'))
+
+# 哈希参数固定种子，保证持久化的签名在不同运行间可比
+_PRIME = np.uint64(4294967311)  # 大于2^32的最小素数
+_rng = np.random.RandomState(20250101)
+_HASH_A = _rng.randint(1, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+_HASH_B = _rng.randint(0, 2 ** 31, size=NUM_PERM).astype(np.uint64)
+
+def normalize_text(text: str) -> str:
+    """归一化题目/slug：小写、去标点、去年份"""
+    text = text.lower().replace('-', ' ').replace('_', ' ')
+    text = re.sub(r'\b(19|20)\d{2}\b', ' ', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def shingles(text: str) -> List[str]:
+    """字符级 k-shingle，兼容中文、印地语等无空格分词的语言"""
+    text = normalize_text(text)
+    if len(text) <= SHINGLE_SIZE:
+        return [text] if text else []
+    return list({text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)})
+
+def minhash_signature(text: str) -> np.ndarray:
+    """计算文本的 MinHash 签名（向量化）"""
+    grams = shingles(text)
+    if not grams:
+        return np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    hashes = np.array([zlib.crc32(g.encode('utf-8')) for g in grams], dtype=np.uint64)
+    permuted = (hashes[:, None] * _HASH_A[None, :] + _HASH_B[None, :]) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+def band_keys(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+    """将签名切分为 LSH band 桶键"""
+    return [(b, signature[b * ROWS:(b + 1) * ROWS].tobytes()) for b in range(BANDS)]
+
+class TopicIndex:
+    """单个语言的题目 LSH 索引，持久化到本地 JSON 文件"""
+
+    def __init__(self, locale: str, path: Optional[str] = None):
+        self.locale = locale
+        self.path = path or os.path.join(DATA_DIR, 'topic_index', f'{locale}.json')
+        self.entries: List[Dict[str, str]] = []
+        self.signatures: List[np.ndarray] = []
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self.keys = set()
+        self.last_synced: Optional[str] = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def texts(self) -> List[str]:
+        """返回所有已索引的标题和slug文本"""
+        return [entry['text'] for entry in self.entries]
+
+    def _insert(self, key: str, text: str, signature: np.ndarray):
+        idx = len(self.entries)
+        self.entries.append({'key': key, 'text': text})
+        self.signatures.append(signature)
+        for bucket in band_keys(signature):
+            self.buckets.setdefault(bucket, []).append(idx)
+
+    def add(self, key: str, title: str, index_key: bool = True) -> bool:
+        """添加一篇文章（以slug为键，同时索引标题和slug文本），已存在则跳过"""
+        if not key or key in self.keys:
+            return False
+        self.keys.add(key)
+        for text in (title, key if index_key else None):
+            if text:
+                self._insert(key, text, minhash_signature(text))
+        return True
+
+    def query(self, text: str, threshold: float = DUPLICATE_THRESHOLD) -> List[Dict[str, Any]]:
+        """查找与给定文本近似的已有题目，按相似度降序返回"""
+        signature = minhash_signature(text)
+        candidates = set()
+        for bucket in band_keys(signature):
+            candidates.update(self.buckets.get(bucket, ()))
+
+        matches = {}
+        for idx in candidates:
+            similarity = float(np.mean(self.signatures[idx] == signature))
+            if similarity >= threshold:
+                entry = self.entries[idx]
+                if similarity > matches.get(entry['key'], {}).get('similarity', -1):
+                    matches[entry['key']] = {'key': entry['key'], 'text': entry['text'], 'similarity': similarity}
+
+        return sorted(matches.values(), key=lambda m: m['similarity'], reverse=True)
+
+    def find_duplicate(self, text: str, threshold: float = DUPLICATE_THRESHOLD) -> Optional[Dict[str, Any]]:
+        """返回最相似的已有题目，不存在近似题目时返回None"""
+        matches = self.query(text, threshold)
+        return matches[0] if matches else None
+
+    def save(self):
+        """写入本地索引文件"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            'locale': self.locale,
+            'num_perm': NUM_PERM,
+            'last_synced': self.last_synced,
+            'entries': [dict(entry, sig=sig.tolist()) for entry, sig in zip(self.entries, self.signatures)],
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, locale: str, path: Optional[str] = None) -> 'TopicIndex':
+        """读取本地索引文件，不存在或参数不匹配时返回空索引"""
+        index = cls(locale, path)
+        try:
+            with open(index.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return index
+        except Exception as e:
+            print(f"⚠️ 读取题目索引失败，将重建: {e}")
+            return index
+
+        if data.get('num_perm') != NUM_PERM:
+            return index
+        index.last_synced = data.get('last_synced')
+        for entry in data.get('entries', []):
+            index.keys.add(entry['key'])
+            index._insert(entry['key'], entry['text'], np.array(entry['sig'], dtype=np.uint32))
+        return index
+
+def screen_topics(index: TopicIndex, topics: List[str],
+                  threshold: float = DUPLICATE_THRESHOLD) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """筛查候选题目：与已有文章或本批次其他题目近似的题目被拒绝"""
+    accepted = []
+    rejected = []
+    batch = TopicIndex(index.locale, path=os.devnull)
+
+    for topic in topics:
+        duplicate = index.find_duplicate(topic, threshold) or batch.find_duplicate(topic, threshold)
+        if duplicate:
+            rejected.append({'topic': topic, 'duplicate_of': duplicate['text'], 'similarity': duplicate['similarity']})
+        else:
+            accepted.append(topic)
+            batch.add(f"batch-{len(accepted)}", topic, index_key=False)
+
+    return accepted, rejected
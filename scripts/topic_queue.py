@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+文章题目工作队列 - 支持租约/心跳/完成语义，多个生成进程可并发领取题目
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from datetime import datetime, timedelta, timezone
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+from resilience import execute_with_retry, resilient_call
+from data_dir import DATA_DIR
+
+DEFAULT_LEASE_SECONDS = int(os.getenv('TOPIC_LEASE_SECONDS', '600'))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('TOPIC_MAX_ATTEMPTS', '3'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topic_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic_key TEXT UNIQUE NOT NULL,
+    locale TEXT NOT NULL,
+    language TEXT NOT NULL,
+    category TEXT,
+    topic TEXT NOT NULL,
+    payload TEXT,                      -- JSON: keywords_context, seed_keywords 等
+    status TEXT NOT NULL DEFAULT 'queued',   -- queued / leased / done / failed
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    result TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_topic_queue_claim ON topic_queue(status, locale, id);
+"""
+
+def topic_key(locale: str, topic: str) -> str:
+    """题目的幂等键：同一语言的相同题目只入队一次"""
+    normalized = ' '.join(topic.lower().split())
+    return hashlib.sha1(f"{locale}:{normalized}".encode('utf-8')).hexdigest()
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class SQLiteTopicQueue:
+    """基于本地SQLite的题目队列，适合单机多进程"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('TOPIC_QUEUE_PATH') or os.path.join(DATA_DIR, 'topic_queue.sqlite')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE 立即获取写锁，保证领取操作在多进程间互斥
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, items: List[Dict[str, Any]]) -> int:
+        """批量入队，已存在的题目（相同topic_key）被忽略，返回新增数量"""
+        now = _now_iso()
+        added = 0
+        with self._transaction() as conn:
+            for item in items:
+                cursor = conn.execute(
+                    """INSERT OR IGNORE INTO topic_queue
+                       (topic_key, locale, language, category, topic, payload, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (topic_key(item['locale'], item['topic']), item['locale'], item['language'],
+                     item.get('category'), item['topic'], json.dumps(item.get('payload') or {}, ensure_ascii=False), now, now)
+                )
+                added += cursor.rowcount
+        return added
+
+    def claim(self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+              locales: Optional[List[str]] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Optional[Dict[str, Any]]:
+        """领取一个排队中或租约已过期的题目（已达最大尝试次数的过期题目不再领取）"""
+        now = time.time()
+        locale_filter = ""
+        params: List[Any] = [now, max_attempts]
+        if locales:
+            locale_filter = f" AND locale IN ({','.join('?' * len(locales))})"
+            params.extend(locales)
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"""SELECT * FROM topic_queue
+                    WHERE (status = 'queued' OR (status = 'leased' AND lease_expires < ? AND attempts < ?)){locale_filter}
+                    ORDER BY id LIMIT 1""",
+                params
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """UPDATE topic_queue SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                       attempts = attempts + 1, updated_at = ? WHERE id = ?""",
+                (worker_id, now + lease_seconds, _now_iso(), row['id'])
+            )
+        item = dict(row)
+        item['attempts'] += 1
+        item['payload'] = json.loads(item['payload'] or '{}')
+        return item
+
+    def heartbeat(self, item_id: int, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        """续租，返回False表示租约已被其他worker接管"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE topic_queue SET lease_expires = ?, updated_at = ?
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (time.time() + lease_seconds, _now_iso(), item_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, item_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """标记题目完成"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE topic_queue SET status = 'done', lease_owner = NULL, lease_expires = NULL,
+                       result = ?, updated_at = ? WHERE id = ? AND lease_owner = ?""",
+                (json.dumps(result or {}, ensure_ascii=False), _now_iso(), item_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, item_id: int, worker_id: str, error: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        """标记题目失败：未超过最大尝试次数时重新排队，返回新状态"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts FROM topic_queue WHERE id = ? AND lease_owner = ?",
+                               (item_id, worker_id)).fetchone()
+            if row is None:
+                return 'lost'
+            status = 'queued' if row['attempts'] < max_attempts else 'failed'
+            conn.execute(
+                """UPDATE topic_queue SET status = ?, lease_owner = NULL, lease_expires = NULL,
+                       last_error = ?, updated_at = ? WHERE id = ?""",
+                (status, error[:1000], _now_iso(), item_id)
+            )
+        return status
+
+    def release(self, item_id: int, worker_id: str) -> bool:
+        """放弃租约并重新排队，退还本次领取计入的尝试次数（未实际尝试，如预算不足跳过）"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE topic_queue SET status = 'queued', lease_owner = NULL, lease_expires = NULL,
+                       attempts = MAX(attempts - 1, 0), updated_at = ? WHERE id = ? AND lease_owner = ?""",
+                (_now_iso(), item_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def requeue_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """将租约过期的题目重新排队（已达最大尝试次数的标记为失败），返回数量"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """UPDATE topic_queue
+                   SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                       last_error = CASE WHEN attempts < ? THEN last_error ELSE '租约过期次数过多' END,
+                       lease_owner = NULL, lease_expires = NULL, updated_at = ?
+                   WHERE status = 'leased' AND lease_expires < ?""",
+                (max_attempts, max_attempts, _now_iso(), time.time())
+            )
+        return cursor.rowcount
+
+    def depth(self, locale: Optional[str] = None) -> Dict[str, int]:
+        """各状态的题目数量"""
+        query = "SELECT status, COUNT(*) AS n FROM topic_queue"
+        params: List[Any] = []
+        if locale:
+            query += " WHERE locale = ?"
+            params.append(locale)
+        with self._connect() as conn:
+            rows = conn.execute(query + " GROUP BY status", params).fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+class SupabaseTopicQueue:
+    """基于Supabase表的题目队列，适合多台runner共享；领取使用条件更新实现乐观锁
+
+    全部请求经重试/熔断层执行，单次瞬时错误不会中断 worker 或心跳
+    """
+
+    def __init__(self, client, table: str = "topic_queue", deadline: float = 60.0):
+        self.client = client
+        self.table = table
+        self.deadline = deadline
+
+    def _table(self):
+        return self.client.table(self.table)
+
+    def _execute(self, query):
+        return execute_with_retry(query, deadline=self.deadline)
+
+    def enqueue(self, items: List[Dict[str, Any]]) -> int:
+        """批量入队，已存在的题目（相同topic_key）被忽略，返回新增数量"""
+        now = _now_iso()
+        rows = [{
+            "topic_key": topic_key(item['locale'], item['topic']),
+            "locale": item['locale'],
+            "language": item['language'],
+            "category": item.get('category'),
+            "topic": item['topic'],
+            "payload": item.get('payload') or {},
+            "status": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        } for item in items]
+        if not rows:
+            return 0
+        # 忽略重复的 upsert 是幂等的，可以安全重试
+        result = self._execute(self._table().upsert(rows, on_conflict="topic_key", ignore_duplicates=True))
+        return len(result.data or [])
+
+    def _try_lease(self, row: Dict[str, Any], worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        update = {
+            "status": "leased",
+            "lease_owner": worker_id,
+            "lease_expires": (now + timedelta(seconds=lease_seconds)).isoformat(),
+            "attempts": row['attempts'] + 1,
+            "updated_at": now.isoformat(),
+        }
+        # 只有状态和尝试次数都未被其他worker修改时才能更新成功
+        query = self._table().update(update).eq("id", row['id']).eq("attempts", row['attempts'])
+        if row['status'] == 'queued':
+            query = query.eq("status", "queued")
+        else:
+            query = query.eq("status", "leased").lt("lease_expires", now.isoformat())
+
+        attempts = 0
+
+        def attempt(timeout):
+            nonlocal attempts
+            attempts += 1
+            data = query.execute().data
+            if not data and attempts > 1:
+                # 上一次尝试可能已在服务端提交、只是响应超时，按租约持有者查回
+                data = self._table().select("*").eq("id", row['id']).eq("lease_owner", worker_id) \
+                    .eq("attempts", row['attempts'] + 1).execute().data
+            return data
+
+        data = resilient_call("supabase", attempt, deadline=self.deadline)
+        return data[0] if data else None
+
+    def claim(self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS,
+              locales: Optional[List[str]] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Optional[Dict[str, Any]]:
+        """领取一个排队中或租约已过期的题目（已达最大尝试次数的过期题目不再领取）"""
+        now = _now_iso()
+        query = self._table().select("*").or_(
+            f"status.eq.queued,and(status.eq.leased,lease_expires.lt.{now},attempts.lt.{max_attempts})"
+        )
+        if locales:
+            query = query.in_("locale", locales)
+        candidates = self._execute(query.order("id").limit(10)).data or []
+        for row in candidates:
+            item = self._try_lease(row, worker_id, lease_seconds)
+            if item:
+                return item
+        return None
+
+    def heartbeat(self, item_id: int, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        """续租，返回False表示租约已被其他worker接管"""
+        expires = (datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)).isoformat()
+        result = self._execute(self._table().update({"lease_expires": expires, "updated_at": _now_iso()})
+                               .eq("id", item_id).eq("status", "leased").eq("lease_owner", worker_id))
+        return bool(result.data)
+
+    def complete(self, item_id: int, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        """标记题目完成"""
+        response = self._execute(self._table().update({
+            "status": "done", "lease_owner": None, "lease_expires": None,
+            "result": result or {}, "updated_at": _now_iso(),
+        }).eq("id", item_id).eq("lease_owner", worker_id))
+        return bool(response.data)
+
+    def fail(self, item_id: int, worker_id: str, error: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        """标记题目失败：未超过最大尝试次数时重新排队，返回新状态"""
+        rows = self._execute(self._table().select("attempts").eq("id", item_id).eq("lease_owner", worker_id)).data
+        if not rows:
+            return 'lost'
+        status = 'queued' if rows[0]['attempts'] < max_attempts else 'failed'
+        self._execute(self._table().update({
+            "status": status, "lease_owner": None, "lease_expires": None,
+            "last_error": error[:1000], "updated_at": _now_iso(),
+        }).eq("id", item_id).eq("lease_owner", worker_id))
+        return status
+
+    def release(self, item_id: int, worker_id: str) -> bool:
+        """放弃租约并重新排队，退还本次领取计入的尝试次数（未实际尝试，如预算不足跳过）"""
+        rows = self._execute(self._table().select("attempts").eq("id", item_id).eq("lease_owner", worker_id)).data
+        if not rows:
+            return False
+        response = self._execute(self._table().update({
+            "status": "queued", "lease_owner": None, "lease_expires": None,
+            "attempts": max(rows[0]['attempts'] - 1, 0), "updated_at": _now_iso(),
+        }).eq("id", item_id).eq("lease_owner", worker_id))
+        return bool(response.data)
+
+    def requeue_expired(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        """将租约过期的题目重新排队（已达最大尝试次数的标记为失败），返回数量"""
+        now = _now_iso()
+        requeued = self._execute(self._table().update({
+            "status": "queued", "lease_owner": None, "lease_expires": None, "updated_at": now,
+        }).eq("status", "leased").lt("lease_expires", now).lt("attempts", max_attempts))
+        self._execute(self._table().update({
+            "status": "failed", "lease_owner": None, "lease_expires": None,
+            "last_error": "租约过期次数过多", "updated_at": now,
+        }).eq("status", "leased").lt("lease_expires", now).gte("attempts", max_attempts))
+        return len(requeued.data or [])
+
+    def depth(self, locale: Optional[str] = None) -> Dict[str, int]:
+        """各状态的题目数量"""
+        counts = {}
+        for status in ("queued", "leased", "done", "failed"):
+            query = self._table().select("id", count="exact").eq("status", status)
+            if locale:
+                query = query.eq("locale", locale)
+            counts[status] = self._execute(query.limit(1)).count or 0
+        return {status: n for status, n in counts.items() if n}
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+文章翻译辅助 - 按H2拆分章节、分批组装翻译请求、解析结果并改写站内链接
+"""
+import re
+from typing import List, Dict
+
+def split_sections(content: str) -> List[str]:
+    """按H2标题拆分Markdown正文，第一部分为H1和引言"""
+    parts = re.split(r'\n(?=## )', content.strip())
+    return [part.strip() for part in parts if part.strip()]
+
+def batch_parts(parts: List[str], max_chars: int = 6000) -> List[List[int]]:
+    """把待翻译的片段按字符数贪心分批，返回每批的片段下标"""
+    batches: List[List[int]] = []
+    size = 0
+    for i, part in enumerate(parts):
+        if batches and size + len(part) <= max_chars:
+            batches[-1].append(i)
+            size += len(part)
+        else:
+            batches.append([i])
+            size = len(part)
+    return batches
+
+def build_translation_prompt(parts: List[str], language: str) -> str:
+    """构建批量翻译提示词，每个片段用编号分隔标记包裹"""
+    blocks = '\n\n'.join(f"===PART_{i}_START===\n{part}\n===PART_{i}_END===" for i, part in enumerate(parts, 1))
+    return f"""你是一位专业的本地化译者，负责把 KuaishouVideoDownload（快手视频下载器）的英文博客文章翻译成{language}。
+
+## 要求
+- 译文自然流畅，符合{language}读者的表达习惯，不要逐字直译
+- 保留Markdown格式（标题层级、列表、加粗、链接）
+- 链接的URL保持不变，只翻译锚文本
+- 品牌名 Kuaishou、KuaishouVideoDownload 保持英文不翻译
+- 每个片段分别翻译，保留原有的 ===PART_n_START=== / ===PART_n_END=== 标记，不要输出其他内容
+
+## 待翻译片段
+{blocks}"""
+
+def parse_translation(text: str, count: int) -> List[str]:
+    """解析批量翻译结果，缺少任一片段时抛出异常"""
+    results = []
+    for i in range(1, count + 1):
+        match = re.search(rf'===PART_{i}_START===\s*(.*?)\s*===PART_{i}_END===', text, re.DOTALL)
+        if not match or not match.group(1).strip():
+            raise ValueError(f"翻译结果缺少第{i}个片段的格式标记")
+        results.append(match.group(1).strip())
+    return results
+
+def rewrite_internal_links(content: str, site_url: str, locale: str, slug_map: Dict[str, str]) -> str:
+    """把指向英文文章的站内链接改写为目标语言的对应译文；尚无译文的保持指向英文原文"""
+    pattern = re.compile(rf'{re.escape(site_url.rstrip("/"))}/posts/([^\s)#?]+)')
+
+    def replace(match):
+        slug = match.group(1)
+        if slug in slug_map:
+            return f"{site_url.rstrip('/')}/{locale}/posts/{slug_map[slug]}"
+        return match.group(0)
+
+    return pattern.sub(replace, content)
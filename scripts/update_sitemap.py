@@ -5,28 +5,40 @@ GitHub Actions sitemap 更新脚本
 import os
 import requests
 from datetime import datetime
-from supabase import create_client, Client
+from supabase import create_client
+from indexnow import notify_new_urls, write_key_file
+from post_store import DATA_DIR, SupabasePostStore, SQLitePostStore
 
 # 环境变量配置
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 SITE_URL = os.getenv('NEXT_PUBLIC_WEB_URL', 'https://kuaishou-video-download.com')
 
-# 初始化 Supabase 客户端
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+SITEMAP_PATH = "public/sitemap.xml"
+
+# Dry-run（DRY_RUN=1 或 --dry-run）：从本地SQLite读取文章，sitemap写到数据目录，不通知搜索引擎
+DRY_RUN = os.getenv('DRY_RUN', '').lower() in ('1', 'true', 'yes')
+
+def get_post_store():
+    """文章存储：默认 Supabase（首次查询时才创建客户端），dry-run 时为本地SQLite"""
+    if DRY_RUN:
+        return SQLitePostStore()
+    return SupabasePostStore(lambda: create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY))
+
+def get_sitemap_path():
+    return os.path.join(DATA_DIR, "dry_run_sitemap.xml") if DRY_RUN else SITEMAP_PATH
 
 def get_all_posts():
-    """获取所有已发布的文章"""
+    """获取所有已发布的文章（按 id 分页，不受单次查询1000行的限制）"""
     try:
-        result = supabase.table("posts").select("slug, locale, created_at").eq("status", "online").execute()
-        return result.data if result.data else []
+        return list(get_post_store().iter_posts("slug, locale, created_at", status="online"))
     except Exception as e:  
         print(f"获取文章数据失败: {e}")
         return []
 
 def read_existing_sitemap():
     """读取现有的sitemap文件"""
-    sitemap_path = "public/sitemap.xml"
+    sitemap_path = get_sitemap_path()
     existing_urls = set()
     
     try:
@@ -73,8 +85,8 @@ def generate_sitemap(posts):
     for lang in languages:
         base_urls.append(f"{SITE_URL}/{lang}/posts")
     
-    # 生成sitemap头部
-    sitemap_content = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+    # 生成sitemap头部（各条目先收集到列表，最后一次拼接，文章数很多时避免反复复制字符串）
+    entries = ['<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
 
     # 添加基础页面  
     for i, url in enumerate(base_urls):
@@ -88,16 +100,16 @@ def generate_sitemap(posts):
         else:
             priority = "0.8"
             
-        sitemap_content += f'''
+        entries.append(f'''
   <url>
     <loc>{url}</loc>
     <lastmod>{datetime.now().date().isoformat()}</lastmod>
     <changefreq>daily</changefreq>
     <priority>{priority}</priority>
-  </url>'''
+  </url>''')
 
     # 添加文章页面
-    new_urls_added = 0
+    new_urls = []
     for post in posts:
         slug = post.get('slug')
         locale = post.get('locale')
@@ -114,33 +126,34 @@ def generate_sitemap(posts):
         
         # 检查是否是新URL
         if url not in existing_urls:
-            new_urls_added += 1
+            new_urls.append(url)
         
         # 使用文章的创建时间或当前时间
         lastmod = created_at or datetime.now().isoformat()
         if 'T' in lastmod:
             lastmod = lastmod.split('T')[0]  # 只取日期部分
         
-        sitemap_content += f'''
+        entries.append(f'''
   <url>
     <loc>{url}</loc>
     <lastmod>{lastmod}</lastmod>
     <changefreq>daily</changefreq>
     <priority>0.7</priority>
-  </url>'''
+  </url>''')
 
     # 结束sitemap
-    sitemap_content += '\n</urlset>'
+    entries.append('\n</urlset>')
 
-    return sitemap_content, new_urls_added
+    return ''.join(entries), new_urls
 
 def write_sitemap(content):
     """写入sitemap文件"""
     try:
-        os.makedirs("public", exist_ok=True)
-        with open("public/sitemap.xml", 'w', encoding='utf-8') as f:
+        sitemap_path = get_sitemap_path()
+        os.makedirs(os.path.dirname(sitemap_path), exist_ok=True)
+        with open(sitemap_path, 'w', encoding='utf-8') as f:
             f.write(content)
-        print("✅ Sitemap文件写入成功")
+        print(f"✅ Sitemap文件写入成功: {sitemap_path}")
         return True
     except Exception as e:
         print(f"❌ Sitemap文件写入失败: {e}")
@@ -159,7 +172,8 @@ def main():
         return False
     
     # 生成sitemap内容
-    sitemap_content, new_urls_added = generate_sitemap(posts)
+    sitemap_content, new_urls = generate_sitemap(posts)
+    new_urls_added = len(new_urls)
     
     # 写入sitemap文件
     if write_sitemap(sitemap_content):
@@ -167,11 +181,23 @@ def main():
         total_base_urls = 1 + 7 + 2 + 1 + 7  # 18个基础页面
         print(f"✅ Sitemap更新成功！添加了 {new_urls_added} 个新URL")
         print(f"Sitemap包含总计 {len(posts) + total_base_urls} 个URL（包括基础页面）")
+
+        # 通知搜索引擎新增URL（推送失败不影响sitemap更新结果）；dry-run 不推送
+        if DRY_RUN:
+            print(f"🧪 Dry-run: 跳过推送 {len(new_urls)} 个新URL")
+        else:
+            key_file = write_key_file()
+            if key_file:
+                print(f"🔑 IndexNow密钥文件: {key_file}")
+            notify_new_urls(new_urls)
         return True
     else:
         print("❌ Sitemap更新失败")
         return False
 
 if __name__ == "__main__":
+    import sys
+    if "--dry-run" in sys.argv:
+        DRY_RUN = True
     success = main()
     exit(0 if success else 1) 
\ No newline at end of file